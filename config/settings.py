@@ -50,6 +50,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'storages',
     'imagekit',
 ]
@@ -66,6 +67,7 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'allauth.account.middleware.AccountMiddleware',
     'planner.middleware.LoginRequiredMiddleware',
+    'planner.middleware.LLMTelemetryMiddleware',
 ]
 
 ROOT_URLCONF = 'config.urls'
@@ -198,6 +200,54 @@ else:
         },
     }
 
+# LLM provider (see planner/services/llm_client.py): 'openai', or 'local' for the offline stand-in
+LLM_PROVIDER = os.getenv('LLM_PROVIDER', 'openai')
+OPENAI_BASE_URL = os.getenv('OPENAI_BASE_URL')  # e.g. http://127.0.0.1:8765/v1 for run_local_llm
+
+LOCAL_LLM = {
+    'LATENCY': float(os.getenv('LOCAL_LLM_LATENCY', 2.0)),  # seconds per call
+    'JITTER': float(os.getenv('LOCAL_LLM_JITTER', 0.5)),  # +/- seconds
+    'ERROR_RATE': float(os.getenv('LOCAL_LLM_ERROR_RATE', 0.0)),  # share of calls failing with 429/5xx
+    'PROMPT_TOKENS': None,  # fixed token counts; estimated from text length when None
+    'COMPLETION_TOKENS': None,
+    'FIXTURES_DIR': os.getenv('LOCAL_LLM_FIXTURES_DIR'),  # recorded responses in <dir>/<ResponseModel>/*.json
+    'SEED': 0,
+}
+
+# Stream recipes to the browser over server-sent events as they are generated, instead of queueing a background job
+RECIPE_STREAMING = os.getenv('RECIPE_STREAMING', 'false').lower() == 'true'
+
+# Outbound HTTP (see planner/services/http_client.py): (connect, read) deadlines in seconds per operation
+HTTP_TIMEOUTS = {
+    'default': (5, 60),
+    'recipe': (5, 90),
+    'recipe_stream': (5, 30),  # read deadline applies between streamed chunks
+    'shopping_list': (5, 90),
+    'image': (5, 120),
+    'image_download': (5, 30),
+}
+HTTP_MAX_RETRIES = int(os.getenv('HTTP_MAX_RETRIES', 2))  # exponential backoff retries on 429/5xx and connection errors
+HTTP_POOL_SIZE = int(os.getenv('HTTP_POOL_SIZE', 10))  # keep-alive connections per process
+CIRCUIT_BREAKER = {
+    'FAILURE_THRESHOLD': 5,  # consecutive upstream failures before failing fast
+    'RESET_TIMEOUT': 30,  # seconds before a trial call is let through
+}
+
+# LLM response cache (see planner/services/llm_cache.py)
+LLM_CACHE_TTL = int(os.getenv('LLM_CACHE_TTL', 60 * 60 * 24 * 7))  # seconds
+LLM_CACHE_MAX_BYTES = int(os.getenv('LLM_CACHE_MAX_BYTES', 50 * 1024 * 1024))
+# Each eviction scans the cache table, so it runs on one write in this many per process, and from
+# "manage.py llm_cache_stats --evict" on a schedule; the cache may overshoot its budget in between
+LLM_CACHE_EVICT_EVERY = int(os.getenv('LLM_CACHE_EVICT_EVERY', 100))
+
+# Scaled ingredient lists kept per process for recipe pages viewed at other servings (see planner/services/scaling_engine.py)
+SCALED_RECIPE_CACHE_SIZE = int(os.getenv('SCALED_RECIPE_CACHE_SIZE', 2048))
+
+# Shopping items the model categorizes per call, and calls made at once, when a shopping list needs
+# recipes not yet in the cache (see planner/services/shopping_list_generator.py)
+SHOPPING_LIST_CHUNK_SIZE = int(os.getenv('SHOPPING_LIST_CHUNK_SIZE', 30))
+SHOPPING_LIST_CONCURRENCY = int(os.getenv('SHOPPING_LIST_CONCURRENCY', 4))
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
@@ -1,7 +1,9 @@
 from django.contrib import admin
 from django.db.models import Count
 from django.utils.html import format_html
-from .models import Recipe, Ingredient, InstructionSection, InstructionStep, MealPlan, MealGroup, MealPlanRecipe, ShoppingList, ShoppingItem
+from .models import Recipe, Ingredient, InstructionSection, InstructionStep, MealPlan, MealGroup, MealPlanRecipe, ShoppingList, ShoppingItem, IngredientCategory, GenerationJob, LLMCacheEntry, LLMCacheStats, LLMCall, LLMCallDailyStats
+from .services.digest import update_ingredients_digests
+from .services.recipe_repository import backfill_parsed_quantities
 
 
 # Recipe admin
@@ -10,6 +12,9 @@ class IngredientInline(admin.TabularInline):
     model = Ingredient
     extra = 0
     ordering = ['order']
+    # Parsed from the quantity when the recipe is saved, see RecipeAdmin.save_related
+    exclude = ['amount_numerator', 'amount_denominator']
+    readonly_fields = ['unit', 'modifier']
 
 class InstructionStepInline(admin.TabularInline):
     model = InstructionStep
@@ -61,6 +66,12 @@ class RecipeAdmin(admin.ModelAdmin):
             obj.created_by = request.user
         super().save_model(request, obj, form, change)
 
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        # Inline ingredient edits bypass RecipeRepository
+        update_ingredients_digests([form.instance])
+        backfill_parsed_quantities(form.instance.ingredients.all())
+
     def make_draft(self, request, queryset):
         updated = queryset.update(status='draft')
         self.message_user(request, f'{updated} recipes were marked as draft.')
@@ -188,7 +199,7 @@ class ShoppingListAdmin(admin.ModelAdmin):
 
     fieldsets = (
         (None, {
-            'fields': ('name', 'user', 'item_count')
+            'fields': ('name', 'user', 'meal_plan', 'item_count')
         }),
         ('Timestamps', {
             'fields': ('created_at', 'modified_at', 'last_viewed_at'),
@@ -205,4 +216,66 @@ class ShoppingListAdmin(admin.ModelAdmin):
     def item_count(self, obj):
         return obj.item_count
     item_count.admin_order_field = 'item_count'
-    item_count.short_description = 'Number of Items'
\ No newline at end of file
+    item_count.short_description = 'Number of Items'
+
+
+@admin.register(IngredientCategory)
+class IngredientCategoryAdmin(admin.ModelAdmin):
+    list_display = ('name', 'normalized_name', 'category', 'modified_at')
+    list_filter = ('category',)
+    search_fields = ('name', 'normalized_name')
+    ordering = ('name',)
+    list_per_page = 50
+
+
+# Generation job admin
+
+@admin.register(GenerationJob)
+class GenerationJobAdmin(admin.ModelAdmin):
+    list_display = ('uuid', 'kind', 'status', 'user', 'attempts', 'created_at', 'finished_at')
+    list_filter = ('kind', 'status', 'created_at')
+    search_fields = ('uuid', 'user__username', 'user__email', 'last_error')
+    readonly_fields = ('uuid', 'created_at', 'modified_at', 'finished_at', 'locked_by', 'locked_at')
+    raw_id_fields = ['user', 'recipe']
+    ordering = ('-created_at',)
+    list_per_page = 50
+    actions = ['requeue']
+
+    def requeue(self, request, queryset):
+        updated = queryset.filter(status='failed').update(status='queued', attempts=0, finished_at=None)
+        self.message_user(request, f'{updated} jobs were requeued.')
+    requeue.short_description = "Requeue selected failed jobs"
+
+
+# LLM cache admin
+
+@admin.register(LLMCacheEntry)
+class LLMCacheEntryAdmin(admin.ModelAdmin):
+    list_display = ('key', 'namespace', 'size', 'hit_count', 'created_at', 'last_hit_at', 'expires_at')
+    list_filter = ('namespace',)
+    search_fields = ('key',)
+    readonly_fields = ('created_at',)
+    ordering = ('-last_hit_at',)
+    list_per_page = 50
+
+@admin.register(LLMCacheStats)
+class LLMCacheStatsAdmin(admin.ModelAdmin):
+    list_display = ('namespace', 'hits', 'misses', 'evictions', 'modified_at')
+
+
+# LLM telemetry admin
+
+@admin.register(LLMCall)
+class LLMCallAdmin(admin.ModelAdmin):
+    list_display = ('created_at', 'operation', 'model', 'status', 'cache_status', 'duration_ms', 'ttfb_ms', 'prompt_tokens', 'completion_tokens', 'cost_usd', 'retries', 'view', 'user')
+    list_filter = ('operation', 'model', 'status', 'cache_status', 'view')
+    search_fields = ('user__username', 'error')
+    date_hierarchy = 'created_at'
+    ordering = ('-created_at',)
+    list_per_page = 50
+
+@admin.register(LLMCallDailyStats)
+class LLMCallDailyStatsAdmin(admin.ModelAdmin):
+    list_display = ('date', 'operation', 'model', 'view', 'calls', 'errors', 'cache_hits', 'retries', 'avg_duration_ms', 'p95_duration_ms', 'avg_ttfb_ms', 'prompt_tokens', 'completion_tokens', 'cost_usd')
+    list_filter = ('operation', 'model', 'view')
+    date_hierarchy = 'date'
@@ -0,0 +1,27 @@
+"""
+Micro-benchmarks for hot paths, run with: python manage.py benchmark [name ...]
+Each benchmark module registers a run() function that returns printable result lines.
+"""
+import time
+from typing import Callable
+
+BENCHMARKS = {}
+
+
+def register(name: str):
+    def decorator(fn: Callable[..., list[str]]):
+        BENCHMARKS[name] = fn
+        return fn
+    return decorator
+
+def best_of(fn: Callable[[], object], repeat: int = 5) -> float:
+    """Best wall time in seconds of several runs, to filter out noise"""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+def load_benchmarks():
+    from . import aggregate_shopping_list, parse_recipe, save_recipe, scale_recipe, shopping_list_wire_format  # noqa: F401
@@ -0,0 +1,25 @@
+from planner.services.shopping_list_generator import ShoppingItem, aggregate_shopping_list
+from . import best_of, register
+from .samples import sample_recipes
+
+
+@register('aggregate_shopping_list')
+def run(plans: int = 100) -> list[str]:
+    """Shopping list pre-aggregation: items and estimated prompt tokens sent to the model, before and after"""
+    recipes = sample_recipes()
+    shopping_list = [
+        ShoppingItem(name=ing['name'], quantity=ing['quantity'], category='TBD', recipe_id=recipe_id)
+        for recipe_id, recipe in enumerate(recipes, start=1)
+        for ing in recipe['ingredients']
+    ]
+    # A week of dinners, the size of a typical meal plan
+    week = [item for item in shopping_list if item.recipe_id <= 7]
+
+    lines = []
+    for label, items in [(f"One week ({7} recipes)", week), (f"All {len(recipes)} sample recipes", shopping_list)]:
+        _, report = aggregate_shopping_list(items)
+        lines.append(f"{label}: {report}")
+
+    elapsed = best_of(lambda: [aggregate_shopping_list(week) for _ in range(plans)])
+    lines.append(f"aggregate_shopping_list: {plans / elapsed:,.0f} weekly plans/s")
+    return lines
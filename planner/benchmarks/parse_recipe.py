@@ -0,0 +1,30 @@
+import json
+from planner.services.recipe_parser import RecipeParser, parse_recipe_list_string, parse_recipe_string
+from . import best_of, register
+from .samples import sample_recipe_strings
+
+
+def parse_recipe_string_by_hand(json_str: str):
+    """The previous parse_recipe_string: json.loads, then validate each ingredient, section and step"""
+    return RecipeParser(json.loads(json_str)).validate()
+
+@register('parse_recipe')
+def run(copies: int = 20) -> list[str]:
+    """Recipe parse throughput, hand-walked RecipeParser vs. the single compiled validator"""
+    recipe_strings = sample_recipe_strings() * copies
+    recipe_list_string = f"[{','.join(recipe_strings)}]"
+    count = len(recipe_strings)
+
+    # Both paths must agree before timing them
+    assert [parse_recipe_string(s) for s in recipe_strings[:50]] == [parse_recipe_string_by_hand(s) for s in recipe_strings[:50]]
+
+    by_hand = best_of(lambda: [parse_recipe_string_by_hand(s) for s in recipe_strings])
+    fast = best_of(lambda: [parse_recipe_string(s) for s in recipe_strings])
+    fast_list = best_of(lambda: parse_recipe_list_string(recipe_list_string))
+
+    return [
+        f"{count} recipes ({len(sample_recipe_strings())} samples x {copies})",
+        f"RecipeParser (json.loads + by hand): {count / by_hand:,.0f} recipes/s",
+        f"parse_recipe_string (one validator):  {count / fast:,.0f} recipes/s ({by_hand / fast:.1f}x)",
+        f"parse_recipe_list_string (one call):  {count / fast_list:,.0f} recipes/s ({by_hand / fast_list:.1f}x)",
+    ]
@@ -0,0 +1,42 @@
+import csv
+import json
+from collections import defaultdict
+from functools import lru_cache
+from pathlib import Path
+from django.conf import settings
+
+SAMPLES_DIR = Path(settings.BASE_DIR) / 'db_backups'
+
+
+def read_csv(name: str) -> list[dict]:
+    with open(SAMPLES_DIR / name, newline='', encoding='utf-8') as f:
+        return list(csv.DictReader(f))
+
+@lru_cache(maxsize=None)
+def sample_recipes() -> tuple[dict, ...]:
+    """The recipes in db_backups/*.csv in the shape of the Recipe model, ordered by id"""
+    ingredients = defaultdict(list)
+    for row in sorted(read_csv('ingredient_backup.csv'), key=lambda row: int(row['order'])):
+        ingredients[row['recipe_id']].append({'name': row['item'], 'quantity': row['quantity']})
+
+    steps = defaultdict(list)
+    for row in sorted(read_csv('step_backup.csv'), key=lambda row: int(row['order'])):
+        steps[row['section_id']].append({'text': row['step']})
+
+    sections = defaultdict(list)
+    for row in sorted(read_csv('section_backup.csv'), key=lambda row: int(row['order'])):
+        sections[row['recipe_id']].append({'section_title': row['title'], 'steps': steps[row['id']]})
+
+    return tuple(
+        {
+            'title': row['title'],
+            'description': row['description'],
+            'servings': int(row['servings']),
+            'ingredients': ingredients[row['id']],
+            'instructions': sections[row['id']],
+        }
+        for row in sorted(read_csv('recipe_backup.csv'), key=lambda row: int(row['id']))
+    )
+
+def sample_recipe_strings() -> list[str]:
+    return [json.dumps(recipe) for recipe in sample_recipes()]
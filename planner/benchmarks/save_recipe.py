@@ -0,0 +1,52 @@
+import time
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from planner.models import Recipe as DBRecipe
+from planner.models import Ingredient as DBIngredient
+from planner.models import InstructionSection as DBInstructionSection
+from planner.models import InstructionStep as DBInstructionStep
+from planner.services.recipe_parser import parse_recipe_list_string
+from planner.services.recipe_repository import save_recipe_to_db, save_recipes_to_db
+from . import register
+from .samples import sample_recipe_strings
+
+
+def save_recipe_row_by_row(recipe, user=None, status='published'):
+    """The previous RecipeRepository.save_recipe: one INSERT per row, no transaction"""
+    db_recipe = DBRecipe.objects.create(status=status, title=recipe.title, servings=recipe.servings,
+                                        description=recipe.description, created_by=user)
+    for i, ing in enumerate(recipe.ingredients, 1):
+        DBIngredient.objects.create(recipe=db_recipe, name=ing.name, quantity=ing.quantity, order=i)
+    for i, section in enumerate(recipe.instructions, 1):
+        db_section = DBInstructionSection.objects.create(recipe=db_recipe, title=section.section_title, order=i)
+        for j, step in enumerate(section.steps, 1):
+            DBInstructionStep.objects.create(section=db_section, text=step.text, order=j)
+    return db_recipe
+
+def measure(save) -> tuple[float, int]:
+    """Wall time and query count of save(user), rolled back afterwards"""
+    with transaction.atomic():
+        user = User.objects.create(username='benchmark-user')
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            save(user)
+            elapsed = time.perf_counter() - started
+        transaction.set_rollback(True)
+    return elapsed, len(queries)
+
+@register('save_recipe')
+def run(copies: int = 5) -> list[str]:
+    """Recipe saves to the database, one INSERT per row vs. bulk_create per table"""
+    recipes = parse_recipe_list_string(f"[{','.join(sample_recipe_strings() * copies)}]")
+    count = len(recipes)
+
+    results = [
+        ('Row by row (previous)', measure(lambda user: [save_recipe_row_by_row(r, user) for r in recipes])),
+        ('save_recipe_to_db (bulk per recipe)', measure(lambda user: [save_recipe_to_db(r, user) for r in recipes])),
+        ('save_recipes_to_db (one batch)', measure(lambda user: save_recipes_to_db(recipes, user))),
+    ]
+    lines = [f"{count} recipes on {connection.vendor}"]
+    for label, (elapsed, queries) in results:
+        lines.append(f"{label}: {queries / count:.1f} queries/recipe ({queries} total), {count / elapsed:,.0f} recipes/s")
+    return lines
@@ -0,0 +1,41 @@
+import itertools
+from planner.services.scale_recipe import scale_quantity
+from planner.services.scaling_engine import compile_quantity, scale_ingredients
+from . import best_of, register
+from .samples import sample_recipes
+
+
+@register('scale_recipe')
+def run(size: int = 10_000) -> list[str]:
+    """Ingredient scaling throughput, scale_quantity per ingredient vs. the scaling engine"""
+    corpus = [(ing['name'], ing['quantity']) for recipe in sample_recipes() for ing in recipe['ingredients']]
+    ingredients = list(itertools.islice(itertools.cycle(corpus), size))
+
+    # Both paths must agree before timing them
+    expected = [scale_quantity(quantity, name, 4, 6)[::-1] for name, quantity in ingredients]
+    assert [tuple(i) for i in scale_ingredients(ingredients, 4, 6)] == expected
+
+    per_ingredient = best_of(lambda: [scale_quantity(quantity, name, 4, 6) for name, quantity in ingredients])
+
+    def cold():
+        compile_quantity.cache_clear()
+        scale_ingredients(ingredients, 4, 6)
+    engine_cold = best_of(cold)
+    engine = best_of(lambda: scale_ingredients(ingredients, 4, 6))
+
+    # Worst case: every quantity distinct
+    distinct = [(name, f"{quantity} #{i}") for i, (name, quantity) in enumerate(ingredients)]
+    distinct_per_ingredient = best_of(lambda: [scale_quantity(quantity, name, 4, 6) for name, quantity in distinct])
+    def distinct_cold():
+        compile_quantity.cache_clear()
+        scale_ingredients(distinct, 4, 6)
+    distinct_engine = best_of(distinct_cold)
+
+    return [
+        f"{size:,} ingredients ({len({q for _, q in corpus})} distinct quantities)",
+        f"scale_quantity per ingredient: {size / per_ingredient:,.0f} ingredients/s",
+        f"scale_ingredients, cold:       {size / engine_cold:,.0f} ingredients/s ({per_ingredient / engine_cold:.1f}x)",
+        f"scale_ingredients, compiled:   {size / engine:,.0f} ingredients/s ({per_ingredient / engine:.1f}x)",
+        f"All quantities distinct: scale_quantity {size / distinct_per_ingredient:,.0f}/s, "
+        f"scale_ingredients (cold) {size / distinct_engine:,.0f}/s ({distinct_per_ingredient / distinct_engine:.1f}x)",
+    ]
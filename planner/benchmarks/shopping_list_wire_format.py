@@ -0,0 +1,50 @@
+import random
+from planner.services.ingredient_categories import CATEGORY_LABELS
+from planner.services.local_llm import build_shopping_list
+from planner.services.shopping_aggregation import estimate_tokens
+from planner.services.shopping_list_generator import (
+    ShoppingList, ShoppingListRows, aggregate_shopping_list, from_wire_rows, load_recipe_shopping_items, to_wire_rows,
+)
+from . import best_of, register
+from .samples import sample_recipes
+
+# Rough gpt-4o decode rate, for turning saved output tokens into response time; input tokens cost far less
+OUTPUT_TOKENS_PER_SECOND = 60
+
+
+def encodings(items) -> tuple[str, str, str, str]:
+    """(old prompt list, old response, compact prompt rows, compact response) for one recipe's items"""
+    rows = to_wire_rows(items)
+    response = ShoppingListRows(**build_shopping_list(rows, random.Random(0)))
+    old_response = ShoppingList(items=[
+        item.model_copy(update={'category': CATEGORY_LABELS.get(item.category, item.category)})
+        for item in from_wire_rows(response.rows, items)
+    ])
+    return str(items), old_response.model_dump_json(), rows, response.model_dump_json()
+
+
+@register('shopping_list_wire_format')
+def run(plans: int = 100) -> list[str]:
+    """Tokens of the shopping items sent to and returned by the model, as pydantic reprs and JSON vs. compact rows"""
+    recipes = [
+        aggregate_shopping_list(load_recipe_shopping_items(recipe_id, [(ing['name'], ing['quantity']) for ing in recipe['ingredients']]))[0]
+        for recipe_id, recipe in enumerate(sample_recipes(), start=1)
+    ]
+
+    lines = []
+    # Each recipe is normalized by its own call, see normalize_recipes
+    for label, plan in [("One week (7 recipes)", recipes[:7]), (f"All {len(recipes)} sample recipes", recipes)]:
+        totals = [sum(estimate_tokens(text) for text in texts) for texts in zip(*(encodings(items) for items in plan))]
+        old_in, old_out, new_in, new_out = totals
+        saved_seconds = (old_out - new_out) / OUTPUT_TOKENS_PER_SECOND
+        lines.append(
+            f"{label}: input {old_in:,} -> {new_in:,} tokens ({1 - new_in / old_in:.0%} fewer), "
+            f"output {old_out:,} -> {new_out:,} tokens ({1 - new_out / old_out:.0%} fewer), "
+            f"~{saved_seconds:.1f}s less generation at {OUTPUT_TOKENS_PER_SECOND} tokens/s "
+            f"(~{saved_seconds / len(plan):.2f}s per call)"
+        )
+
+    week = recipes[:7]
+    elapsed = best_of(lambda: [[to_wire_rows(items) for items in week] for _ in range(plans)])
+    lines.append(f"to_wire_rows: {plans / elapsed:,.0f} weekly plans/s")
+    return lines
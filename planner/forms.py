@@ -58,6 +58,14 @@ class CreateRecipeForm(forms.Form):
         })
     )
 
+    force_new = forms.BooleanField(
+        label="Generate a new recipe even if I already have this dish for a different number of servings",
+        required=False,
+        widget=forms.CheckboxInput(attrs={
+            'class': 'rounded border-gray-300 text-violet-600'
+        })
+    )
+
 class AddShoppingItemForm(forms.Form):
     name = forms.CharField(
         label="Item",
@@ -0,0 +1,22 @@
+import time
+from django.core.management.base import BaseCommand
+from planner.models import Ingredient
+from planner.services.recipe_repository import backfill_parsed_quantities
+
+class Command(BaseCommand):
+    help = 'Parses ingredient quantities into amount, unit and modifier for rows saved before they were parsed.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Reparse every ingredient, e.g. after improving the parser')
+        parser.add_argument('--batch-size', type=int, default=2000, help='Ingredients updated per query')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        ingredients = Ingredient.objects.all() if options['all'] else None
+        updated = backfill_parsed_quantities(ingredients, batch_size=options['batch_size'])
+
+        unparsed = Ingredient.objects.filter(amount_numerator__isnull=True).count()
+        self.stdout.write(self.style.SUCCESS(
+            f"Parsed {updated} ingredient quantities in {time.perf_counter() - started:.1f}s; "
+            f"{unparsed} have no single amount (e.g. 'to taste')"
+        ))
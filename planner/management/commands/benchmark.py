@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand, CommandError
+from planner.benchmarks import BENCHMARKS, load_benchmarks
+
+class Command(BaseCommand):
+    help = 'Runs micro-benchmarks for hot code paths (see planner/benchmarks/).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('names', nargs='*', help='Benchmarks to run (default: all)')
+
+    def handle(self, *args, **options):
+        load_benchmarks()
+        names = options['names'] or sorted(BENCHMARKS)
+        unknown = [name for name in names if name not in BENCHMARKS]
+        if unknown:
+            raise CommandError(f"Unknown benchmark(s) {', '.join(unknown)}; available: {', '.join(sorted(BENCHMARKS))}")
+
+        for name in names:
+            self.stdout.write(self.style.SUCCESS(f"{name}: {BENCHMARKS[name].__doc__}"))
+            for line in BENCHMARKS[name]():
+                self.stdout.write(f"  {line}")
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, Sum
+from planner.models import LLMCacheEntry
+from planner.services.llm_cache import clear_cache, evict, get_cache_stats
+
+class Command(BaseCommand):
+    help = 'Shows LLM response cache hit, miss and eviction counters.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--evict', action='store_true', help='Remove expired and over-budget entries first')
+        parser.add_argument('--clear', type=str, nargs='?', const='', default=None,
+                            help='Delete all cached responses (optionally only one namespace)')
+
+    def handle(self, *args, **options):
+        if options['clear'] is not None:
+            deleted = clear_cache(options['clear'] or None)
+            self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} cached response(s)"))
+
+        if options['evict']:
+            evicted = evict()
+            self.stdout.write(self.style.SUCCESS(f"Evicted {evicted} cached response(s)"))
+
+        usage = LLMCacheEntry.objects.aggregate(entries=Count('id'), total_bytes=Sum('size'))
+        self.stdout.write(f"Entries: {usage['entries']}, size: {(usage['total_bytes'] or 0) / 1024:.1f} KiB")
+
+        for row in get_cache_stats():
+            self.stdout.write(
+                f"- {row['namespace']}: {row['hits']} hits, {row['misses']} misses, "
+                f"{row['evictions']} evictions, hit rate {row['hit_rate']:.0%}"
+            )
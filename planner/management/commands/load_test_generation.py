@@ -0,0 +1,81 @@
+import statistics
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import override_settings
+from planner.models import Recipe
+from planner.services.llm_client import reset_llm_client
+from planner.services.recipe_generator import generate_recipe
+from planner.services.recipe_parser import parse_recipe_string
+from planner.services.recipe_repository import save_recipe_to_db
+
+class Command(BaseCommand):
+    help = 'Measures the generate -> parse -> save recipe pipeline offline against the local LLM stand-in.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=50, help='Number of recipes to generate')
+        parser.add_argument('--concurrency', type=int, default=8, help='Concurrent generations')
+        parser.add_argument('--latency', type=float, default=2.0, help='Local LLM seconds per call')
+        parser.add_argument('--jitter', type=float, default=0.5, help='Local LLM +/- seconds')
+        parser.add_argument('--error-rate', type=float, default=0.0, help='Local LLM share of failing calls')
+        parser.add_argument('--keep', action='store_true', help='Keep the generated recipes instead of deleting them')
+        parser.add_argument('--user', help='Username to save the recipes as (default: a throwaway user)')
+
+    def handle(self, *args, **options):
+        if options['user']:
+            try:
+                user = User.objects.get(username=options['user'])
+            except User.DoesNotExist:
+                raise CommandError(f"User '{options['user']}' does not exist")
+        else:
+            user = User.objects.create_user(username=f"load-test-{uuid.uuid4().hex[:8]}")
+        local_llm = {
+            'LATENCY': options['latency'],
+            'JITTER': options['jitter'],
+            'ERROR_RATE': options['error_rate'],
+            'PROMPT_TOKENS': None,
+            'COMPLETION_TOKENS': None,
+            'FIXTURES_DIR': None,
+            'SEED': 0,
+        }
+
+        def generate_one(i):
+            started = time.perf_counter()
+            try:
+                recipe_str = generate_recipe(dish_idea=f"Load test dish {i}", servings=4, use_cache=False)
+                recipe = save_recipe_to_db(parse_recipe_string(recipe_str), user=user, status='draft')
+                return time.perf_counter() - started, recipe.id, None
+            except Exception as e:
+                return time.perf_counter() - started, None, e
+            finally:
+                connection.close()
+
+        with override_settings(LLM_PROVIDER='local', LOCAL_LLM=local_llm):
+            reset_llm_client()
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=options['concurrency']) as executor:
+                results = list(executor.map(generate_one, range(options['requests'])))
+            elapsed = time.perf_counter() - started
+        reset_llm_client()
+
+        latencies = sorted(latency for latency, _, error in results if error is None)
+        recipe_ids = [recipe_id for _, recipe_id, _ in results if recipe_id]
+        errors = [error for _, _, error in results if error is not None]
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(latencies)}/{options['requests']} succeeded in {elapsed:.2f}s "
+            f"({len(latencies) / elapsed:.2f} recipes/s at concurrency {options['concurrency']})"
+        ))
+        if latencies:
+            p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+            self.stdout.write(f"Latency p50 {statistics.median(latencies):.2f}s, p95 {p95:.2f}s, max {latencies[-1]:.2f}s")
+        if errors:
+            self.stdout.write(self.style.WARNING(f"{len(errors)} failed, e.g. {errors[0]}"))
+
+        if not options['keep']:
+            Recipe.objects.filter(id__in=recipe_ids).delete()
+            if not options['user']:
+                user.delete()
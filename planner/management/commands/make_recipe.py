@@ -1,49 +1,140 @@
-from django.core.management.base import BaseCommand
+import sys
+import time
+from django.core.management.base import BaseCommand, CommandError
 from django.contrib.auth.models import User
+from planner.services.batch_generation import BatchItem, Checkpoint, read_batch, run_batch
 from planner.services.recipe_generator import generate_recipe
 from planner.services.recipe_parser import parse_recipe_string
 from planner.services.recipe_repository import save_recipe_to_db
 from planner.services.recipe_to_file import save_recipe_to_file
 
 class Command(BaseCommand):
-    help = 'Generates a recipe using OpenAI and saves it to database and/or file.'
+    help = 'Generates a recipe (or a batch of recipes) using OpenAI and saves it to database and/or file.'
 
     def add_arguments(self, parser):
-        parser.add_argument('dish_idea', type=str, help='Description of the dish')
+        parser.add_argument('dish_idea', type=str, nargs='?', help='Description of the dish')
         parser.add_argument('--notes', type=str, default='', help='Additional notes or requirements')
         parser.add_argument('--preferences', type=str, default='', help='Dietary preferences')
         parser.add_argument('--servings', type=int, default=4, help='Number of servings')
-        parser.add_argument('--units', type=str, default='metric', choices=['metric', 'imperial'], 
+        parser.add_argument('--units', type=str, default='metric', choices=['metric', 'imperial'],
                           help='Measurement units to use')
         parser.add_argument('--db', action='store_true', help='Save recipe to database')
         parser.add_argument('--file', action='store_true', help='Save recipe as JSON to static files')
 
+        # Batch mode
+        parser.add_argument('--batch', type=str,
+                            help='File with one dish idea (or JSON object of options) per line, or - for stdin')
+        parser.add_argument('--concurrency', type=int, default=4, help='Recipes generated at the same time')
+        parser.add_argument('--rate', type=float, help='Maximum recipes started per second')
+        parser.add_argument('--checkpoint', type=str,
+                            help='File recording finished dish ideas, to resume an interrupted batch '
+                                 '(defaults to <batch file>.checkpoint)')
+
 
     def handle(self, *args, **options):
-        recipe_str = generate_recipe(
+        if options['batch']:
+            return self.handle_batch(options)
+        if not options['dish_idea']:
+            raise CommandError("Provide a dish idea, or --batch with a file of dish ideas")
+
+        item = BatchItem(
             dish_idea=options['dish_idea'],
             notes=options['notes'],
             dietary_preferences=options['preferences'],
             servings=options['servings'],
-            units=options['units']
+            units=options['units'],
         )
+        parsed_recipe, db_recipe, file_path = self.make_recipe(item, options)
 
-        parsed_recipe = parse_recipe_string(recipe_str)
-        
         # Print the generated dish name
         self.stdout.write(self.style.SUCCESS(f"Generated recipe: {parsed_recipe.title}"))
-        
+
+        if db_recipe:
+            self.stdout.write(self.style.SUCCESS(
+                f"Saved recipe to database with ID: {db_recipe.id}"
+            ))
+
+        if file_path:
+            self.stdout.write(self.style.SUCCESS(
+                f"Saved recipe to file at {file_path}"
+            ))
+
+    def make_recipe(self, item: BatchItem, options):
+        recipe_str = generate_recipe(
+            dish_idea=item.dish_idea,
+            notes=item.notes,
+            dietary_preferences=item.dietary_preferences,
+            servings=item.servings,
+            units=item.units
+        )
+        parsed_recipe = parse_recipe_string(recipe_str)
+
         # Save to database if requested
+        db_recipe = None
         if options['db']:
             user = User.objects.get(username='admin')
             db_recipe = save_recipe_to_db(parsed_recipe, status='published', user=user)
-            self.stdout.write(self.style.SUCCESS(
-                f"Saved recipe to database with ID: {db_recipe.id}"
-            ))
 
         # Save to file if requested
-        if options['file']:                            
+        file_path = None
+        if options['file']:
             file_path = save_recipe_to_file(parsed_recipe)
-            self.stdout.write(self.style.SUCCESS(
-                f"Saved recipe to file at {file_path}"
-            ))                    
\ No newline at end of file
+
+        return parsed_recipe, db_recipe, file_path
+
+    def handle_batch(self, options):
+        defaults = {
+            'notes': options['notes'],
+            'dietary_preferences': options['preferences'],
+            'servings': options['servings'],
+            'units': options['units'],
+        }
+        if options['batch'] == '-':
+            items = read_batch(sys.stdin, **defaults)
+            checkpoint_path = options['checkpoint']
+        else:
+            with open(options['batch']) as f:
+                items = read_batch(f, **defaults)
+            checkpoint_path = options['checkpoint'] or f"{options['batch']}.checkpoint"
+
+        checkpoint = Checkpoint(checkpoint_path) if checkpoint_path else None
+        skipped = sum(1 for item in items if checkpoint and item in checkpoint)
+        if skipped:
+            self.stdout.write(f"Resuming: {skipped} of {len(items)} dish ideas already done")
+
+        total = len(items) - skipped
+        finished = []
+        started = time.perf_counter()
+
+        def report(result):
+            finished.append(result)
+            elapsed = time.perf_counter() - started
+            failed = sum(1 for r in finished if r.error)
+            average = sum(r.latency for r in finished) / len(finished)
+            self.stdout.write(
+                f"\r[{len(finished)}/{total}] {len(finished) / elapsed:.2f} recipes/s, "
+                f"last {result.latency:.1f}s, avg {average:.1f}s, {failed} failed",
+                ending='',
+            )
+            self.stdout.flush()
+            if result.error:
+                self.stderr.write(f"\nFailed '{result.item.dish_idea}': {result.error}")
+
+        results = run_batch(
+            items,
+            lambda item: self.make_recipe(item, options),
+            concurrency=options['concurrency'],
+            rate=options['rate'],
+            checkpoint=checkpoint,
+            on_result=report,
+        )
+
+        succeeded = [r for r in results if r.error is None]
+        self.stdout.write('')
+        self.stdout.write(self.style.SUCCESS(
+            f"Generated {len(succeeded)} of {total} recipes in {time.perf_counter() - started:.1f}s"
+        ))
+        if len(succeeded) < total:
+            self.stdout.write(self.style.WARNING(
+                f"{total - len(succeeded)} failed; run the same command again to retry them"
+            ))
@@ -0,0 +1,34 @@
+from datetime import date, timedelta
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from planner.models import LLMCall
+from planner.services.llm_telemetry import rollup_llm_calls
+
+class Command(BaseCommand):
+    help = 'Rolls up recorded LLM calls into daily per-flow latency, token and cost stats.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', type=date.fromisoformat, help='Day to roll up (YYYY-MM-DD), defaults to yesterday')
+        parser.add_argument('--days', type=int, default=1, help='Number of days to roll up, ending on --date')
+        parser.add_argument('--prune-days', type=int, help='Delete raw call records older than this many days')
+
+    def handle(self, *args, **options):
+        end_date = options['date'] or timezone.localdate() - timedelta(days=1)
+
+        for offset in reversed(range(options['days'])):
+            day = end_date - timedelta(days=offset)
+            rows = rollup_llm_calls(day)
+            self.stdout.write(self.style.SUCCESS(f"{day}: {sum(row.calls for row in rows)} call(s) in {len(rows)} flow(s)"))
+
+            for row in sorted(rows, key=lambda row: row.cost_usd, reverse=True):
+                self.stdout.write(
+                    f"- {row.operation} ({row.model}, {row.view or '-'}): {row.calls} calls, "
+                    f"{row.errors} errors, {row.cache_hits} cache hits, {row.retries} retries, "
+                    f"avg {row.avg_duration_ms} ms, p95 {row.p95_duration_ms} ms, "
+                    f"{row.prompt_tokens + row.completion_tokens} tokens, ${row.cost_usd:.4f}"
+                )
+
+        if options['prune_days'] is not None:
+            cutoff = timezone.now() - timedelta(days=options['prune_days'])
+            deleted, _ = LLMCall.objects.filter(created_at__lt=cutoff).delete()
+            self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} call record(s) older than {options['prune_days']} days"))
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from planner.services.local_llm import LocalLLMEngine, make_local_llm_server
+
+class Command(BaseCommand):
+    help = 'Serves the local deterministic LLM stand-in over an OpenAI-compatible HTTP API.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', type=str, default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--latency', type=float, help='Seconds per call (defaults to LOCAL_LLM setting)')
+        parser.add_argument('--jitter', type=float, help='+/- seconds of random latency')
+        parser.add_argument('--error-rate', type=float, help='Share of calls failing with 429/5xx')
+
+    def handle(self, *args, **options):
+        overrides = {
+            name: options[name]
+            for name in ['latency', 'jitter', 'error_rate']
+            if options[name] is not None
+        }
+        engine = LocalLLMEngine.from_settings(**overrides)
+        server = make_local_llm_server(engine, options['host'], options['port'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Local LLM listening on http://{options['host']}:{options['port']}/v1 "
+            f"(latency {engine.latency}s ± {engine.jitter}s, error rate {engine.error_rate:.0%})"
+        ))
+        self.stdout.write(f"Point the app at it with OPENAI_BASE_URL=http://{options['host']}:{options['port']}/v1")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            server.server_close()
@@ -0,0 +1,55 @@
+import threading
+import time
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+from planner.services.generation_jobs import default_worker_id, process_available_jobs, requeue_stale_jobs
+
+class Command(BaseCommand):
+    help = 'Runs queued generation jobs (recipes) in the background.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=2, help='Number of jobs to run concurrently')
+        parser.add_argument('--poll-interval', type=float, default=1.0, help='Seconds to sleep when the queue is empty')
+        parser.add_argument('--once', action='store_true', help='Drain the queue once and exit')
+
+    def handle(self, *args, **options):
+        worker_id = default_worker_id()
+        requeued = requeue_stale_jobs()
+        if requeued:
+            self.stdout.write(f"Requeued {requeued} stale job(s)")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Worker {worker_id} started with {options['threads']} thread(s)"
+        ))
+
+        threads = [
+            threading.Thread(
+                target=self.work,
+                args=(f"{worker_id}:{i}", options['poll_interval'], options['once']),
+                daemon=True,
+            )
+            for i in range(options['threads'])
+        ]
+        for thread in threads:
+            thread.start()
+
+        try:
+            for thread in threads:
+                while thread.is_alive():
+                    thread.join(timeout=1)
+        except KeyboardInterrupt:
+            self.stdout.write("Worker stopped")
+
+    def work(self, worker_id: str, poll_interval: float, once: bool):
+        try:
+            while True:
+                close_old_connections()
+                processed = process_available_jobs(worker_id)
+                if processed:
+                    self.stdout.write(f"[{worker_id}] Ran {processed} job(s)")
+                if once:
+                    return
+                if not processed:
+                    time.sleep(poll_interval)
+        finally:
+            connection.close()
@@ -1,9 +1,8 @@
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 from django.core.management.color import color_style
-from planner.services.recipe_parser import parse_recipe_file
-from planner.services.recipe_repository import save_recipe_to_db
+from django.contrib.auth.models import User
+from planner.services.recipe_import import import_recipe_files
 from pathlib import Path
-from planner.models import Recipe
 
 class Command(BaseCommand):
     help = 'Saves all static recipes to the database'
@@ -12,25 +11,44 @@ class Command(BaseCommand):
         super().__init__(*args, **kwargs)
         self.style = color_style()
 
+    def add_arguments(self, parser):
+        parser.add_argument('--dir', type=str, help='Directory of recipe JSON files (defaults to the static recipes)')
+        parser.add_argument('--user', type=str, default='admin', help='Username the recipes are created by')
+        parser.add_argument('--update', action='store_true', help='Overwrite recipes whose title already exists if their servings, ingredients, description or instructions changed')
+        parser.add_argument('--dry-run', action='store_true', help='Parse and report what would be saved without writing')
+        parser.add_argument('--workers', type=int, help='Parser processes (defaults to the number of CPUs)')
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Recipes saved per transaction')
+
     def get_recipe_dir(self) -> Path:
         return Path(__file__).parent.parent.parent / 'static' / 'planner' / 'recipes'
 
     def handle(self, *args, **options):
-        recipe_dir = self.get_recipe_dir()
-        
+        recipe_dir = Path(options['dir']) if options['dir'] else self.get_recipe_dir()
+
         # Get all .json files in the recipes directory
-        recipe_files = recipe_dir.glob('*.json')
-        
-        for recipe_file in recipe_files:
-
-            recipe = parse_recipe_file(recipe_file)
-            
-            # Check if recipe already exists
-            if Recipe.objects.filter(title=recipe.title).exists():
-                self.stdout.write(f"Skipping existing recipe: {recipe.title}")
-                continue
-            
-            save_recipe_to_db(recipe, status='published')
-            self.stdout.write(
-                self.style.SUCCESS(f"Successfully saved recipe: {recipe_file.name}")
-            )
+        recipe_files = sorted(recipe_dir.glob('*.json'))
+
+        try:
+            user = User.objects.get(username=options['user'])
+        except User.DoesNotExist:
+            raise CommandError(f"User '{options['user']}' does not exist")
+
+        result = import_recipe_files(
+            recipe_files,
+            user,
+            workers=options['workers'],
+            status='published',
+            update=options['update'],
+            dry_run=options['dry_run'],
+            chunk_size=options['chunk_size'],
+        )
+
+        for parsed in result.failed:
+            self.stderr.write(self.style.ERROR(f"Failed to parse {parsed.path.name}: {parsed.error}"))
+
+        summary = (f"{result.created} created, {result.updated} updated, {result.unchanged} unchanged, "
+                   f"{result.skipped} skipped as existing, {len(result.failed)} failed")
+        if options['dry_run']:
+            summary = f"Dry run, nothing saved: {summary}"
+        self.stdout.write(self.style.SUCCESS(summary))
+        self.stdout.write(f"{result.files} files in {result.elapsed:.2f}s ({result.files_per_second:,.0f} files/s)")
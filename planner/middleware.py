@@ -1,5 +1,6 @@
 from django.shortcuts import redirect
 from django.urls import resolve, Resolver404
+from planner.services.llm_telemetry import call_origin, get_call_origin, iterate_with_call_origin, set_call_origin
 
 class LoginRequiredMiddleware:
     def __init__(self, get_response):
@@ -32,4 +33,23 @@ class LoginRequiredMiddleware:
             pass
 
         response = self.get_response(request)
-        return response
\ No newline at end of file
+        return response
+
+
+class LLMTelemetryMiddleware:
+    """Attributes LLM calls to the URL name of the view and the user that triggered them"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with call_origin('', None):
+            response = self.get_response(request)
+            origin = get_call_origin()
+
+        if response.streaming:
+            response.streaming_content = iterate_with_call_origin(response.streaming_content, *origin)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        set_call_origin(request.resolver_match.view_name, getattr(request, 'user', None))
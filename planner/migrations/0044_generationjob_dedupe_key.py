@@ -0,0 +1,18 @@
+# Generated by Django 5.1.3 on 2026-10-18 19:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('planner', '0043_llm_cache'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='generationjob',
+            name='dedupe_key',
+            field=models.CharField(blank=True, db_index=True, max_length=64),
+        ),
+    ]
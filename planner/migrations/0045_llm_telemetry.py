@@ -0,0 +1,66 @@
+# Generated by Django 5.1.3 on 2026-10-18 20:07
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('planner', '0044_generationjob_dedupe_key'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LLMCallDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('operation', models.CharField(max_length=50)),
+                ('model', models.CharField(max_length=50)),
+                ('view', models.CharField(blank=True, max_length=100)),
+                ('calls', models.PositiveIntegerField(default=0)),
+                ('errors', models.PositiveIntegerField(default=0)),
+                ('cache_hits', models.PositiveIntegerField(default=0)),
+                ('retries', models.PositiveIntegerField(default=0)),
+                ('avg_duration_ms', models.PositiveIntegerField(default=0)),
+                ('p95_duration_ms', models.PositiveIntegerField(default=0)),
+                ('avg_ttfb_ms', models.PositiveIntegerField(blank=True, null=True)),
+                ('prompt_tokens', models.PositiveBigIntegerField(default=0)),
+                ('completion_tokens', models.PositiveBigIntegerField(default=0)),
+                ('cost_usd', models.DecimalField(decimal_places=6, default=0, max_digits=12)),
+            ],
+            options={
+                'verbose_name_plural': 'LLM call daily stats',
+                'ordering': ['-date', '-cost_usd'],
+                'constraints': [models.UniqueConstraint(fields=('date', 'operation', 'model', 'view'), name='unique_llm_call_daily_stats')],
+            },
+        ),
+        migrations.CreateModel(
+            name='LLMCall',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('operation', models.CharField(max_length=50)),
+                ('model', models.CharField(max_length=50)),
+                ('prompt_version', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('status', models.CharField(choices=[('ok', 'OK'), ('error', 'Error')], default='ok', max_length=10)),
+                ('cache_status', models.CharField(choices=[('hit', 'Hit'), ('miss', 'Miss')], default='miss', max_length=10)),
+                ('duration_ms', models.PositiveIntegerField()),
+                ('ttfb_ms', models.PositiveIntegerField(blank=True, null=True)),
+                ('prompt_tokens', models.PositiveIntegerField(default=0)),
+                ('completion_tokens', models.PositiveIntegerField(default=0)),
+                ('cost_usd', models.DecimalField(decimal_places=6, default=0, max_digits=10)),
+                ('retries', models.PositiveSmallIntegerField(default=0)),
+                ('view', models.CharField(blank=True, max_length=100)),
+                ('error', models.CharField(blank=True, max_length=255)),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='llm_calls', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['created_at'], name='planner_llm_created_f9447f_idx')],
+            },
+        ),
+    ]
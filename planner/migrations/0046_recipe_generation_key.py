@@ -0,0 +1,18 @@
+# Generated by Django 5.1.3 on 2026-10-18 20:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('planner', '0045_llm_telemetry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='generation_key',
+            field=models.CharField(blank=True, db_index=True, max_length=64),
+        ),
+    ]
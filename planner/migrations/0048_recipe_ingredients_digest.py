@@ -0,0 +1,48 @@
+# Generated by Django 5.1.3 on 2026-10-18 20:24
+
+import hashlib
+import json
+
+from django.db import migrations, models
+
+
+# Frozen copy of planner.services.digest.ingredients_digest as of this migration
+def ingredients_digest(servings, ingredients):
+    data_string = json.dumps({
+        'servings': servings,
+        'ingredients': [[name, quantity] for name, quantity in ingredients],
+    }, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(data_string.encode()).hexdigest()
+
+
+def backfill_ingredients_digests(apps, schema_editor):
+    Recipe = apps.get_model('planner', 'Recipe')
+    Ingredient = apps.get_model('planner', 'Ingredient')
+
+    recipes = list(Recipe.objects.only('id', 'servings'))
+    ingredients = {}
+    for recipe_id, name, quantity in Ingredient.objects.order_by('recipe_id', 'order').values_list('recipe_id', 'name', 'quantity').iterator():
+        ingredients.setdefault(recipe_id, []).append((name, quantity))
+    for recipe in recipes:
+        recipe.ingredients_digest = ingredients_digest(recipe.servings, ingredients.get(recipe.id, []))
+    Recipe.objects.bulk_update(recipes, ['ingredients_digest'], batch_size=1000)
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('planner', '0047_recipe_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='ingredients_digest',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='shoppinglist',
+            name='content_digest',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+        migrations.RunPython(backfill_ingredients_digests, migrations.RunPython.noop),
+    ]
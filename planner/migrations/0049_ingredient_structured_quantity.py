@@ -0,0 +1,33 @@
+# Generated by Django 5.1.3 on 2026-10-18 20:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('planner', '0048_recipe_ingredients_digest'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ingredient',
+            name='amount_denominator',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='ingredient',
+            name='amount_numerator',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='ingredient',
+            name='modifier',
+            field=models.CharField(blank=True, max_length=50),
+        ),
+        migrations.AddField(
+            model_name='ingredient',
+            name='unit',
+            field=models.CharField(blank=True, max_length=10),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.3 on 2026-10-18 20:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('planner', '0049_ingredient_structured_quantity'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mealplanrecipe',
+            name='servings',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+    ]
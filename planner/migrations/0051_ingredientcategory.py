@@ -0,0 +1,73 @@
+# Generated by Django 5.1.3 on 2026-10-18 20:42
+
+import re
+from collections import Counter
+from django.db import migrations, models
+
+
+# Frozen copies of the name normalization in planner.services as of this migration
+PREPARATION_WORDS = {
+    'fresh', 'freshly', 'chopped', 'diced', 'minced', 'sliced', 'grated', 'shredded', 'crushed',
+    'finely', 'roughly', 'thinly', 'peeled', 'cooked', 'steamed', 'boiled',
+}
+PARENTHETICAL_REGEX = re.compile(r'\([^()]*\)')
+
+
+def lookup_name(name):
+    return ' '.join(name.lower().split())[:100]
+
+def singular(word):
+    if word.endswith('ies') and len(word) > 4:
+        return word[:-3] + 'y'
+    if word.endswith('oes'):
+        return word[:-2]
+    if word.endswith('s') and not word.endswith(('ss', 'us', 'is')):
+        return word[:-1]
+    return word
+
+def canonical_name(name):
+    words = PARENTHETICAL_REGEX.sub('', name).split(',')[0].split()
+    while len(words) > 1 and words[0].lower() in PREPARATION_WORDS:
+        words = words[1:]
+    words = [word.lower() for word in words]
+    return ' '.join(words[:-1] + [singular(words[-1])])[:100] if words else ''
+
+
+def seed_ingredient_categories(apps, schema_editor):
+    ShoppingItem = apps.get_model('planner', 'ShoppingItem')
+    IngredientCategory = apps.get_model('planner', 'IngredientCategory')
+
+    # The most common category each name has been given on shopping lists so far
+    counts = {}
+    for name, category in ShoppingItem.objects.values_list('name', 'category').iterator():
+        if name.strip():
+            counts.setdefault(lookup_name(name), Counter())[category] += 1
+    IngredientCategory.objects.bulk_create([
+        IngredientCategory(name=name, normalized_name=canonical_name(name), category=categories.most_common(1)[0][0])
+        for name, categories in counts.items()
+    ], batch_size=1000)
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('planner', '0050_mealplanrecipe_servings'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IngredientCategory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('normalized_name', models.CharField(db_index=True, max_length=100)),
+                ('category', models.CharField(choices=[('fruit_veg', 'Fruit & Vegetables'), ('meat_fish', 'Meat & Fish'), ('dairy', 'Dairy & Deli'), ('bakery', 'Bakery'), ('pantry', 'Pantry'), ('snacks', 'Snacks'), ('frozen', 'Frozen'), ('drinks', 'Drinks'), ('non_food', 'Non-food')], max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('modified_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'ingredient categories',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.RunPython(seed_ingredient_categories, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.1.3 on 2026-10-18 21:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_item_recipes(apps, schema_editor):
+    # Items merged from several recipes before this have no recipe to backfill, and are kept by syncs like items added by the user
+    ShoppingItem = apps.get_model('planner', 'ShoppingItem')
+    ItemRecipes = ShoppingItem.recipes.through
+    ItemRecipes.objects.bulk_create([
+        ItemRecipes(shoppingitem_id=item_id, recipe_id=recipe_id)
+        for item_id, recipe_id in ShoppingItem.objects.filter(recipe__isnull=False).values_list('id', 'recipe_id').iterator()
+    ], batch_size=1000)
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('planner', '0051_ingredientcategory'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='shoppingitem',
+            name='recipes',
+            field=models.ManyToManyField(blank=True, related_name='+', to='planner.recipe'),
+        ),
+        migrations.AddField(
+            model_name='shoppinglist',
+            name='meal_plan',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='shopping_lists', to='planner.mealplan'),
+        ),
+        migrations.RunPython(backfill_item_recipes, migrations.RunPython.noop),
+    ]
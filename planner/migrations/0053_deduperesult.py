@@ -0,0 +1,34 @@
+# Generated by Django 5.1.3 on 2026-10-18 21:42
+
+from django.db import migrations, models
+
+
+def remove_dedupe_entries_from_llm_cache(apps, schema_editor):
+    # Draft ids and shopping list uuids were shared through the LLM response cache before DedupeResult
+    namespaces = ['recipe_draft', 'shopping_list_action']
+    apps.get_model('planner', 'LLMCacheEntry').objects.filter(namespace__in=namespaces).delete()
+    apps.get_model('planner', 'LLMCacheStats').objects.filter(namespace__in=namespaces).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('planner', '0052_shoppinglist_meal_plan_shoppingitem_recipes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DedupeResult',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('namespace', models.CharField(max_length=50)),
+                ('key', models.CharField(max_length=64)),
+                ('result', models.TextField()),
+                ('expires_at', models.DateTimeField(db_index=True)),
+            ],
+            options={
+                'unique_together': {('namespace', 'key')},
+            },
+        ),
+        migrations.RunPython(remove_dedupe_entries_from_llm_cache, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.3 on 2026-10-18 21:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('planner', '0053_deduperesult'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='shoppinglist',
+            name='recipe_digests',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
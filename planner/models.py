@@ -1,4 +1,6 @@
 import uuid
+from fractions import Fraction
+from django.contrib.postgres.indexes import GinIndex
 from django.db import models
 from django.contrib.auth.models import User
 from django.dispatch import receiver
@@ -78,6 +80,8 @@ class Recipe(models.Model):
     created_by = models.ForeignKey(User, on_delete=models.CASCADE)
     modified_at = models.DateTimeField(auto_now=True)
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='published')
+    generation_key = models.CharField(max_length=64, blank=True, db_index=True) # Normalized generation inputs other than servings, see recipe_reuse.py
+    ingredients_digest = models.CharField(max_length=64, blank=True) # SHA-256 of servings and ordered ingredients, kept current by RecipeRepository, see digest.py
     image = models.ImageField(upload_to=recipe_image_path, blank=True, null=True)
     image_thumb = ImageSpecField(
         source='image',
@@ -108,19 +112,46 @@ class Recipe(models.Model):
         ordering = ['-modified_at']
         indexes = [
             models.Index(fields=['created_by', 'created_at', 'status']),
+            # pg_trgm indexes for near-duplicate lookups, see similar_recipes.py
+            GinIndex(fields=['title'], name='recipe_title_trgm', opclasses=['gin_trgm_ops']),
+            GinIndex(fields=['description'], name='recipe_description_trgm', opclasses=['gin_trgm_ops']),
         ]
 
 
+MAX_AMOUNT_NUMERATOR = 2147483647 # Largest value of a PositiveIntegerField on every database backend
+MAX_AMOUNT_DENOMINATOR = 1000
+
 class Ingredient(models.Model):
     recipe = models.ForeignKey(Recipe, related_name='ingredients', on_delete=models.CASCADE)
     name = models.CharField(max_length=100)
     quantity = models.CharField(max_length=50)
+    # quantity parsed by RecipeRepository, see quantity_parser.py; no amount if it is not a single number
+    amount_numerator = models.PositiveIntegerField(null=True, blank=True)
+    amount_denominator = models.PositiveIntegerField(null=True, blank=True)
+    unit = models.CharField(max_length=10, blank=True) # Canonical, e.g. 'g', 'tbsp', 'clove'; blank for counts
+    modifier = models.CharField(max_length=50, blank=True) # e.g. 'large', 'finely chopped'
     order = models.PositiveIntegerField()
     modified_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"{self.quantity} {self.name}"
 
+    @property
+    def amount(self) -> Fraction | None:
+        if self.amount_numerator is None:
+            return None
+        return Fraction(self.amount_numerator, self.amount_denominator)
+
+    @amount.setter
+    def amount(self, value: Fraction | None):
+        # Long decimals like "0.3333333333" become 1/3; amounts too large for the columns are left unset
+        if value is not None:
+            value = value.limit_denominator(MAX_AMOUNT_DENOMINATOR)
+            if value.numerator > MAX_AMOUNT_NUMERATOR:
+                value = None
+        self.amount_numerator = value.numerator if value is not None else None
+        self.amount_denominator = value.denominator if value is not None else None
+
     class Meta:
         ordering = ['order']
         unique_together = ['recipe', 'order']
@@ -172,6 +203,7 @@ class MyRecipe(models.Model):
 class MealPlanRecipe(models.Model):
     meal_group = models.ForeignKey(MealGroup, related_name='mprs', on_delete=models.CASCADE) # Deletes the meal plan recipe if the parent group is deleted
     recipe = models.ForeignKey(Recipe, on_delete=models.PROTECT) # Prevents deletion of underlying recipe if it's used in a meal plan
+    servings = models.PositiveIntegerField(null=True, blank=True) # Overrides the recipe's servings in this plan, see scaling_engine.py
     modified_at = models.DateTimeField(auto_now=True)
     order = models.PositiveIntegerField()
 
@@ -191,6 +223,9 @@ class ShoppingList(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     modified_at = models.DateTimeField(auto_now=True)
     last_viewed_at = models.DateTimeField(auto_now=True)
+    content_digest = models.CharField(max_length=64, blank=True) # Digest of the meal plan contents it was generated from, see digest.py
+    recipe_digests = models.JSONField(default=dict, blank=True) # The same per planned recipe, by recipe id, so a sync re-totals only changed recipes
+    meal_plan = models.ForeignKey(MealPlan, on_delete=models.SET_NULL, blank=True, null=True, related_name='shopping_lists') # Kept in sync by shopping_list_sync.py
 
     def __str__(self):
         return f"{self.name}"
@@ -215,6 +250,7 @@ class ShoppingItem(models.Model):
     name = models.CharField(max_length=100)
     quantity = models.CharField(max_length=100, blank=True, null=True)
     recipe = models.ForeignKey(Recipe, on_delete=models.PROTECT, blank=True, null=True)
+    recipes = models.ManyToManyField(Recipe, blank=True, related_name='+') # Every recipe the item is for, none for items added by the user
     is_checked = models.BooleanField(default=False)
     modified_at = models.DateTimeField(auto_now=True)
 
@@ -224,6 +260,177 @@ class ShoppingItem(models.Model):
     class Meta:
         ordering = ['category', 'name']
 
+class IngredientCategory(models.Model):
+    """Learned shopping category of an ingredient name, see planner/services/ingredient_categories.py"""
+    name = models.CharField(max_length=100, unique=True) # Lowercased, as on shopping lists
+    normalized_name = models.CharField(max_length=100, db_index=True) # e.g. "onion" for "onions, diced"
+    category = models.CharField(max_length=20, choices=ShoppingItem.CATEGORIES)
+    created_at = models.DateTimeField(auto_now_add=True)
+    modified_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.category})"
+
+    class Meta:
+        verbose_name_plural = 'ingredient categories'
+        ordering = ['name']
+
+
+# Background generation jobs
+
+class GenerationJob(models.Model):
+    KIND_CHOICES = [
+        ('recipe', 'Recipe'),
+    ]
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('succeeded', 'Succeeded'),
+        ('failed', 'Failed'),
+    ]
+    uuid = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    payload = models.JSONField(default=dict)
+    dedupe_key = models.CharField(max_length=64, blank=True, db_index=True) # Identical active jobs are coalesced
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    recipe = models.ForeignKey(Recipe, on_delete=models.SET_NULL, blank=True, null=True) # Result of a recipe job
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    last_error = models.TextField(blank=True)
+    run_after = models.DateTimeField(default=timezone.now) # Pushed back on retry
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    modified_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    def __str__(self):
+        return f"{self.kind} job {self.uuid} ({self.status})"
+
+    @property
+    def is_finished(self):
+        return self.status in ('succeeded', 'failed')
+
+    class Meta:
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['status', 'run_after']),
+        ]
+
+
+# LLM response cache
+
+class LLMCacheEntry(models.Model):
+    key = models.CharField(max_length=64, unique=True) # SHA-256 of the normalized request inputs
+    namespace = models.CharField(max_length=50)
+    response = models.TextField()
+    size = models.PositiveIntegerField() # Bytes, used for size-based eviction
+    hit_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField()
+    last_hit_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.namespace}:{self.key[:12]}"
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['last_hit_at']),
+            models.Index(fields=['expires_at']),
+        ]
+
+class LLMCacheStats(models.Model):
+    namespace = models.CharField(max_length=50, unique=True)
+    hits = models.PositiveBigIntegerField(default=0)
+    misses = models.PositiveBigIntegerField(default=0)
+    evictions = models.PositiveBigIntegerField(default=0)
+    modified_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.namespace}: {self.hits} hits, {self.misses} misses, {self.evictions} evictions"
+
+    class Meta:
+        verbose_name_plural = 'LLM cache stats'
+
+class DedupeResult(models.Model):
+    """Result of a request shared with its duplicates for a short while, e.g. a saved draft's id, see planner/services/singleflight.py"""
+    namespace = models.CharField(max_length=50)
+    key = models.CharField(max_length=64)
+    result = models.TextField()
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"{self.namespace}:{self.key[:12]}"
+
+    class Meta:
+        unique_together = ['namespace', 'key']
+
+
+# LLM telemetry
+
+class LLMCall(models.Model):
+    """One LLM or image API call (or cache hit standing in for one), see planner/services/llm_telemetry.py"""
+    STATUSES = [
+        ('ok', 'OK'),
+        ('error', 'Error'),
+    ]
+    CACHE_STATUSES = [
+        ('hit', 'Hit'),
+        ('miss', 'Miss'),
+    ]
+
+    created_at = models.DateTimeField(default=timezone.now)
+    operation = models.CharField(max_length=50) # e.g. 'recipe', 'recipe_stream', 'shopping_list', 'image'
+    model = models.CharField(max_length=50)
+    prompt_version = models.PositiveSmallIntegerField(blank=True, null=True)
+    status = models.CharField(max_length=10, choices=STATUSES, default='ok')
+    cache_status = models.CharField(max_length=10, choices=CACHE_STATUSES, default='miss')
+    duration_ms = models.PositiveIntegerField()
+    ttfb_ms = models.PositiveIntegerField(blank=True, null=True) # Time to first byte of the response
+    prompt_tokens = models.PositiveIntegerField(default=0)
+    completion_tokens = models.PositiveIntegerField(default=0)
+    cost_usd = models.DecimalField(max_digits=10, decimal_places=6, default=0)
+    retries = models.PositiveSmallIntegerField(default=0)
+    view = models.CharField(max_length=100, blank=True) # URL name of the originating view, or e.g. 'worker:recipe'
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, blank=True, null=True, related_name='llm_calls')
+    error = models.CharField(max_length=255, blank=True)
+
+    def __str__(self):
+        return f"{self.operation} ({self.model}) {self.duration_ms} ms"
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at']),
+        ]
+
+class LLMCallDailyStats(models.Model):
+    """Daily rollup of LLMCall rows (python manage.py rollup_llm_calls)"""
+    date = models.DateField()
+    operation = models.CharField(max_length=50)
+    model = models.CharField(max_length=50)
+    view = models.CharField(max_length=100, blank=True)
+    calls = models.PositiveIntegerField(default=0)
+    errors = models.PositiveIntegerField(default=0)
+    cache_hits = models.PositiveIntegerField(default=0)
+    retries = models.PositiveIntegerField(default=0)
+    avg_duration_ms = models.PositiveIntegerField(default=0)
+    p95_duration_ms = models.PositiveIntegerField(default=0)
+    avg_ttfb_ms = models.PositiveIntegerField(blank=True, null=True)
+    prompt_tokens = models.PositiveBigIntegerField(default=0)
+    completion_tokens = models.PositiveBigIntegerField(default=0)
+    cost_usd = models.DecimalField(max_digits=12, decimal_places=6, default=0)
+
+    def __str__(self):
+        return f"{self.date} {self.operation} ({self.model}, {self.view or '-'})"
+
+    class Meta:
+        ordering = ['-date', '-cost_usd']
+        verbose_name_plural = 'LLM call daily stats'
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'operation', 'model', 'view'], name='unique_llm_call_daily_stats'),
+        ]
+
 
 
 
@@ -0,0 +1,107 @@
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Iterable
+from django.db import connection
+from .llm_cache import make_cache_key
+from .rate_limit import TokenBucket
+
+
+@dataclass
+class BatchItem:
+    dish_idea: str
+    notes: str = ''
+    dietary_preferences: str = ''
+    servings: int = 4
+    units: str = 'metric'
+
+    @property
+    def key(self) -> str:
+        """Identifies the item in the checkpoint file, insensitive to case and whitespace"""
+        return make_cache_key('recipe_batch', 1, **vars(self))
+
+@dataclass
+class BatchResult:
+    item: BatchItem
+    latency: float
+    result: object = None
+    error: Exception = None
+
+
+def read_batch(lines: Iterable[str], **defaults) -> list[BatchItem]:
+    """
+    One dish idea per line, or a JSON object with BatchItem fields to override the defaults.
+    Blank lines and lines starting with # are skipped.
+    """
+    items = []
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        if line.startswith('{'):
+            items.append(BatchItem(**{**defaults, **json.loads(line)}))
+        else:
+            items.append(BatchItem(**{**defaults, 'dish_idea': line}))
+    return items
+
+
+class Checkpoint:
+    """Append-only file of finished item keys, so an interrupted batch can resume where it stopped"""
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self.done = set(self.path.read_text().split()) if self.path.exists() else set()
+        self._lock = threading.Lock()
+
+    def __contains__(self, item: BatchItem) -> bool:
+        return item.key in self.done
+
+    def mark_done(self, item: BatchItem):
+        with self._lock:
+            self.done.add(item.key)
+            with open(self.path, 'a') as f:
+                f.write(f"{item.key}\n")
+
+
+def run_batch(
+    items: list[BatchItem],
+    process: Callable[[BatchItem], object],
+    concurrency: int = 4,
+    rate: float = None,
+    checkpoint: Checkpoint = None,
+    on_result: Callable[[BatchResult], None] = None,
+) -> list[BatchResult]:
+    """
+    Run process(item) for every item not already in the checkpoint, at most `concurrency` at a time
+    and (if given) starting at most `rate` items per second. Failed items are reported, not retried,
+    and stay out of the checkpoint so the next run picks them up again.
+    """
+    pending = [item for item in items if checkpoint is None or item not in checkpoint]
+    bucket = TokenBucket(rate, capacity=concurrency) if rate else None
+
+    def run_one(item: BatchItem) -> BatchResult:
+        if bucket:
+            bucket.acquire()
+        started = time.perf_counter()
+        try:
+            result = process(item)
+        except Exception as e:
+            return BatchResult(item, time.perf_counter() - started, error=e)
+        finally:
+            connection.close() # Each pool thread has its own DB connection
+        if checkpoint is not None:
+            checkpoint.mark_done(item)
+        return BatchResult(item, time.perf_counter() - started, result=result)
+
+    results = []
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = [executor.submit(run_one, item) for item in pending]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            if on_result:
+                on_result(result)
+    return results
@@ -1,139 +1,75 @@
-# # Recipe models
-# class Recipe(models.Model):
-#     STATUS_CHOICES = [
-#         ('draft', 'Draft'),
-#         ('published', 'Published'),
-#     ]
-#     title = models.CharField(max_length=100)
-#     servings = models.PositiveIntegerField()
-#     description = models.TextField(blank=True)
-#     created_at = models.DateTimeField(auto_now_add=True)
-#     created_by = models.ForeignKey(User, on_delete=models.CASCADE)
-#     modified_at = models.DateTimeField(auto_now=True)
-#     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='published')
-    
-#     # ingredients_digest = models.CharField(max_length=64, blank=True)
-#     saved_to_my_recipes_by = models.ManyToManyField(
-#         User,
-#         through='MyRecipe',
-#         related_name='my_recipes'
-#     )
-
-#     def __str__(self):
-#         return f"{self.title}"
-
-#     class Meta:
-#         ordering = ['-modified_at']
-#         indexes = [
-#             models.Index(fields=['created_by', 'created_at', 'status']),
-#         ]
-
-#     def get_scaled_recipe(self, new_servings: int) -> dict:
-#         """Returns a complete scaled version of the recipe."""
-#         scaled_ingredients = []
-#         for ingredient in self.ingredients.all():
-#             new_quantity, new_name = scale_quantity(
-#                 ingredient.quantity,
-#                 ingredient.name,
-#                 self.servings,
-#                 new_servings
-#             )
-#             scaled_ingredients.append({
-#                 'quantity': new_quantity,
-#                 'name': new_name,
-#                 'order': ingredient.order
-#             })
-        
-#         return {
-#             'title': self.title,
-#             'servings': new_servings,
-#             'notes': self.notes,
-#             'ingredients': scaled_ingredients,
-#             'instruction_sections': self.instruction_sections.all(),
-#         }
-
-#     def scale_and_save(self, new_servings: int):
-#         """Saves the recipe and permanently scales it to a new serving size."""
-#         if new_servings != self.servings:
-#             # Get scaled recipe data
-#             scaled_recipe = self.get_scaled_recipe(new_servings)
-            
-#             # Batch all ingredient updates
-#             ingredients_to_update = []
-#             for ingredient in self.ingredients.all():
-#                 # Find corresponding scaled ingredient
-#                 scaled_ing = next(i for i in scaled_recipe['ingredients'] if i['order'] == ingredient.order)
-#                 ingredient.quantity = scaled_ing['quantity']
-#                 ingredients_to_update.append(ingredient)
-            
-#             # Bulk update ingredients without triggering individual saves
-#             Ingredient.objects.bulk_update(ingredients_to_update, ['quantity'])
-            
-#             # Update servings and digest
-#             self.servings = new_servings
-#             self.update_ingredients_digest()
-#             self.save()
-
-#     def update_ingredients_digest(self):
-#         """Create a digest of all ingredients data including servings count"""
-#         ingredients_data = list(self.ingredients.order_by('order').values('item', 'quantity'))
-#         data_string = json.dumps({
-#             'servings': self.servings,
-#             'ingredients': ingredients_data
-#         }, sort_keys=True)
-#         self.ingredients_digest = hashlib.sha256(data_string.encode()).hexdigest()
-#         self.save(update_fields=['ingredients_digest'])
-
-#     @receiver(post_save, sender='planner.Ingredient')
-#     def update_recipe_digest(sender, instance, **kwargs):
-#         instance.recipe.update_ingredients_digest()
-
-
-
-#     # Shopping list models
-# class ShoppingList(models.Model):
-#     meal_plan = models.OneToOneField('MealPlan', on_delete=models.CASCADE)
-#     created_at = models.DateTimeField(auto_now_add=True)
-#     user = models.ForeignKey(User, on_delete=models.CASCADE)
-#     modified_at = models.DateTimeField(auto_now=True)
-#     content_digest = models.CharField(max_length=64, blank=True)  # SHA-256 hash
-
-#     def update_content_digest(self):
-#         # Collect all recipe digests and servings counts
-#         digest_data = []
-#         for group in self.meal_plan.groups.all():
-#             for group_recipe in group.recipes.all():
-#                 digest_data.append({
-#                     'recipe_digest': group_recipe.recipe.ingredients_digest,
-#                     'servings': group_recipe.servings
-#                 })
-
-#         # Create a digest of the entire shopping list state
-#         data_string = json.dumps(digest_data, sort_keys=True)
-#         self.content_digest = hashlib.sha256(data_string.encode()).hexdigest()
-#         self.save(update_fields=['content_digest'])
-
-#     def is_out_of_sync(self):
-#         # Recalculate what the digest should be
-#         old_digest = self.content_digest
-#         self.update_content_digest()
-#         return old_digest != self.content_digest
-
-
-#     def __str__(self):
-#         return f"Shopping List for {self.meal_plan.name}"
-
-
-# # Recipe added to Meal Plan Group by user
-# class MealPlanRecipe(models.Model):
-#     meal_group = models.ForeignKey(MealGroup, related_name='recipes', on_delete=models.CASCADE)
-#     recipe = models.ForeignKey(Recipe, on_delete=models.PROTECT) # Prevent deletion of underlying recipe if it's used in a meal plan
-#     modified_at = models.DateTimeField(auto_now=True)
-#     order = models.PositiveIntegerField()
-
-#     class Meta:
-#         unique_together = ['order']
-#         ordering = ['meal_group', 'order']
-
-#     def __str__(self):
-#         return f"{self.recipe.title}"
\ No newline at end of file
+import hashlib
+import json
+from typing import Iterable
+from planner.models import Ingredient as DBIngredient
+from planner.models import MealPlan, MealPlanRecipe
+from planner.models import Recipe as DBRecipe
+from .recipe_generator import Recipe
+
+
+# Recipe digests: what a shopping list depends on, i.e. servings and the ordered ingredients
+def ingredients_digest(servings: int, ingredients: Iterable[tuple[str, str]]) -> str:
+    """SHA-256 over servings and ordered (name, quantity) pairs"""
+    data_string = json.dumps({
+        'servings': servings,
+        'ingredients': [[name, quantity] for name, quantity in ingredients],
+    }, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(data_string.encode()).hexdigest()
+
+def recipe_ingredients_digest(recipe: Recipe) -> str:
+    """Digest of a parsed recipe, comparable with a saved recipe's ingredients_digest"""
+    return ingredients_digest(recipe.servings, ((ing.name, ing.quantity) for ing in recipe.ingredients))
+
+def update_ingredients_digests(db_recipes: Iterable[DBRecipe], batch_size: int = 1000) -> int:
+    """Recompute ingredients_digest from the saved ingredients, for rows changed outside the repository"""
+    db_recipes = list(db_recipes)
+    ingredients = {}
+    for recipe_id, name, quantity in (
+        DBIngredient.objects.filter(recipe__in=db_recipes).order_by('recipe_id', 'order').values_list('recipe_id', 'name', 'quantity')
+    ):
+        ingredients.setdefault(recipe_id, []).append((name, quantity))
+
+    changed = []
+    for db_recipe in db_recipes:
+        digest = ingredients_digest(db_recipe.servings, ingredients.get(db_recipe.id, []))
+        if digest != db_recipe.ingredients_digest:
+            db_recipe.ingredients_digest = digest
+            changed.append(db_recipe)
+    DBRecipe.objects.bulk_update(changed, ['ingredients_digest'], batch_size=batch_size)
+    return len(changed)
+
+
+# Shopping list digests: the digests and servings overrides of the planned recipes, in plan order
+def content_digest(planned: Iterable[tuple[str, int | None]]) -> str:
+    data_string = json.dumps([[digest, servings] for digest, servings in planned], separators=(',', ':'))
+    return hashlib.sha256(data_string.encode()).hexdigest()
+
+def meal_plan_content_digest(meal_plan: MealPlan) -> str:
+    """Changes whenever a shopping list generated from the plan would, in a single query"""
+    planned = (
+        MealPlanRecipe.objects
+        .filter(meal_group__meal_plan=meal_plan)
+        .order_by('meal_group__order', 'meal_group_id', '_order')
+        .values_list('recipe__ingredients_digest', 'servings')
+    )
+    return content_digest(planned)
+
+def recipe_content_digests(planned: Iterable[tuple[int, str, int | None]]) -> dict[str, str]:
+    """
+    Digest of each planned recipe's (ingredients_digest, servings) rows, from (recipe_id, ingredients_digest, servings)
+    rows in plan order; keyed by recipe id as a string, as stored in ShoppingList.recipe_digests
+    """
+    rows = {}
+    for recipe_id, digest, servings in planned:
+        rows.setdefault(recipe_id, []).append((digest, servings))
+    return {str(recipe_id): content_digest(recipe_rows) for recipe_id, recipe_rows in rows.items()}
+
+def meal_plan_recipe_digests(meal_plan: MealPlan) -> dict[str, str]:
+    """Per recipe counterpart of meal_plan_content_digest, in a single query"""
+    planned = (
+        MealPlanRecipe.objects
+        .filter(meal_group__meal_plan=meal_plan)
+        .order_by('meal_group__order', 'meal_group_id', '_order')
+        .values_list('recipe_id', 'recipe__ingredients_digest', 'servings')
+    )
+    return recipe_content_digests(planned)
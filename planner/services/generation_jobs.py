@@ -0,0 +1,176 @@
+import os
+import socket
+from datetime import timedelta
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+from planner.models import GenerationJob
+from .http_client import CircuitOpenError
+from .llm_cache import make_cache_key
+from .llm_telemetry import call_origin
+from .recipe_generator import generate_recipe
+from .recipe_parser import parse_recipe_string
+from .recipe_repository import save_recipe_to_db
+from .recipe_reuse import recipe_generation_key
+from .singleflight import advisory_lock
+
+RETRY_BACKOFF_SECONDS = 10 # Doubles with every failed attempt
+STALE_JOB_TIMEOUT = timedelta(minutes=5) # Running jobs older than this are assumed to be orphaned by a dead worker
+ENQUEUE_LOCK_TIMEOUT = 10 # Seconds to wait for a duplicate request that is queueing the same job
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+# Enqueueing (called from views)
+def recipe_request_key(user: User, payload: dict) -> str:
+    """Identifies a user's recipe request, so repeats (double-clicks, second tabs, reconnects) can be coalesced"""
+    return make_cache_key('recipe_job', 1, user=user.id, **payload)
+
+def enqueue_recipe_job(user: User, dish_idea, servings, notes="", dietary_preferences="", units="metric", use_cache=True) -> GenerationJob:
+    """
+    Queue a recipe generation; the worker picks it up and saves a draft recipe for the user.
+    If the user already has an identical job queued or running (double-click, second tab), that job is returned instead.
+    With use_cache=False the worker asks the model for a fresh recipe instead of reusing a cached response.
+    """
+    payload = {
+        'dish_idea': dish_idea,
+        'servings': servings,
+        'notes': notes,
+        'dietary_preferences': dietary_preferences,
+        'units': units,
+        'use_cache': use_cache,
+    }
+    dedupe_key = recipe_request_key(user, payload)
+    active_jobs = GenerationJob.objects.filter(user=user, dedupe_key=dedupe_key, status__in=['queued', 'running'])
+
+    with advisory_lock(f"recipe_job:{dedupe_key}", timeout=ENQUEUE_LOCK_TIMEOUT) as acquired:
+        active_job = active_jobs.first()
+        if active_job:
+            return active_job
+        if not acquired:
+            # Whoever holds the lock is queueing this same job; don't queue a duplicate alongside it
+            raise TimeoutError(f"Timed out waiting to queue recipe job {dedupe_key}")
+
+        return GenerationJob.objects.create(
+            kind='recipe',
+            user=user,
+            payload=payload,
+            dedupe_key=dedupe_key,
+        )
+
+# Job handlers
+def run_recipe_job(job: GenerationJob):
+    if job.recipe_id is not None:
+        # Saved by an earlier attempt
+        mark_succeeded(job)
+        return
+
+    payload = job.payload
+    recipe_string = generate_recipe(**payload)
+    parsed_recipe = parse_recipe_string(recipe_string)
+    generation_key = recipe_generation_key(payload['dish_idea'], payload['notes'], payload['dietary_preferences'], payload['units'])
+
+    # The recipe and the job's success are committed together, so a requeued job never saves a second recipe
+    with transaction.atomic():
+        saved_recipe = save_recipe_to_db(parsed_recipe, user=job.user, status='draft', generation_key=generation_key)
+
+        # Automatically add to My Recipes
+        saved_recipe.saved_to_my_recipes_by.add(job.user)
+
+        job.recipe = saved_recipe
+        mark_succeeded(job)
+
+JOB_HANDLERS = {
+    'recipe': run_recipe_job,
+}
+
+# Worker functions
+def claim_next_job(worker_id: str) -> GenerationJob | None:
+    """Lock the oldest runnable job and mark it as running"""
+    now = timezone.now()
+    with transaction.atomic():
+        job = (
+            GenerationJob.objects
+            .select_for_update(skip_locked=True)
+            .filter(status='queued', run_after__lte=now)
+            .order_by('run_after', 'id')
+            .first()
+        )
+        if job is None:
+            return None
+
+        # Conditional update so two workers can never claim the same job,
+        # even on backends without SELECT ... FOR UPDATE SKIP LOCKED
+        claimed = GenerationJob.objects.filter(id=job.id, status='queued').update(
+            status='running',
+            attempts=job.attempts + 1,
+            locked_by=worker_id,
+            locked_at=now,
+            modified_at=now,
+        )
+        if not claimed:
+            return None
+
+    job.refresh_from_db()
+    return job
+
+def mark_succeeded(job: GenerationJob):
+    """Called by handlers in the same transaction as saving their result"""
+    job.status = 'succeeded'
+    job.finished_at = timezone.now()
+    job.locked_by = ''
+    job.locked_at = None
+    job.save()
+
+def run_job(job: GenerationJob) -> GenerationJob:
+    """Run a claimed job, recording success, a scheduled retry or a final failure"""
+    handler = JOB_HANDLERS[job.kind]
+    try:
+        with call_origin(f"worker:{job.kind}", job.user):
+            handler(job)
+    except CircuitOpenError as e:
+        # The upstream is known to be down: wait it out without using up an attempt
+        job.last_error = f"{type(e).__name__}: {e}"
+        job.status = 'queued'
+        job.attempts -= 1
+        job.run_after = timezone.now() + timedelta(seconds=e.retry_after)
+    except Exception as e:
+        job.last_error = f"{type(e).__name__}: {e}"
+        if job.attempts < job.max_attempts:
+            job.status = 'queued'
+            job.run_after = timezone.now() + timedelta(seconds=RETRY_BACKOFF_SECONDS * 2 ** (job.attempts - 1))
+        else:
+            job.status = 'failed'
+            job.finished_at = timezone.now()
+    else:
+        if job.status != 'succeeded':
+            mark_succeeded(job)
+        return job
+
+    job.locked_by = ''
+    job.locked_at = None
+    job.save()
+    return job
+
+def process_available_jobs(worker_id: str = None, limit: int = None) -> int:
+    """Run queued jobs until none are runnable (or limit is reached). Returns the number of jobs run."""
+    worker_id = worker_id or default_worker_id()
+    processed = 0
+    while limit is None or processed < limit:
+        job = claim_next_job(worker_id)
+        if job is None:
+            break
+        run_job(job)
+        processed += 1
+    return processed
+
+def requeue_stale_jobs(timeout: timedelta = STALE_JOB_TIMEOUT) -> int:
+    """Return jobs orphaned by a crashed worker to the queue"""
+    cutoff = timezone.now() - timeout
+    return GenerationJob.objects.filter(status='running', locked_at__lt=cutoff).update(
+        status='queued',
+        locked_by='',
+        locked_at=None,
+        last_error='Worker timed out',
+    )
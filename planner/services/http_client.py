@@ -0,0 +1,170 @@
+import threading
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+import httpx
+import openai
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+RETRY_STATUSES = [429, 500, 502, 503, 504]
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an upstream that has been failing, until its breaker resets"""
+
+    def __init__(self, name: str, retry_after: float):
+        self.name = name
+        self.retry_after = retry_after
+        super().__init__(f"{name} is unavailable, retry in {retry_after:.0f}s")
+
+
+class CircuitBreaker:
+    """
+    Opens after failure_threshold consecutive upstream failures, failing calls fast for reset_timeout
+    seconds. After that a single trial call is let through: success closes the breaker, failure reopens it.
+    State is per process, so each gunicorn worker and job worker trips independently.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_progress = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at < self.reset_timeout:
+            return 'open'
+        return 'half_open'
+
+    def before_call(self) -> bool:
+        """Raise CircuitOpenError while open; returns whether this call is the half-open trial"""
+        with self._lock:
+            state = self.state
+            if state == 'open' or (state == 'half_open' and self.trial_in_progress):
+                retry_after = max(self.reset_timeout - (time.monotonic() - self.opened_at), 0)
+                raise CircuitOpenError(self.name, retry_after)
+            if state == 'half_open':
+                self.trial_in_progress = True
+            return state == 'half_open'
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_in_progress = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.trial_in_progress or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+            self.trial_in_progress = False
+
+    def end_trial(self):
+        """Let the next call be the trial, when this one ended without telling us anything about the upstream"""
+        with self._lock:
+            self.trial_in_progress = False
+
+    @contextmanager
+    def guard(self):
+        """Run the block through the breaker; only upstream failures (timeouts, 429, 5xx) count against it"""
+        is_trial = self.before_call()
+        try:
+            yield
+        except Exception as e:
+            if is_upstream_failure(e):
+                self.record_failure()
+            else:
+                self.record_success()
+            raise
+        else:
+            self.record_success()
+        finally:
+            # e.g. GeneratorExit when a streaming client disconnects: no outcome, but the trial is over
+            if is_trial:
+                self.end_trial()
+
+    @contextmanager
+    def observe(self):
+        """Count upstream failures in the block without gating it, e.g. reading a stream opened under guard()"""
+        try:
+            yield
+        except Exception as e:
+            if is_upstream_failure(e):
+                self.record_failure()
+            raise
+
+
+def is_upstream_failure(error: Exception) -> bool:
+    if isinstance(error, (openai.APIConnectionError, requests.ConnectionError, requests.Timeout)):
+        return True # Includes openai.APITimeoutError
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code in RETRY_STATUSES
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        return error.response.status_code in RETRY_STATUSES
+    return False
+
+_breakers = {}
+_breakers_guard = threading.Lock()
+
+def get_circuit_breaker(name: str) -> CircuitBreaker:
+    with _breakers_guard:
+        if name not in _breakers:
+            _breakers[name] = CircuitBreaker(
+                name,
+                failure_threshold=settings.CIRCUIT_BREAKER['FAILURE_THRESHOLD'],
+                reset_timeout=settings.CIRCUIT_BREAKER['RESET_TIMEOUT'],
+            )
+        return _breakers[name]
+
+def reset_circuit_breakers():
+    with _breakers_guard:
+        _breakers.clear()
+
+
+# Timeouts
+def llm_timeout(operation: str) -> httpx.Timeout:
+    """Connect and read deadlines for an OpenAI call, see settings.HTTP_TIMEOUTS"""
+    connect, read = settings.HTTP_TIMEOUTS[operation]
+    return httpx.Timeout(read, connect=connect)
+
+def requests_timeout(operation: str) -> tuple[float, float]:
+    return settings.HTTP_TIMEOUTS[operation]
+
+
+# Pooled clients
+def llm_http_client(event_hooks: dict = None) -> httpx.Client:
+    """Keep-alive connection pool for the OpenAI client"""
+    return openai.DefaultHttpxClient(
+        timeout=llm_timeout('default'),
+        limits=httpx.Limits(
+            max_connections=settings.HTTP_POOL_SIZE,
+            max_keepalive_connections=settings.HTTP_POOL_SIZE,
+        ),
+        event_hooks=event_hooks or {},
+    )
+
+@lru_cache(maxsize=None)
+def get_http_session() -> requests.Session:
+    """Shared session for plain downloads, with pooled connections and bounded backoff retries"""
+    retry = Retry(
+        total=settings.HTTP_MAX_RETRIES,
+        backoff_factor=0.5, # 0.5s, 1s, 2s...
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=['GET'],
+        respect_retry_after_header=True,
+    )
+    adapter = HTTPAdapter(pool_connections=settings.HTTP_POOL_SIZE, pool_maxsize=settings.HTTP_POOL_SIZE, max_retries=retry)
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
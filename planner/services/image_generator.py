@@ -1,28 +1,36 @@
-from openai import OpenAI
-import os
-import requests
-from django.conf import settings
+import base64
 from django.core.files.base import ContentFile
 from django.utils.text import slugify
 from planner.models import Recipe
-
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+from .http_client import get_http_session, llm_timeout, requests_timeout
+from .llm_client import get_llm_client, llm_circuit_breaker
+from .llm_telemetry import record_llm_call
 
 def generate_recipe_image(prompt: str) -> str:
-    response = client.images.generate(
-        model="dall-e-3",
-        prompt=prompt,
-        size="1024x1024",
-        quality="hd", # "hd" costs twice as much as "standard", see https://openai.com/api/pricing/
-    )
+    quality = "hd" # "hd" costs twice as much as "standard", see https://openai.com/api/pricing/
+    with record_llm_call('image', model="dall-e-3") as call:
+        call.cache_status = 'miss'
+        call.images = 1
+        call.quality = quality
+        with llm_circuit_breaker().guard():
+            response = get_llm_client().images.generate(
+                model="dall-e-3",
+                prompt=prompt,
+                size="1024x1024",
+                quality=quality,
+                timeout=llm_timeout('image'),
+            )
     return response.data[0].url # Temporary URL valid for 60 minutes
 
 def save_recipe_image(temp_url: str, recipe: Recipe) -> str:
-    # Download the image from OpenAI temporary URL
-    response = requests.get(temp_url)
-    response.raise_for_status()  # Raises an HTTPError if the status is 4xx, 5xx
-    
-    image_content = ContentFile(response.content)
+    if temp_url.startswith('data:'):
+        # Inline image from the local LLM stand-in
+        image_content = ContentFile(base64.b64decode(temp_url.split(',', 1)[1]))
+    else:
+        # Download the image from OpenAI temporary URL
+        response = get_http_session().get(temp_url, timeout=requests_timeout('image_download'))
+        response.raise_for_status()  # Raises an HTTPError if the status is 4xx, 5xx
+        image_content = ContentFile(response.content)
     
     recipe_title_slug = slugify(recipe.title, allow_unicode=False).replace("-", "_")
     file_name = f"{recipe_title_slug}.png"
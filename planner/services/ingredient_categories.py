@@ -0,0 +1,58 @@
+from collections import Counter
+from typing import Iterable
+from django.db.models import Q
+from planner.models import IngredientCategory, ShoppingItem as DBShoppingItem
+from .shopping_aggregation import canonical_name
+
+CATEGORY_LABELS = dict(DBShoppingItem.CATEGORIES)
+CATEGORY_CODES = {label: code for code, label in DBShoppingItem.CATEGORIES}
+
+
+# Both truncated to the length of IngredientCategory.name and normalized_name
+def lookup_name(name: str) -> str:
+    return ' '.join(name.lower().split())[:100]
+
+def lookup_normalized_name(name: str) -> str:
+    return canonical_name(name)[:100]
+
+def known_categories(names: Iterable[str]) -> dict[str, str]:
+    """
+    Learned category codes of names, by exact (lowercased) name or else by normalized name,
+    where the most common category among the names that normalize the same wins, in one query
+    """
+    names = set(names)
+    exact_names = {lookup_name(name) for name in names}
+    normalized_names = {lookup_normalized_name(name) for name in names}
+
+    exact = {}
+    normalized = {}
+    for name, normalized_name, category in (
+        IngredientCategory.objects
+        .filter(Q(name__in=exact_names) | Q(normalized_name__in=normalized_names))
+        .values_list('name', 'normalized_name', 'category')
+    ):
+        exact[name] = category
+        normalized.setdefault(normalized_name, Counter())[category] += 1
+
+    categories = {}
+    for name in names:
+        if lookup_name(name) in exact:
+            categories[name] = exact[lookup_name(name)]
+        elif lookup_normalized_name(name) in normalized:
+            categories[name] = normalized[lookup_normalized_name(name)].most_common(1)[0][0]
+    return categories
+
+def learn_categories(categories: Iterable[tuple[str, str]]) -> int:
+    """Remember (name, category code) pairs, the latest category winning for names seen before"""
+    rows = {
+        lookup_name(name): IngredientCategory(name=lookup_name(name), normalized_name=lookup_normalized_name(name), category=category)
+        for name, category in categories
+        if name.strip() and category in CATEGORY_LABELS
+    }
+    IngredientCategory.objects.bulk_create(
+        rows.values(),
+        update_conflicts=True,
+        unique_fields=['name'],
+        update_fields=['normalized_name', 'category', 'modified_at'],
+    )
+    return len(rows)
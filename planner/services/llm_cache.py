@@ -0,0 +1,123 @@
+import hashlib
+import itertools
+import json
+import re
+from datetime import timedelta
+from typing import Iterable
+from django.conf import settings
+from django.db.models import F, Sum
+from django.utils import timezone
+from planner.models import LLMCacheEntry, LLMCacheStats
+
+WHITESPACE = re.compile(r'\s+')
+
+# Writes made by this process, so eviction runs on every LLM_CACHE_EVICT_EVERY-th one rather than each
+_writes = itertools.count(1)
+
+
+def canonicalize(value) -> str:
+    """Case-fold and collapse whitespace so trivially different inputs share a cache key"""
+    if value is None:
+        return ''
+    return WHITESPACE.sub(' ', str(value)).strip().casefold()
+
+def make_cache_key(namespace: str, version: int, **inputs) -> str:
+    """Content-addressed key built from the canonical inputs and the prompt template version"""
+    data_string = json.dumps({
+        'namespace': namespace,
+        'version': version,
+        'inputs': {name: canonicalize(value) for name, value in inputs.items()},
+    }, sort_keys=True)
+    return hashlib.sha256(data_string.encode()).hexdigest()
+
+
+# Counters
+def increment_stat(namespace: str, field: str, amount: int = 1):
+    if not amount:
+        return
+    updated = LLMCacheStats.objects.filter(namespace=namespace).update(**{field: F(field) + amount})
+    if not updated:
+        LLMCacheStats.objects.get_or_create(namespace=namespace)
+        LLMCacheStats.objects.filter(namespace=namespace).update(**{field: F(field) + amount})
+
+def get_cache_stats() -> list[dict]:
+    stats = []
+    for row in LLMCacheStats.objects.order_by('namespace'):
+        lookups = row.hits + row.misses
+        stats.append({
+            'namespace': row.namespace,
+            'hits': row.hits,
+            'misses': row.misses,
+            'evictions': row.evictions,
+            'hit_rate': row.hits / lookups if lookups else 0.0,
+        })
+    return stats
+
+
+# Cache operations
+def get_cached_response(namespace: str, key: str, count_miss: bool = True) -> str | None:
+    return get_cached_responses(namespace, [key], count_misses=count_miss).get(key)
+
+def get_cached_responses(namespace: str, keys: Iterable[str], count_misses: bool = True) -> dict[str, str]:
+    """Cached responses by key for those of keys in the cache, in a constant number of queries"""
+    keys = set(keys)
+    now = timezone.now()
+    entries = dict(LLMCacheEntry.objects.filter(key__in=keys, expires_at__gt=now).values_list('key', 'response'))
+    if entries:
+        LLMCacheEntry.objects.filter(key__in=entries).update(hit_count=F('hit_count') + 1, last_hit_at=now)
+    increment_stat(namespace, 'hits', len(entries))
+    if count_misses:
+        increment_stat(namespace, 'misses', len(keys) - len(entries))
+    return entries
+
+def set_cached_response(namespace: str, key: str, response: str, ttl: int = None):
+    ttl = settings.LLM_CACHE_TTL if ttl is None else ttl
+    now = timezone.now()
+    LLMCacheEntry.objects.update_or_create(
+        key=key,
+        defaults={
+            'namespace': namespace,
+            'response': response,
+            'size': len(response.encode()),
+            'expires_at': now + timedelta(seconds=ttl),
+            'last_hit_at': now,
+        },
+    )
+    if next(_writes) % settings.LLM_CACHE_EVICT_EVERY == 0:
+        evict()
+
+def evict(max_bytes: int = None) -> int:
+    """Remove expired entries, then least recently used entries until the cache fits in max_bytes"""
+    max_bytes = settings.LLM_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+    evicted = {}
+
+    def delete_entries(queryset):
+        rows = list(queryset.values_list('id', 'namespace'))
+        LLMCacheEntry.objects.filter(id__in=[row[0] for row in rows]).delete()
+        for _, namespace in rows:
+            evicted[namespace] = evicted.get(namespace, 0) + 1
+
+    delete_entries(LLMCacheEntry.objects.filter(expires_at__lte=timezone.now()))
+
+    total_bytes = LLMCacheEntry.objects.aggregate(total=Sum('size'))['total'] or 0
+    if total_bytes > max_bytes:
+        # Walk the LRU end of the cache and drop just enough entries
+        excess = total_bytes - max_bytes
+        victims = []
+        for entry_id, size in LLMCacheEntry.objects.order_by('last_hit_at', 'id').values_list('id', 'size').iterator():
+            victims.append(entry_id)
+            excess -= size
+            if excess <= 0:
+                break
+        delete_entries(LLMCacheEntry.objects.filter(id__in=victims))
+
+    for namespace, count in evicted.items():
+        increment_stat(namespace, 'evictions', count)
+    return sum(evicted.values())
+
+def clear_cache(namespace: str = None) -> int:
+    queryset = LLMCacheEntry.objects.all()
+    if namespace:
+        queryset = queryset.filter(namespace=namespace)
+    deleted, _ = queryset.delete()
+    return deleted
@@ -0,0 +1,36 @@
+import os
+from functools import lru_cache
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from openai import OpenAI
+from .http_client import CircuitBreaker, get_circuit_breaker, llm_http_client, llm_timeout
+from .llm_telemetry import on_request, on_response
+from .local_llm import LocalLLMClient
+
+LLM_PROVIDERS = ['openai', 'local']
+
+
+@lru_cache(maxsize=None)
+def get_llm_client():
+    """Shared LLM client for the provider selected by settings.LLM_PROVIDER"""
+    provider = settings.LLM_PROVIDER
+    if provider == 'openai':
+        return OpenAI(
+            api_key=os.getenv("OPENAI_API_KEY"),
+            base_url=settings.OPENAI_BASE_URL, # None means api.openai.com
+            timeout=llm_timeout('default'),
+            max_retries=settings.HTTP_MAX_RETRIES,
+            # Hooks let telemetry count retries and time the first byte of each call
+            http_client=llm_http_client(event_hooks={'request': [on_request], 'response': [on_response]}),
+        )
+    if provider == 'local':
+        return LocalLLMClient()
+    raise ImproperlyConfigured(f"Unknown LLM_PROVIDER {provider!r}, expected one of {LLM_PROVIDERS}")
+
+def llm_circuit_breaker() -> CircuitBreaker:
+    """Breaker guarding calls to the configured provider; raises CircuitOpenError while it is failing"""
+    return get_circuit_breaker(f"llm:{settings.LLM_PROVIDER}")
+
+def reset_llm_client():
+    """Forget the shared client, e.g. after changing LLM settings in tests"""
+    get_llm_client.cache_clear()
@@ -0,0 +1,186 @@
+import datetime
+import logging
+import math
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from decimal import Decimal
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Avg, Count, Q, Sum
+from planner.models import LLMCall, LLMCallDailyStats
+
+logger = logging.getLogger(__name__)
+
+# USD per 1M tokens (input, output), or per image; see https://openai.com/api/pricing/
+TOKEN_PRICES = {
+    'gpt-4o': (Decimal('2.50'), Decimal('10.00')),
+    'gpt-4o-mini': (Decimal('0.15'), Decimal('0.60')),
+}
+IMAGE_PRICES = {
+    ('dall-e-3', 'standard'): Decimal('0.040'),
+    ('dall-e-3', 'hd'): Decimal('0.080'),
+}
+
+# Where the current call comes from; set per request by LLMTelemetryMiddleware and by the job worker
+_call_origin = ContextVar('llm_call_origin', default=('', None))
+# The call being recorded on this thread, so HTTP hooks can count attempts and time the first byte
+_current_call = ContextVar('llm_current_call', default=None)
+
+
+def estimate_cost(model: str, prompt_tokens: int = 0, completion_tokens: int = 0, images: int = 0, quality: str = 'standard') -> Decimal:
+    cost = Decimal(0)
+    if model in TOKEN_PRICES:
+        input_price, output_price = TOKEN_PRICES[model]
+        cost += (prompt_tokens * input_price + completion_tokens * output_price) / 1_000_000
+    cost += images * IMAGE_PRICES.get((model, quality), Decimal(0))
+    return cost
+
+def get_call_origin() -> tuple[str, User | None]:
+    return _call_origin.get()
+
+def set_call_origin(view: str, user: User = None):
+    """Attribute LLM calls made from here on (in this thread/context) to view and user"""
+    _call_origin.set((view, user if user and user.is_authenticated else None))
+
+@contextmanager
+def call_origin(view: str, user: User = None):
+    """Attribute LLM calls made inside the block to view and user"""
+    token = _call_origin.set((view, user if user and user.is_authenticated else None))
+    try:
+        yield
+    finally:
+        _call_origin.reset(token)
+
+def iterate_with_call_origin(iterable, view: str, user: User = None):
+    """For streamed response bodies, which are generated after the view (and middleware) returned"""
+    with call_origin(view, user):
+        yield from iterable
+
+
+@dataclass
+class CallRecord:
+    operation: str
+    model: str
+    prompt_version: int = None
+    cache_status: str = 'hit' # Set to 'miss' by the code path that actually calls the API
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    images: int = 0
+    quality: str = 'standard'
+    attempts: int = 0
+    started_at: float = field(default_factory=time.perf_counter)
+    first_byte_at: float = None
+
+    def add_usage(self, usage):
+        """Add token counts from a completion's usage (None for streams without usage)"""
+        if usage is not None:
+            self.prompt_tokens += usage.prompt_tokens
+            self.completion_tokens += usage.completion_tokens
+
+    def mark_first_byte(self):
+        if self.first_byte_at is None:
+            self.first_byte_at = time.perf_counter()
+
+# httpx event hooks for the OpenAI client (see llm_client.py)
+def on_request(request):
+    call = _current_call.get()
+    if call is not None:
+        call.attempts += 1
+
+def on_response(response):
+    call = _current_call.get()
+    if call is not None:
+        call.mark_first_byte()
+
+@contextmanager
+def record_llm_call(operation: str, model: str, prompt_version: int = None):
+    """
+    Record wall time, time to first byte, tokens, cost, retries, cache status and origin
+    of the LLM call made inside the block. Telemetry failures never fail the call itself.
+    """
+    call = CallRecord(operation=operation, model=model, prompt_version=prompt_version)
+    token = _current_call.set(call)
+    error = ''
+    try:
+        yield call
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _current_call.reset(token)
+        finished_at = time.perf_counter()
+        view, user = _call_origin.get()
+        try:
+            # A savepoint, so a failed insert doesn't break the caller's transaction
+            with transaction.atomic():
+                LLMCall.objects.create(
+                    operation=operation,
+                    model=model,
+                    prompt_version=prompt_version,
+                    status='error' if error else 'ok',
+                    cache_status=call.cache_status,
+                    duration_ms=round((finished_at - call.started_at) * 1000),
+                    ttfb_ms=round(((call.first_byte_at or finished_at) - call.started_at) * 1000),
+                    prompt_tokens=call.prompt_tokens,
+                    completion_tokens=call.completion_tokens,
+                    cost_usd=estimate_cost(model, call.prompt_tokens, call.completion_tokens, call.images, call.quality),
+                    retries=max(call.attempts - 1, 0),
+                    view=view,
+                    user=user,
+                    error=error[:255],
+                )
+        except Exception:
+            logger.exception("Error recording LLM call")
+
+
+# Daily rollup (python manage.py rollup_llm_calls)
+def percentile(sorted_values: list[int], share: float) -> int:
+    """Nearest-rank percentile"""
+    if not sorted_values:
+        return 0
+    return sorted_values[max(math.ceil(len(sorted_values) * share) - 1, 0)]
+
+def rollup_llm_calls(date: datetime.date) -> list[LLMCallDailyStats]:
+    """(Re)compute the daily stats for date, one row per operation, model and originating view"""
+    calls = LLMCall.objects.filter(created_at__date=date)
+    groups = calls.values('operation', 'model', 'view').annotate(
+        calls=Count('id'),
+        errors=Count('id', filter=Q(status='error')),
+        cache_hits=Count('id', filter=Q(cache_status='hit')),
+        retries=Sum('retries'),
+        avg_duration_ms=Avg('duration_ms'),
+        avg_ttfb_ms=Avg('ttfb_ms'),
+        prompt_tokens=Sum('prompt_tokens'),
+        completion_tokens=Sum('completion_tokens'),
+        cost_usd=Sum('cost_usd'),
+    )
+
+    durations = defaultdict(list)
+    for operation, model, view, duration_ms in calls.order_by('duration_ms').values_list('operation', 'model', 'view', 'duration_ms'):
+        durations[operation, model, view].append(duration_ms)
+
+    rows = []
+    with transaction.atomic():
+        LLMCallDailyStats.objects.filter(date=date).delete()
+        for group in groups:
+            key = (group['operation'], group['model'], group['view'])
+            rows.append(LLMCallDailyStats.objects.create(
+                date=date,
+                operation=group['operation'],
+                model=group['model'],
+                view=group['view'],
+                calls=group['calls'],
+                errors=group['errors'],
+                cache_hits=group['cache_hits'],
+                retries=group['retries'],
+                avg_duration_ms=round(group['avg_duration_ms']),
+                p95_duration_ms=percentile(durations[key], 0.95),
+                avg_ttfb_ms=round(group['avg_ttfb_ms']) if group['avg_ttfb_ms'] is not None else None,
+                prompt_tokens=group['prompt_tokens'],
+                completion_tokens=group['completion_tokens'],
+                cost_usd=group['cost_usd'],
+            ))
+    return rows
@@ -0,0 +1,407 @@
+"""
+Local deterministic stand-in for the OpenAI API, for benchmarking and load testing without the network.
+Configured by LOCAL_LLM in settings; run_local_llm serves the same engine over HTTP.
+"""
+import base64
+import hashlib
+import json
+import random
+import re
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Iterator
+import httpx
+import openai
+from django.conf import settings
+from openai.types import CompletionUsage, Image, ImagesResponse
+from openai.lib.streaming.chat import ContentDeltaEvent, ContentDoneEvent
+from openai.types.chat import ParsedChatCompletion, ParsedChatCompletionMessage, ParsedChoice
+from pydantic import BaseModel
+
+INGREDIENT_POOL = [
+    ("Onions, diced", "2"),
+    ("Garlic cloves, minced", "3"),
+    ("Olive oil", "2 tablespoons"),
+    ("Tinned chopped tomatoes", "400 g"),
+    ("Carrots, sliced", "2"),
+    ("Chicken thighs, boneless", "500 g"),
+    ("Basmati rice", "300 g"),
+    ("Vegetable stock", "500 ml"),
+    ("Butter", "30 g"),
+    ("Lemon, zested", "1"),
+    ("Fresh parsley, chopped", "1 handful"),
+    ("Parmesan cheese, grated", "50 g"),
+    ("Ground cumin", "1 teaspoon"),
+    ("Smoked paprika", "1/2 teaspoon"),
+    ("Red bell pepper, sliced", "1"),
+    ("Double cream", "150 ml"),
+    ("Spinach", "100 g"),
+    ("Salt", "1 teaspoon"),
+    ("Black pepper", "1/2 teaspoon"),
+]
+
+SECTION_POOL = ["Prepare the Ingredients", "Make the Sauce", "Cook", "Assemble", "Bake", "Serve"]
+
+CATEGORY_KEYWORDS = {
+    'fruit_veg': ['onion', 'garlic', 'carrot', 'lemon', 'parsley', 'pepper', 'spinach', 'tomato', 'potato'],
+    'meat_fish': ['chicken', 'beef', 'pork', 'lamb', 'salmon', 'prawn', 'fish'],
+    'dairy': ['butter', 'cheese', 'cream', 'milk', 'yogurt', 'egg'],
+    'bakery': ['bread', 'bun', 'tortilla'],
+    'frozen': ['frozen'],
+    'drinks': ['wine', 'juice', 'beer'],
+}
+
+EXCLUDED_ITEMS = {'water', 'salt', 'pepper', 'black pepper', 'olive oil'}
+
+STREAM_CHUNK_SIZE = 24 # characters per streamed delta
+TIME_TO_FIRST_TOKEN_SHARE = 0.1 # share of the latency spent before the first streamed delta
+
+
+def prompt_text(messages: list[dict]) -> str:
+    return "\n".join(str(message.get('content', '')) for message in messages)
+
+
+class LocalLLMEngine:
+    def __init__(self, latency=1.0, jitter=0.0, error_rate=0.0, prompt_tokens=None, completion_tokens=None,
+                 fixtures_dir=None, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.prompt_tokens = prompt_tokens
+        self.completion_tokens = completion_tokens
+        self.fixtures_dir = Path(fixtures_dir) if fixtures_dir else None
+        self.seed = seed
+        self._error_rng = random.Random(seed)
+
+    @classmethod
+    def from_settings(cls, **overrides):
+        options = {key.lower(): value for key, value in settings.LOCAL_LLM.items()}
+        options.update(overrides)
+        return cls(**options)
+
+    def rng_for(self, prompt: str) -> random.Random:
+        """Same prompt, same response"""
+        digest = hashlib.sha256(f"{self.seed}:{prompt}".encode()).digest()
+        return random.Random(int.from_bytes(digest[:8], 'big'))
+
+    def delay(self, rng: random.Random) -> float:
+        delay = self.latency + rng.uniform(-self.jitter, self.jitter) if self.jitter else self.latency
+        return max(0.0, delay)
+
+    def maybe_fail(self):
+        """Raise the same exception types the OpenAI client raises for 429 and 5xx responses"""
+        if self.error_rate and self._error_rng.random() < self.error_rate:
+            status_code = self._error_rng.choice([429, 500, 503])
+            request = httpx.Request('POST', 'http://local-llm/v1/chat/completions')
+            response = httpx.Response(status_code, request=request)
+            error_class = openai.RateLimitError if status_code == 429 else openai.InternalServerError
+            raise error_class(f"Local LLM injected error {status_code}", response=response, body=None)
+
+    def usage(self, prompt: str, content: str) -> CompletionUsage:
+        prompt_tokens = self.prompt_tokens or max(1, len(prompt) // 4)
+        completion_tokens = self.completion_tokens or max(1, len(content) // 4)
+        return CompletionUsage(
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            total_tokens=prompt_tokens + completion_tokens,
+        )
+
+    def content_for(self, prompt: str, response_model: type[BaseModel], rng: random.Random) -> str:
+        data = self.recorded_response(response_model, rng) or build_response(response_model, prompt, rng)
+        return response_model.model_validate(data).model_dump_json()
+
+    def complete(self, messages: list[dict], response_model: type[BaseModel]) -> tuple[str, CompletionUsage]:
+        """Return (JSON content, usage) for a structured-output request, after the configured latency"""
+        prompt = prompt_text(messages)
+        rng = self.rng_for(prompt)
+        time.sleep(self.delay(rng))
+        self.maybe_fail()
+
+        content = self.content_for(prompt, response_model, rng)
+        return content, self.usage(prompt, content)
+
+    def stream(self, messages: list[dict], response_model: type[BaseModel]) -> Iterator[str]:
+        """
+        Like complete, but returns an iterator of small content chunks with the latency spread over the stream.
+        Injected errors are raised here, before the first chunk.
+        """
+        prompt = prompt_text(messages)
+        rng = self.rng_for(prompt)
+        delay = self.delay(rng)
+        self.maybe_fail()
+
+        content = self.content_for(prompt, response_model, rng)
+        chunks = [content[i:i + STREAM_CHUNK_SIZE] for i in range(0, len(content), STREAM_CHUNK_SIZE)]
+
+        def emit():
+            time.sleep(delay * TIME_TO_FIRST_TOKEN_SHARE)
+            chunk_delay = delay * (1 - TIME_TO_FIRST_TOKEN_SHARE) / len(chunks)
+            for chunk in chunks:
+                yield chunk
+                time.sleep(chunk_delay)
+
+        return emit()
+
+    def recorded_response(self, response_model: type[BaseModel], rng: random.Random) -> dict | None:
+        """Pick a recorded response from FIXTURES_DIR/<ModelName>/*.json, if any"""
+        if not self.fixtures_dir:
+            return None
+        files = sorted((self.fixtures_dir / response_model.__name__).glob('*.json'))
+        if not files:
+            return None
+        with open(rng.choice(files), 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def image_url(self, prompt: str) -> str:
+        time.sleep(self.delay(self.rng_for(prompt)))
+        self.maybe_fail()
+        placeholder = Path(settings.BASE_DIR) / 'static' / 'img' / 'recipe_placeholder.png'
+        return "data:image/png;base64," + base64.b64encode(placeholder.read_bytes()).decode()
+
+
+# Synthetic responses
+def build_recipe(prompt: str, rng: random.Random) -> dict:
+    dish_idea = re.search(r'Dish idea:\s*(.+)', prompt)
+    servings = re.search(r'Servings:\s*(\d+)', prompt)
+    title = dish_idea.group(1).strip().title() if dish_idea else "Local Test Recipe"
+
+    ingredients = rng.sample(INGREDIENT_POOL, rng.randint(8, 12))
+    sections = rng.sample(SECTION_POOL, rng.randint(2, 4))
+    return {
+        'title': title,
+        'description': f"A simple, deterministic {title.lower()} generated by the local LLM stand-in.",
+        'servings': int(servings.group(1)) if servings else 4,
+        'ingredients': [{'name': name, 'quantity': quantity} for name, quantity in ingredients],
+        'instructions': [
+            {
+                'section_title': section,
+                'steps': [
+                    {'text': f"{section}: step {i} using the {rng.choice(ingredients)[0].split(',')[0].lower()}."}
+                    for i in range(1, rng.randint(2, 4) + 1)
+                ],
+            }
+            for section in sections
+        ],
+    }
+
+def guess_category(name: str) -> str:
+    lowered = name.lower()
+    for category, keywords in CATEGORY_KEYWORDS.items():
+        if any(keyword in lowered for keyword in keywords):
+            return category
+    return 'pantry'
+
+SHOPPING_LIST_ROW = re.compile(r'^\s*(?P<number>\d+)\|(?P<name>[^|\n]*)\|(?P<quantity>[^|\n]*)$', re.MULTILINE)
+
+def build_shopping_list(prompt: str, rng: random.Random) -> dict:
+    rows = []
+    for match in SHOPPING_LIST_ROW.finditer(prompt):
+        name = match.group('name').split(',')[0].strip()
+        if name.lower() in EXCLUDED_ITEMS:
+            continue
+        rows.append(f"{match.group('number')}|{name}|{match.group('quantity').strip()}|{guess_category(name)}")
+    return {'rows': rows}
+
+def build_generic(model: type[BaseModel], rng: random.Random) -> dict:
+    """Fill any pydantic model with placeholder values"""
+    def value_for(annotation):
+        origin = getattr(annotation, '__origin__', None)
+        if origin is list:
+            return [value_for(annotation.__args__[0]) for _ in range(3)]
+        if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+            return build_generic(annotation, rng)
+        if annotation is int:
+            return rng.randint(1, 10)
+        if annotation is float:
+            return round(rng.uniform(0, 10), 2)
+        if annotation is bool:
+            return rng.random() < 0.5
+        return f"lorem {rng.randint(1, 1000)}"
+
+    return {name: value_for(field.annotation) for name, field in model.model_fields.items()}
+
+RESPONSE_BUILDERS = {
+    'Recipe': build_recipe,
+    'ShoppingListRows': build_shopping_list,
+}
+
+def build_response(model: type[BaseModel], prompt: str, rng: random.Random) -> dict:
+    builder = RESPONSE_BUILDERS.get(model.__name__)
+    if builder:
+        return builder(prompt, rng)
+    return build_generic(model, rng)
+
+
+# In-process client (LLM_PROVIDER = 'local')
+class LocalLLMClient:
+    """Drop-in for the parts of openai.OpenAI used by the generators"""
+
+    def __init__(self, engine: LocalLLMEngine = None):
+        self.engine = engine or LocalLLMEngine.from_settings()
+        self.beta = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(parse=self._parse, stream=self._stream)))
+        self.images = SimpleNamespace(generate=self._generate_image)
+
+    def _parse(self, model: str, response_format: type[BaseModel], messages: list[dict], **kwargs) -> ParsedChatCompletion:
+        content, usage = self.engine.complete(messages, response_format)
+        return parsed_completion(model, response_format, content, usage)
+
+    def _stream(self, model: str, response_format: type[BaseModel], messages: list[dict], **kwargs) -> 'LocalChatCompletionStream':
+        return LocalChatCompletionStream(self.engine, model, response_format, messages)
+
+    def _generate_image(self, prompt: str, model: str = 'dall-e-3', **kwargs) -> ImagesResponse:
+        return ImagesResponse(created=int(time.time()), data=[Image(url=self.engine.image_url(prompt))])
+
+
+def parsed_completion(model: str, response_format: type[BaseModel], content: str, usage: CompletionUsage) -> ParsedChatCompletion:
+    message = ParsedChatCompletionMessage(
+        role='assistant',
+        content=content,
+        parsed=response_format.model_validate_json(content),
+    )
+    return ParsedChatCompletion(
+        id=f"chatcmpl-local-{uuid.uuid4().hex[:12]}",
+        object='chat.completion',
+        created=int(time.time()),
+        model=model,
+        choices=[ParsedChoice(index=0, finish_reason='stop', message=message)],
+        usage=usage,
+    )
+
+class LocalChatCompletionStream:
+    """Mirrors the context manager returned by client.beta.chat.completions.stream"""
+
+    def __init__(self, engine: LocalLLMEngine, model: str, response_format: type[BaseModel], messages: list[dict]):
+        self.engine = engine
+        self.model = model
+        self.response_format = response_format
+        self.messages = messages
+        self.content = None
+        self.chunks = None
+
+    def __enter__(self):
+        # Injected errors are raised on opening the stream, as the OpenAI client raises HTTP errors
+        self.chunks = self.engine.stream(self.messages, self.response_format)
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def __iter__(self):
+        snapshot = ''
+        for chunk in self.chunks or self.engine.stream(self.messages, self.response_format):
+            snapshot += chunk
+            yield ContentDeltaEvent(type='content.delta', delta=chunk, snapshot=snapshot, parsed=None)
+        self.content = snapshot
+        yield ContentDoneEvent[self.response_format](type='content.done', content=snapshot, parsed=self.response_format.model_validate_json(snapshot))
+
+    def get_final_completion(self) -> ParsedChatCompletion:
+        if self.content is None:
+            for _ in self:
+                pass
+        usage = self.engine.usage(prompt_text(self.messages), self.content)
+        return parsed_completion(self.model, self.response_format, self.content, usage)
+
+
+# HTTP stand-in server (python manage.py run_local_llm)
+def response_models() -> dict[str, type[BaseModel]]:
+    from .recipe_generator import Recipe
+    from .shopping_list_generator import ShoppingListRows
+    return {'Recipe': Recipe, 'ShoppingListRows': ShoppingListRows}
+
+def make_local_llm_server(engine: LocalLLMEngine, host: str = '127.0.0.1', port: int = 8765) -> ThreadingHTTPServer:
+    """OpenAI-compatible server exposing /v1/chat/completions and /v1/images/generations"""
+    models = response_models()
+
+    class Handler(BaseHTTPRequestHandler):
+        def send_json(self, status: int, data: dict):
+            body = json.dumps(data).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            length = int(self.headers.get('Content-Length', 0))
+            request = json.loads(self.rfile.read(length) or b'{}')
+            try:
+                if self.path.endswith('/chat/completions') and request.get('stream'):
+                    self.stream_chat_completion(request)
+                elif self.path.endswith('/chat/completions'):
+                    self.send_json(200, self.chat_completion(request))
+                elif self.path.endswith('/images/generations'):
+                    url = engine.image_url(request.get('prompt', ''))
+                    self.send_json(200, {'created': int(time.time()), 'data': [{'url': url}]})
+                else:
+                    self.send_json(404, {'error': {'message': f"Unknown endpoint {self.path}"}})
+            except openai.APIStatusError as e:
+                self.send_json(e.status_code, {'error': {'message': e.message, 'type': 'local_llm_injected'}})
+
+        def response_model(self, request: dict) -> type[BaseModel]:
+            schema_name = request.get('response_format', {}).get('json_schema', {}).get('name')
+            if schema_name not in models:
+                raise openai.BadRequestError(
+                    f"Unsupported response_format {schema_name!r}",
+                    response=httpx.Response(400, request=httpx.Request('POST', self.path)),
+                    body=None,
+                )
+            return models[schema_name]
+
+        def stream_chat_completion(self, request: dict):
+            chunks = engine.stream(request.get('messages', []), self.response_model(request))
+            completion_id = f"chatcmpl-local-{uuid.uuid4().hex[:12]}"
+
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.end_headers()
+
+            def send_chunk(choices: list[dict], **extra):
+                chunk = {
+                    'id': completion_id,
+                    'object': 'chat.completion.chunk',
+                    'created': int(time.time()),
+                    'model': request.get('model', 'local'),
+                    'choices': choices,
+                    **extra,
+                }
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                self.wfile.flush()
+
+            def choice(delta: dict, finish_reason: str = None) -> dict:
+                return {'index': 0, 'delta': delta, 'finish_reason': finish_reason, 'logprobs': None}
+
+            content = ''
+            send_chunk([choice({'role': 'assistant', 'content': ''})])
+            for chunk in chunks:
+                content += chunk
+                send_chunk([choice({'content': chunk})])
+            send_chunk([choice({}, finish_reason='stop')])
+            if (request.get('stream_options') or {}).get('include_usage'):
+                usage = engine.usage(prompt_text(request.get('messages', [])), content)
+                send_chunk([], usage=usage.model_dump())
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+
+        def chat_completion(self, request: dict) -> dict:
+            content, usage = engine.complete(request.get('messages', []), self.response_model(request))
+            return {
+                'id': f"chatcmpl-local-{uuid.uuid4().hex[:12]}",
+                'object': 'chat.completion',
+                'created': int(time.time()),
+                'model': request.get('model', 'local'),
+                'choices': [{
+                    'index': 0,
+                    'finish_reason': 'stop',
+                    'logprobs': None,
+                    'message': {'role': 'assistant', 'content': content, 'refusal': None},
+                }],
+                'usage': usage.model_dump(),
+            }
+
+        def log_message(self, format, *args):
+            pass
+
+    return ThreadingHTTPServer((host, port), Handler)
@@ -0,0 +1,101 @@
+import re
+from fractions import Fraction
+from functools import lru_cache
+from typing import NamedTuple
+
+# Spellings LLM recipes use for each unit, by canonical unit. Count nouns (cloves, cans...) are
+# canonically singular; sizes like "large" are modifiers, since "2 large" is a count of two.
+UNIT_ALIASES = {
+    'g': ['g', 'gram', 'grams', 'gr'],
+    'kg': ['kg', 'kilogram', 'kilograms', 'kilo', 'kilos'],
+    'mg': ['mg', 'milligram', 'milligrams'],
+    'ml': ['ml', 'milliliter', 'milliliters', 'millilitre', 'millilitres'],
+    'cl': ['cl', 'centiliter', 'centiliters', 'centilitre', 'centilitres'],
+    'dl': ['dl', 'deciliter', 'deciliters', 'decilitre', 'decilitres'],
+    'l': ['l', 'liter', 'liters', 'litre', 'litres'],
+    'tsp': ['tsp', 'tsps', 'teaspoon', 'teaspoons'],
+    'tbsp': ['tbsp', 'tbsps', 'tablespoon', 'tablespoons'],
+    'cup': ['cup', 'cups'],
+    'fl oz': ['fl oz', 'fluid ounce', 'fluid ounces'],
+    'oz': ['oz', 'ounce', 'ounces'],
+    'lb': ['lb', 'lbs', 'pound', 'pounds'],
+    'pint': ['pint', 'pints'],
+    'quart': ['quart', 'quarts'],
+    'clove': ['clove', 'cloves'],
+    'can': ['can', 'cans', 'tin', 'tins'],
+    'slice': ['slice', 'slices'],
+    'pinch': ['pinch', 'pinches'],
+    'dash': ['dash', 'dashes'],
+    'bunch': ['bunch', 'bunches'],
+    'sprig': ['sprig', 'sprigs'],
+    'stalk': ['stalk', 'stalks'],
+    'handful': ['handful', 'handfuls'],
+    'piece': ['piece', 'pieces'],
+    'sheet': ['sheet', 'sheets'],
+    'leaf': ['leaf', 'leaves'],
+}
+UNITS = {alias: unit for unit, aliases in UNIT_ALIASES.items() for alias in aliases}
+
+VULGAR_FRACTIONS = {'½': '1/2', '⅓': '1/3', '⅔': '2/3', '¼': '1/4', '¾': '3/4', '⅛': '1/8'}
+
+NUMBER = r'\d+(?:\.\d+)?'
+QUANTITY_REGEX = re.compile(
+    rf'''
+    (?:
+        (?P<whole>\d+)\s+(?P<numerator>\d+)/(?P<denominator>\d+)  # 1 1/2
+      | (?P<fraction>\d+/\d+)                                     # 1/2
+      | (?P<number>{NUMBER})(?![\d.]|\s*(?:-|–|to\b|x\b|/))       # 1.5, but not ranges like 2-3 or 4 x 200g
+      | (?P<article>an?)\b                                        # a pinch
+    )
+    \s*
+    (?:(?P<unit>{'|'.join(sorted((re.escape(alias) for alias in UNITS), key=len, reverse=True))})\b\.?)?
+    [\s,]*
+    (?P<modifier>.*)
+    ''',
+    re.IGNORECASE | re.VERBOSE | re.DOTALL,
+)
+
+
+class ParsedQuantity(NamedTuple):
+    amount: Fraction | None # None for quantities that are not a single amount, e.g. "to taste" or "2-3 tbsp"
+    unit: str = '' # Canonical unit, '' for plain counts
+    modifier: str = '' # The rest, e.g. "large", "finely chopped", "(about 1 cup)"
+
+
+@lru_cache(maxsize=4096)
+def parse_quantity(quantity: str) -> ParsedQuantity:
+    """Split a free-text quantity like "1 1/2 cups, sifted" into amount, canonical unit and modifier"""
+    text = quantity.strip()
+    for vulgar, fraction in VULGAR_FRACTIONS.items():
+        text = re.sub(rf'(\d)\s*{vulgar}', rf'\1 {fraction}', text).replace(vulgar, fraction)
+
+    match = QUANTITY_REGEX.fullmatch(text)
+    if not match:
+        return ParsedQuantity(None, '', text)
+
+    try:
+        if match['whole']:
+            amount = int(match['whole']) + Fraction(int(match['numerator']), int(match['denominator']))
+        elif match['fraction']:
+            amount = Fraction(match['fraction'])
+        elif match['number']:
+            amount = Fraction(match['number'])
+        else:
+            amount = Fraction(1)
+    except ZeroDivisionError:
+        return ParsedQuantity(None, '', text)
+
+    unit = UNITS[match['unit'].lower()] if match['unit'] else ''
+    if match['article'] and not unit:
+        return ParsedQuantity(None, '', text) # "A few", "an apple"
+    return ParsedQuantity(amount, unit, match['modifier'].strip())
+
+
+# Ingredient's parsed quantity columns, in the order stored_quantity takes them
+QUANTITY_COLUMNS = ('amount_numerator', 'amount_denominator', 'unit', 'modifier')
+
+def stored_quantity(quantity: str, numerator: int | None, denominator: int | None, unit: str, modifier: str) -> ParsedQuantity:
+    """An ingredient's quantity as saved in its QUANTITY_COLUMNS, parsed here for rows saved before they were filled in"""
+    if (numerator is None and not unit and not modifier) or len(modifier) >= 50: # Unparsed, or modifier truncated
+        return parse_quantity(quantity)
+    return ParsedQuantity(Fraction(numerator, denominator) if numerator is not None else None, unit, modifier)
@@ -1,8 +1,15 @@
-from openai import OpenAI
+import logging
 from pydantic import BaseModel
-import os
+from .llm_cache import make_cache_key
+from .http_client import llm_timeout
+from .llm_client import get_llm_client, llm_circuit_breaker
+from .llm_telemetry import record_llm_call
+from .singleflight import singleflight
 
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+# Bump whenever the prompt below changes so stale cached responses are not reused
+PROMPT_VERSION = 1
+
+logger = logging.getLogger(__name__)
 
 # Base models (maps to JSON response and models.py)
 class Ingredient(BaseModel):
@@ -24,11 +31,19 @@ class Recipe(BaseModel):
     instructions: list[InstructionSection]  # List of instruction sections, each containing ordered steps
 
 
-# OpenAI API function
-def generate_recipe(dish_idea, servings, notes="", dietary_preferences="", units="metric"):
-    """
-    Generates a recipe in JSON format. See https://platform.openai.com/docs/guides/structured-outputs
-    """
+# Prompt helpers (shared with the streaming generator in recipe_stream.py)
+def recipe_cache_key(dish_idea, servings, notes="", dietary_preferences="", units="metric") -> str:
+    return make_cache_key(
+        'recipe',
+        PROMPT_VERSION,
+        dish_idea=dish_idea,
+        servings=servings,
+        notes=notes,
+        dietary_preferences=dietary_preferences,
+        units=units,
+    )
+
+def build_recipe_messages(dish_idea, servings, notes="", dietary_preferences="", units="metric") -> list[dict]:
     user_input = f"""
     Make me a recipe based on the following guidelines:
 
@@ -40,19 +55,38 @@ def generate_recipe(dish_idea, servings, notes="", dietary_preferences="", units
     Provide quantities in {units} units; teaspoons and tablespoons are acceptable
     Group instructions into a limited number of instruction sections
     """
+    return [
+        {"role": "system", "content": "You are an experienced home cook. Generate a detailed recipe in JSON format."},
+        {"role": "user", "content": user_input}
+    ]
+
+
+# OpenAI API function
+def generate_recipe(dish_idea, servings, notes="", dietary_preferences="", units="metric", use_cache=True):
+    """
+    Generates a recipe in JSON format. See https://platform.openai.com/docs/guides/structured-outputs
+    Identical (normalized) requests are served from the LLM response cache, and concurrent
+    identical requests share a single API call.
+    """
+    cache_key = recipe_cache_key(dish_idea, servings, notes, dietary_preferences, units)
+    messages = build_recipe_messages(dish_idea, servings, notes, dietary_preferences, units)
+
+    with record_llm_call('recipe', model="gpt-4o", prompt_version=PROMPT_VERSION) as call:
+        def call_api():
+            call.cache_status = 'miss'
+            with llm_circuit_breaker().guard():
+                completion = get_llm_client().beta.chat.completions.parse(
+                    model="gpt-4o",
+                    response_format=Recipe,
+                    messages=messages,
+                    timeout=llm_timeout('recipe'),
+                )
+            call.add_usage(completion.usage)
+            return completion.choices[0].message.content
 
-    try:
-        completion = client.beta.chat.completions.parse(
-            model="gpt-4o",
-            response_format=Recipe,
-            messages=[
-                {"role": "system", "content": "You are an experienced home cook. Generate a detailed recipe in JSON format."},
-                {"role": "user", "content": user_input}
-            ],
-        )
-        
-        recipe_str = completion.choices[0].message.content
-        return recipe_str
-    except Exception as e:
-        print(f"Error generating recipe: {e}")
-        raise e
\ No newline at end of file
+        try:
+            recipe_str = singleflight('recipe', cache_key, call_api, use_cache=use_cache)
+            return recipe_str
+        except Exception:
+            logger.exception("Error generating recipe")
+            raise
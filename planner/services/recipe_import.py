@@ -0,0 +1,146 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from django.contrib.auth.models import User
+from django.db import transaction
+from planner.models import InstructionSection as DBInstructionSection, Recipe as DBRecipe
+from .digest import recipe_ingredients_digest
+from .recipe_generator import Recipe
+from .recipe_parser import parse_recipe_file
+from .recipe_repository import save_recipes_to_db, update_recipes_in_db
+
+
+@dataclass
+class ParsedFile:
+    path: Path
+    recipe: Recipe | None = None
+    error: str = ''
+
+
+@dataclass
+class ImportResult:
+    files: int = 0
+    created: int = 0
+    updated: int = 0
+    skipped: int = 0 # Title already in the database (or earlier in the same import)
+    unchanged: int = 0 # With update, existing recipes whose contents are the same
+    failed: list[ParsedFile] = field(default_factory=list)
+    elapsed: float = 0
+
+    @property
+    def files_per_second(self) -> float:
+        return self.files / self.elapsed if self.elapsed else 0
+
+
+def parse_file(path: Path) -> ParsedFile:
+    """Runs in a pool worker, so parse errors are returned rather than raised"""
+    try:
+        return ParsedFile(path, recipe=parse_recipe_file(path))
+    except Exception as e:
+        return ParsedFile(path, error=str(e))
+
+def parse_files(paths: list[Path], workers: int = None) -> list[ParsedFile]:
+    """Parse recipe files across a process pool (in this process if workers is 1)"""
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(paths) < 2:
+        return [parse_file(path) for path in paths]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # Large chunks keep the per-file pickling overhead small
+        return list(pool.map(parse_file, paths, chunksize=max(len(paths) // (workers * 4), 1)))
+
+def chunked(items: list, size: int):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+def saved_instructions(recipe_ids) -> dict[int, list[tuple[str, list[str]]]]:
+    """(section title, step texts) of each saved recipe, in order, in one query"""
+    sections = {}
+    for recipe_id, section_id, title, text in (
+        DBInstructionSection.objects
+        .filter(recipe_id__in=recipe_ids)
+        .order_by('recipe_id', 'order', 'id', 'steps__order')
+        .values_list('recipe_id', 'id', 'title', 'steps__text')
+    ):
+        section = sections.setdefault(recipe_id, {}).setdefault(section_id, (title, []))
+        if text is not None:
+            section[1].append(text)
+    return {recipe_id: list(recipe_sections.values()) for recipe_id, recipe_sections in sections.items()}
+
+def recipe_instructions(recipe: Recipe) -> list[tuple[str, list[str]]]:
+    return [(section.section_title, [step.text for step in section.steps]) for section in recipe.instructions]
+
+def import_recipes(
+    parsed_files: list[ParsedFile],
+    user: User,
+    status: str = 'published',
+    update: bool = False,
+    dry_run: bool = False,
+    chunk_size: int = 1000,
+) -> ImportResult:
+    """
+    Save parsed recipes whose titles are not in the database yet, in bulk, one transaction per chunk.
+    With update, recipes with an existing title are overwritten instead of skipped, unless nothing
+    has changed: their ingredients digest, description and instructions are all the same.
+    With dry_run, only count what would be created, updated and skipped.
+    """
+    result = ImportResult(files=len(parsed_files))
+    result.failed = [parsed for parsed in parsed_files if parsed.error]
+    recipes = [parsed.recipe for parsed in parsed_files if not parsed.error]
+
+    # One query for every title in the import
+    existing, saved = {}, {}
+    for recipe_id, title, digest, description in (
+        DBRecipe.objects.filter(title__in={r.title for r in recipes}).values_list('id', 'title', 'ingredients_digest', 'description')
+    ):
+        existing.setdefault(title, recipe_id)
+        saved.setdefault(title, (digest, description))
+
+    def is_unchanged(recipe: Recipe) -> bool:
+        return saved[recipe.title] == (recipe_ingredients_digest(recipe), recipe.description)
+
+    # Instructions are only compared for recipes whose ingredients and description are unchanged
+    instructions = {}
+    if update:
+        instructions = saved_instructions([existing[r.title] for r in recipes if r.title in existing and is_unchanged(r)])
+
+    to_create, to_update, seen = [], [], set()
+    for recipe in recipes:
+        if recipe.title in seen:
+            result.skipped += 1
+        elif (
+            recipe.title in existing and update and is_unchanged(recipe)
+            and instructions.get(existing[recipe.title], []) == recipe_instructions(recipe)
+        ):
+            result.unchanged += 1
+        elif recipe.title in existing and update:
+            to_update.append(recipe)
+        elif recipe.title in existing:
+            result.skipped += 1
+        else:
+            to_create.append(recipe)
+        seen.add(recipe.title)
+
+    if dry_run:
+        result.created, result.updated = len(to_create), len(to_update)
+        return result
+
+    for chunk in chunked(to_create, chunk_size):
+        save_recipes_to_db(chunk, user=user, status=status)
+        result.created += len(chunk)
+
+    for chunk in chunked(to_update, chunk_size):
+        with transaction.atomic():
+            db_recipes = DBRecipe.objects.in_bulk([existing[recipe.title] for recipe in chunk])
+            update_recipes_in_db([(recipe, db_recipes[existing[recipe.title]]) for recipe in chunk])
+        result.updated += len(chunk)
+
+    return result
+
+def import_recipe_files(paths: list[Path], user: User, workers: int = None, **options) -> ImportResult:
+    """Parse recipe files in parallel and import them, see import_recipes for options"""
+    started = time.perf_counter()
+    result = import_recipes(parse_files(paths, workers), user, **options)
+    result.elapsed = time.perf_counter() - started
+    return result
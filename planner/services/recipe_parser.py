@@ -1,7 +1,7 @@
 from typing import Dict, Any, List
 import json
 from pathlib import Path
-from pydantic import ValidationError
+from pydantic import TypeAdapter, ValidationError
 from .recipe_generator import Recipe, Ingredient, InstructionSection, InstructionStep
 
 class RecipeParser:
@@ -81,14 +81,39 @@ class RecipeParser:
         except KeyError as e:
             raise ValueError(f"Missing required field: {str(e)}")
 
-# Helper functions
-def parse_recipe_file(file_path: str | Path) -> Recipe:
-    """Parse a recipe from a JSON file"""
-    parser = RecipeParser.from_file(file_path)
-    return parser.validate()
+# Fast path: one compiled validator straight from JSON bytes to Recipe.
+# Invalid input is re-run through RecipeParser for its detailed error messages.
+RECIPE_LIST_ADAPTER = TypeAdapter(list[Recipe])
 
-def parse_recipe_string(json_str: str) -> Recipe:
+def parse_recipe_string(json_str: str | bytes) -> Recipe:
     """Parse a recipe from a JSON string"""
+    try:
+        return Recipe.model_validate_json(json_str)
+    except ValidationError:
+        pass
     recipe_data = json.loads(json_str)
     parser = RecipeParser(recipe_data)
     return parser.validate()
+
+def parse_recipe_list_string(json_str: str | bytes) -> list[Recipe]:
+    """Parse a JSON array of recipes in one call"""
+    try:
+        return RECIPE_LIST_ADAPTER.validate_json(json_str)
+    except ValidationError:
+        pass
+    recipes_data = json.loads(json_str)
+    if not isinstance(recipes_data, list):
+        raise ValueError("Expected a JSON array of recipes")
+    recipes = []
+    for i, recipe_data in enumerate(recipes_data):
+        try:
+            recipes.append(RecipeParser(recipe_data).validate())
+        except ValueError as e:
+            raise ValueError(f"Recipe {i}: {e}") from e
+    return recipes
+
+# Helper functions
+def parse_recipe_file(file_path: str | Path) -> Recipe:
+    """Parse a recipe from a JSON file"""
+    with open(file_path, 'rb') as f:
+        return parse_recipe_string(f.read())
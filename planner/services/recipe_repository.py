@@ -1,51 +1,141 @@
 from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
 from planner.models import Recipe as DBRecipe
 from planner.models import Ingredient as DBIngredient
 from planner.models import InstructionSection as DBInstructionSection
 from planner.models import InstructionStep as DBInstructionStep
-from .recipe_generator import Recipe
+from .digest import recipe_ingredients_digest
+from .quantity_parser import parse_quantity
+from .recipe_generator import Ingredient, Recipe
+
+PARSED_QUANTITY_FIELDS = ['amount_numerator', 'amount_denominator', 'unit', 'modifier']
+
+def set_parsed_quantity(db_ingredient: DBIngredient) -> DBIngredient:
+    """Fill in amount, unit and modifier from the ingredient's quantity; every write of a quantity goes through here"""
+    db_ingredient.amount, db_ingredient.unit, modifier = parse_quantity(db_ingredient.quantity)
+    db_ingredient.modifier = modifier[:50]
+    return db_ingredient
+
+def build_ingredient(db_recipe: DBRecipe, ingredient: Ingredient, order: int) -> DBIngredient:
+    """Unsaved ingredient row with its quantity parsed into amount, unit and modifier"""
+    return set_parsed_quantity(DBIngredient(
+        recipe=db_recipe,
+        name=ingredient.name,
+        quantity=ingredient.quantity,
+        order=order
+    ))
 
 class RecipeRepository:
     @staticmethod
-    def save_recipe(recipe: Recipe, user=None, status='published') -> DBRecipe:
-        """Save Recipe object to database"""
-        # Create the recipe
-        db_recipe = DBRecipe.objects.create(
-            status=status,
-            title=recipe.title,
-            servings=recipe.servings,
-            description=recipe.description,
-            created_by=user,
-        )
+    def save_recipes(recipes: list[Recipe], user=None, status='published', generation_keys: list[str] = None) -> list[DBRecipe]:
+        """
+        Save Recipe objects to database in one transaction, with one bulk INSERT each
+        for recipes, ingredients, instruction sections and steps however many recipes there are
+        """
+        generation_keys = generation_keys or [''] * len(recipes)
+
+        with transaction.atomic():
+            # Create the recipes
+            db_recipes = DBRecipe.objects.bulk_create([
+                DBRecipe(
+                    status=status,
+                    title=recipe.title,
+                    servings=recipe.servings,
+                    description=recipe.description,
+                    created_by=user,
+                    generation_key=generation_key,
+                    ingredients_digest=recipe_ingredients_digest(recipe),
+                )
+                for recipe, generation_key in zip(recipes, generation_keys)
+            ])
+
+            RecipeRepository.save_contents(list(zip(recipes, db_recipes)))
+
+        return db_recipes
+
+    @staticmethod
+    def update_recipes(pairs: list[tuple[Recipe, DBRecipe]]) -> list[DBRecipe]:
+        """Overwrite each saved recipe with its Recipe object, replacing its ingredients and instructions"""
+        with transaction.atomic():
+            now = timezone.now()
+            for recipe, db_recipe in pairs:
+                db_recipe.title = recipe.title
+                db_recipe.servings = recipe.servings
+                db_recipe.description = recipe.description
+                db_recipe.ingredients_digest = recipe_ingredients_digest(recipe)
+                db_recipe.modified_at = now # bulk_update skips auto_now
+            db_recipes = [db_recipe for _, db_recipe in pairs]
+            DBRecipe.objects.bulk_update(db_recipes, ['title', 'servings', 'description', 'ingredients_digest', 'modified_at'])
+
+            # Steps cascade with their sections
+            DBIngredient.objects.filter(recipe__in=db_recipes).delete()
+            DBInstructionSection.objects.filter(recipe__in=db_recipes).delete()
+            RecipeRepository.save_contents(pairs)
+
+        return db_recipes
 
+    @staticmethod
+    def save_contents(pairs: list[tuple[Recipe, DBRecipe]]):
+        """Bulk insert the ingredients, instruction sections and steps of each Recipe under its saved recipe"""
         # Create ingredients with order
-        for i, ing in enumerate(recipe.ingredients, 1):
-            DBIngredient.objects.create(
-                recipe=db_recipe,
-                name=ing.name,
-                quantity=ing.quantity,
-                order=i
-            )
+        DBIngredient.objects.bulk_create([
+            build_ingredient(db_recipe, ing, i)
+            for recipe, db_recipe in pairs
+            for i, ing in enumerate(recipe.ingredients, 1)
+        ])
 
         # Create instruction sections
-        for i, section in enumerate(recipe.instructions, 1):
-            db_section = DBInstructionSection.objects.create(
-                recipe=db_recipe,
-                title=section.section_title,
-                order=i
+        sections = [
+            (section, DBInstructionSection(recipe=db_recipe, title=section.section_title, order=i))
+            for recipe, db_recipe in pairs
+            for i, section in enumerate(recipe.instructions, 1)
+        ]
+        DBInstructionSection.objects.bulk_create([db_section for _, db_section in sections])
+
+        # Create steps for all sections
+        DBInstructionStep.objects.bulk_create([
+            DBInstructionStep(
+                section=db_section,
+                text=step.text,
+                order=j
             )
-            
-            # Create steps for this section
-            for j, step in enumerate(section.steps, 1):
-                DBInstructionStep.objects.create(
-                    section=db_section,
-                    text=step.text,
-                    order=j
-                )
+            for section, db_section in sections
+            for j, step in enumerate(section.steps, 1)
+        ])
+
+    @staticmethod
+    def save_recipe(recipe: Recipe, user=None, status='published', generation_key='') -> DBRecipe:
+        """Save Recipe object to database"""
+        return RecipeRepository.save_recipes([recipe], user, status, [generation_key])[0]
+
+# Helper functions
+def save_recipe_to_db(recipe: Recipe, user=None, status='published', generation_key='') -> DBRecipe:
+    service = RecipeRepository()
+    return service.save_recipe(recipe, user, status, generation_key)
 
-        return db_recipe
+def save_recipes_to_db(recipes: list[Recipe], user=None, status='published', generation_keys: list[str] = None) -> list[DBRecipe]:
+    service = RecipeRepository()
+    return service.save_recipes(recipes, user, status, generation_keys)
 
-# Helper function
-def save_recipe_to_db(recipe: Recipe, user=None, status='published') -> DBRecipe:
+def update_recipes_in_db(pairs: list[tuple[Recipe, DBRecipe]]) -> list[DBRecipe]:
     service = RecipeRepository()
-    return service.save_recipe(recipe, user, status)
\ No newline at end of file
+    return service.update_recipes(pairs)
+
+def backfill_parsed_quantities(ingredients=None, batch_size: int = 2000) -> int:
+    """
+    Parse the quantities of ingredient rows saved before quantities were parsed (or of all given rows,
+    e.g. a recipe's ingredients after they were edited outside the repository)
+    """
+    if ingredients is None:
+        ingredients = DBIngredient.objects.filter(amount_numerator__isnull=True, unit='', modifier='')
+    ingredients = ingredients.order_by('id').only('id', 'quantity')
+
+    updated, last_id = 0, 0
+    while batch := list(ingredients.filter(id__gt=last_id)[:batch_size]):
+        for db_ingredient in batch:
+            set_parsed_quantity(db_ingredient)
+        DBIngredient.objects.bulk_update(batch, PARSED_QUANTITY_FIELDS)
+        updated += len(batch)
+        last_id = batch[-1].id
+    return updated
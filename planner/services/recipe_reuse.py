@@ -0,0 +1,60 @@
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Q
+from planner.models import Recipe as DBRecipe
+from .llm_cache import make_cache_key
+from .recipe_generator import Ingredient, InstructionSection, InstructionStep, Recipe
+from .recipe_repository import save_recipe_to_db
+from .quantity_parser import QUANTITY_COLUMNS
+from .scaling_engine import ingredient_quantities, scale_ingredients
+
+
+def recipe_generation_key(dish_idea, notes="", dietary_preferences="", units="metric") -> str:
+    """Key for recipes generated from the same (normalized) request, whatever the servings"""
+    return make_cache_key(
+        'recipe_generation',
+        1,
+        dish_idea=dish_idea,
+        notes=notes,
+        dietary_preferences=dietary_preferences,
+        units=units,
+    )
+
+def find_reusable_recipe(user: User, generation_key: str, servings: int) -> DBRecipe | None:
+    """The latest of the user's own or published recipes generated from the same request for a different number of servings"""
+    return (
+        DBRecipe.objects
+        .filter(Q(created_by=user) | Q(status='published'), generation_key=generation_key)
+        .exclude(servings=servings)
+        .order_by('-created_at')
+        .first()
+    )
+
+def clone_scaled_recipe(recipe: DBRecipe, servings: int, user: User) -> DBRecipe:
+    """Save a draft copy of recipe for user with its ingredient quantities rescaled to servings"""
+    ingredients, parsed = ingredient_quantities(recipe.ingredients.values_list('name', 'quantity', *QUANTITY_COLUMNS))
+    scaled_recipe = Recipe(
+        title=recipe.title,
+        description=recipe.description,
+        servings=servings,
+        ingredients=[
+            Ingredient(name=name, quantity=scaled.quantity)
+            for (name, _), scaled in zip(ingredients, scale_ingredients(ingredients, recipe.servings, servings, parsed))
+        ],
+        instructions=[
+            InstructionSection(
+                section_title=section.title,
+                steps=[InstructionStep(text=step.text) for step in section.steps.all()],
+            )
+            for section in recipe.instruction_sections.prefetch_related('steps')
+        ],
+    )
+
+    with transaction.atomic():
+        clone = save_recipe_to_db(scaled_recipe, user=user, status='draft', generation_key=recipe.generation_key)
+        if recipe.image:
+            # Share the image file rather than generating a new one
+            clone.image = recipe.image.name
+            clone.save(update_fields=['image'])
+        clone.saved_to_my_recipes_by.add(user)
+    return clone
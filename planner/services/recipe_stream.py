@@ -0,0 +1,124 @@
+from typing import Any, Iterator, NamedTuple
+import jiter
+from pydantic import ValidationError
+from .llm_cache import get_cached_response, set_cached_response
+from .http_client import llm_timeout
+from .llm_client import get_llm_client, llm_circuit_breaker
+from .llm_telemetry import record_llm_call
+from .recipe_generator import PROMPT_VERSION, Ingredient, InstructionSection, Recipe, build_recipe_messages, recipe_cache_key
+
+
+class RecipeStreamEvent(NamedTuple):
+    name: str  # 'title', 'description', 'servings', 'ingredient', 'section' or 'complete'
+    data: Any
+
+
+class RecipeStreamAssembler:
+    """
+    Turns the growing JSON snapshot of a streamed Recipe completion into events, emitting each
+    field, ingredient and instruction section once it is complete and valid against the Recipe model.
+    """
+
+    def __init__(self):
+        self.snapshot = ''
+        self.emitted_fields = set()
+        self.ingredient_count = 0
+        self.section_count = 0
+
+    def feed(self, delta: str) -> list[RecipeStreamEvent]:
+        self.snapshot += delta
+        try:
+            # Partial mode leaves out strings that are still being written
+            data = jiter.from_json(self.snapshot.encode(), partial_mode=True)
+        except ValueError:
+            return []
+        if not isinstance(data, dict):
+            return []
+        return self._events(data, complete=False)
+
+    def finish(self) -> list[RecipeStreamEvent]:
+        """Validate the full response, emitting anything still pending followed by the 'complete' event"""
+        recipe = Recipe.model_validate_json(self.snapshot)
+        events = self._events(recipe.model_dump(), complete=True)
+        events.append(RecipeStreamEvent('complete', recipe))
+        return events
+
+    def _events(self, data: dict, complete: bool) -> list[RecipeStreamEvent]:
+        events = []
+        for field in ('title', 'description'):
+            if field in data and field not in self.emitted_fields:
+                self.emitted_fields.add(field)
+                events.append(RecipeStreamEvent(field, data[field]))
+
+        # A number may still be growing until the next key appears
+        if 'servings' in data and 'servings' not in self.emitted_fields and (complete or 'ingredients' in data):
+            self.emitted_fields.add('servings')
+            events.append(RecipeStreamEvent('servings', data['servings']))
+
+        ingredients = data.get('ingredients', [])
+        while self.ingredient_count < len(ingredients):
+            try:
+                ingredient = Ingredient.model_validate(ingredients[self.ingredient_count])
+            except ValidationError:
+                break  # Still being written
+            self.ingredient_count += 1
+            events.append(RecipeStreamEvent('ingredient', ingredient))
+
+        # A section's steps are only final once the next section has started
+        sections = data.get('instructions', [])
+        ready = len(sections) if complete else len(sections) - 1
+        while self.section_count < ready:
+            section = InstructionSection.model_validate(sections[self.section_count])
+            self.section_count += 1
+            events.append(RecipeStreamEvent('section', section))
+
+        return events
+
+
+def stream_recipe(dish_idea, servings, notes="", dietary_preferences="", units="metric", use_cache=True) -> Iterator[RecipeStreamEvent]:
+    """
+    Streaming counterpart of generate_recipe: yields RecipeStreamEvents as the completion arrives,
+    ending with a 'complete' event carrying the validated Recipe. Shares generate_recipe's cache,
+    so a streamed recipe is also served to later non-streaming requests (and vice versa).
+    """
+    cache_key = recipe_cache_key(dish_idea, servings, notes, dietary_preferences, units)
+    assembler = RecipeStreamAssembler()
+
+    if use_cache:
+        cached_response = get_cached_response('recipe', cache_key)
+        if cached_response is not None:
+            assembler.snapshot = cached_response
+            yield from assembler.finish()
+            return
+
+    breaker = llm_circuit_breaker()
+    with record_llm_call('recipe_stream', model="gpt-4o", prompt_version=PROMPT_VERSION) as call:
+        call.cache_status = 'miss'
+        # Only the upstream call and chunk reads go through the breaker, never the consumer's handling of the events
+        with breaker.guard():
+            stream_manager = get_llm_client().beta.chat.completions.stream(
+                model="gpt-4o",
+                response_format=Recipe,
+                messages=build_recipe_messages(dish_idea, servings, notes, dietary_preferences, units),
+                stream_options={'include_usage': True},
+                timeout=llm_timeout('recipe_stream'),
+            )
+            stream = stream_manager.__enter__()
+        try:
+            chunks = iter(stream)
+            while True:
+                with breaker.observe():
+                    event = next(chunks, None)
+                if event is None:
+                    break
+                if event.type == 'content.delta':
+                    call.mark_first_byte()
+                    yield from assembler.feed(event.delta)
+            with breaker.observe():
+                call.add_usage(stream.get_final_completion().usage)
+        finally:
+            stream_manager.__exit__(None, None, None)
+
+        events = assembler.finish()
+    set_cached_response('recipe', cache_key, assembler.snapshot)
+    yield from events
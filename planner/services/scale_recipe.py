@@ -2,49 +2,80 @@ import re
 from fractions import Fraction
 from django.template.defaultfilters import pluralize
 
+# Countable units that take a plural form; abbreviations like "g" or "tbsp" never do
+UNIT_PLURALS = {
+    'cup': 'cups',
+    'tablespoon': 'tablespoons',
+    'teaspoon': 'teaspoons',
+    'clove': 'cloves',
+    'can': 'cans',
+    'slice': 'slices',
+    'pinch': 'pinches',
+    'bunch': 'bunches',
+    'sprig': 'sprigs',
+    'stalk': 'stalks',
+    'handful': 'handfuls',
+    'piece': 'pieces',
+    'pound': 'pounds',
+    'ounce': 'ounces',
+    'pint': 'pints',
+    'quart': 'quarts',
+    'litre': 'litres',
+    'liter': 'liters',
+}
+UNIT_SINGULARS = {plural: singular for singular, plural in UNIT_PLURALS.items()}
+
 
 def is_close_to_one(value: float) -> bool:
     """Check if a number is effectively one (handles floating point imprecision)."""
     return abs(value - 1.0) < 0.1
 
+# Mixed numbers first, so "1 1/2" is not read as "1" followed by "1/2"
+QUANTITY_PATTERN = r'(\d+\s+\d+/\d+|\d+/\d+|\d+(?:\.\d+)?)'
+
+def parse_number(text: str) -> float:
+    """Parse "2", "1.5", "1/2" or "2 1/2" """
+    if ' ' in text:  # mixed number like "2 1/2"
+        whole, frac = text.split()
+        return float(whole) + float(Fraction(frac))
+    elif '/' in text:  # fraction like "1/2"
+        return float(Fraction(text))
+    else:  # decimal or integer
+        return float(text)
+
+def format_number(value: float) -> str:
+    """Whole numbers, halves and quarters as fractions ("1 1/2"), anything else to one decimal place"""
+    if value.is_integer():
+        return str(int(value))
+    elif value * 4 == int(value * 4):
+        whole = int(value)
+        fraction = Fraction(value - whole).limit_denominator(8)
+        return f"{whole} {fraction}" if whole else str(fraction)
+    else:
+        return f"{value:.1f}".rstrip('0').rstrip('.')
+
 def scale_quantity(quantity: str, name: str, original_servings: int, new_servings: int) -> tuple[str, str]:
     """Scale a quantity and handle pluralization using Django's pluralize."""
     ratio = new_servings / original_servings
-    pattern = r'(\d+(?:\.\d+)?|\d+/\d+|\d+\s+\d+/\d+)'
-    
+
     def convert_to_new_quantity(match):
-        original = match.group(0)
-        
-        if ' ' in original:  # mixed number like "2 1/2"
-            whole, frac = original.split()
-            value = float(whole) + float(Fraction(frac))
-        elif '/' in original:  # fraction like "1/2"
-            value = float(Fraction(original))
-        else:  # decimal or integer
-            value = float(original)
-            
-        new_value = value * ratio
-        
-        if new_value.is_integer():
-            return str(int(new_value))
-        elif new_value * 2 == int(new_value * 2):
-            return str(Fraction(new_value).limit_denominator(8))
-        else:
-            return f"{new_value:.1f}".rstrip('0').rstrip('.')
-    
-    new_quantity = re.sub(pattern, convert_to_new_quantity, quantity)
-    
+        return format_number(parse_number(match.group(0)) * ratio)
+
+    new_quantity = re.sub(QUANTITY_PATTERN, convert_to_new_quantity, quantity)
+
     # Get the numeric value for pluralization check
-    match = re.search(pattern, new_quantity)
+    match = re.search(QUANTITY_PATTERN, new_quantity)
     if match:
-        value = float(Fraction(match.group(0)) if '/' in match.group(0) else match.group(0))
-        # Add 's' to quantity units if needed
-        words = new_quantity.split()
+        value = parse_number(match.group(0))
+        # Match countable units to the new amount, e.g. "1 cup" -> "2 cups"
+        words = new_quantity[match.end():].split(' ')
         if len(words) > 1:  # Has units like "cups", "tablespoons"
-            words[1] = words[1] + pluralize(value)
-            new_quantity = ' '.join(words)
+            singular = UNIT_SINGULARS.get(words[1].lower(), words[1].lower())
+            if singular in UNIT_PLURALS:
+                words[1] = UNIT_PLURALS[singular] if value > 1 else singular
+            new_quantity = new_quantity[:match.end()] + ' '.join(words)
         # Pluralize the name if needed
         new_name = name + pluralize(value)
         return new_quantity, new_name
-    
-    return new_quantity, name
\ No newline at end of file
+
+    return new_quantity, name
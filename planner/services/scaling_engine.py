@@ -0,0 +1,237 @@
+import re
+import threading
+from collections import OrderedDict
+from fractions import Fraction
+from functools import lru_cache
+from typing import Iterable, Mapping, NamedTuple
+from django.conf import settings
+from planner.models import Ingredient as DBIngredient
+from planner.models import MealPlan, MealPlanRecipe
+from planner.models import Recipe as DBRecipe
+from .quantity_parser import QUANTITY_COLUMNS, ParsedQuantity, parse_quantity, stored_quantity
+from .scale_recipe import QUANTITY_PATTERN, UNIT_PLURALS, UNIT_SINGULARS, format_number, parse_number, scale_quantity
+from .shopping_aggregation import PLURAL_UNITS
+from .unit_conversion import convert_parsed_quantity
+
+NUMBER_REGEX = re.compile(QUANTITY_PATTERN)
+
+
+class ScaledIngredient(NamedTuple):
+    name: str
+    quantity: str
+
+
+class QuantityTemplate(NamedTuple):
+    """A quantity split around its numbers, e.g. "1 1/2 cups, sifted" -> '', [1.5], [' cups, sifted']"""
+    prefix: str
+    numbers: list[float]
+    suffixes: list[str] # The text after each number
+    # The first suffix with its countable unit made singular or plural, or None if the
+    # unit word comes after a later number, which may itself contain a space ("1 1/2")
+    singular_suffix: str | None
+    plural_suffix: str | None
+
+
+def match_unit(words: list[str], value: float) -> list[str]:
+    """scale_quantity's rule: the word after the first number agrees with it if it is a countable unit"""
+    if len(words) > 1:
+        singular = UNIT_SINGULARS.get(words[1].lower(), words[1].lower())
+        if singular in UNIT_PLURALS:
+            return [words[0], UNIT_PLURALS[singular] if value > 1 else singular, *words[2:]]
+    return words
+
+@lru_cache(maxsize=8192)
+def compile_quantity(quantity: str) -> QuantityTemplate | None:
+    """
+    Parse a quantity once for repeated scaling, or None if scale_quantity's re-search of its own
+    output could read the scaled numbers differently (e.g. "2 3" or ".5") and it must be used instead
+    """
+    matches = list(NUMBER_REGEX.finditer(quantity))
+    if not matches:
+        return QuantityTemplate(quantity, [], [], None, None)
+
+    ends = [m.end() for m in matches]
+    starts = [m.start() for m in matches[1:]] + [len(quantity)]
+    suffixes = [quantity[end:start] for end, start in zip(ends, starts)]
+    prefix = quantity[:matches[0].start()]
+    if prefix.endswith(('.', '/')):
+        return None
+    for i, suffix in enumerate(suffixes):
+        last = i == len(suffixes) - 1
+        if suffix.startswith(('.', '/')) or (not last and (not suffix.strip() or suffix.endswith(('.', '/')))):
+            return None
+
+    numbers = [parse_number(m.group(0)) for m in matches]
+    words = suffixes[0].split(' ')
+    if len(words) > 2 or len(suffixes) == 1:
+        return QuantityTemplate(prefix, numbers, suffixes, ' '.join(match_unit(words, 1)), ' '.join(match_unit(words, 2)))
+    return QuantityTemplate(prefix, numbers, suffixes, None, None)
+
+def scale_template(template: QuantityTemplate, ratio: float) -> tuple[str, bool]:
+    """The scaled quantity, and whether scale_quantity would pluralize the name"""
+    if not template.numbers:
+        return template.prefix, False
+
+    scaled = [format_number(number * ratio) for number in template.numbers]
+    value = parse_number(scaled[0])
+    rest = [template.suffixes[0]]
+    for number, suffix in zip(scaled[1:], template.suffixes[1:]):
+        rest.append(number)
+        rest.append(suffix)
+
+    if template.singular_suffix is None:
+        first_suffix = ' '.join(match_unit(''.join(rest).split(' '), value))
+        return f"{template.prefix}{scaled[0]}{first_suffix}", value != 1
+    rest[0] = template.plural_suffix if value > 1 else template.singular_suffix
+    return f"{template.prefix}{scaled[0]}{''.join(rest)}", value != 1
+
+def format_parsed_quantity(amount: Fraction, unit: str, modifier: str) -> str:
+    """A parsed quantity written out, e.g. (3/2, 'cup', 'sifted') -> "1 1/2 cups, sifted" """
+    text = format_number(float(amount))
+    if unit:
+        text += f" {PLURAL_UNITS[unit] if unit in PLURAL_UNITS and amount > 1 else unit}"
+    if not modifier:
+        return text
+    # Sizes follow counts ("2 large"), notes follow units after a comma as in convert_quantity
+    return f"{text}, {modifier}" if unit and not modifier.startswith('(') else f"{text} {modifier}"
+
+def scale_parsed_quantity(parsed: ParsedQuantity, ratio: Fraction) -> tuple[str, ParsedQuantity]:
+    """A quantity with an amount scaled by arithmetic on its parsed form, written out and parsed"""
+    scaled = parsed._replace(amount=parsed.amount * ratio)
+    return format_parsed_quantity(*scaled), scaled
+
+def scale_parsed_quantities(parsed: Mapping[str, ParsedQuantity], ratio: Fraction) -> dict[str, ParsedQuantity]:
+    """The quantities in parsed that have an amount, scaled by ratio, by the text scale_ingredients writes for them"""
+    return dict(scale_parsed_quantity(quantity, ratio) for quantity in parsed.values() if quantity.amount is not None)
+
+def scale_ingredients(ingredients: Iterable[tuple[str, str]], original_servings: int, new_servings: int,
+                      parsed: Mapping[str, ParsedQuantity] = None) -> list[ScaledIngredient]:
+    """
+    Scale (name, quantity) pairs from original_servings to new_servings in one pass, with the same
+    result as scale_quantity on each. Each distinct quantity is scaled once per call. Quantities in
+    parsed with an amount (e.g. from Ingredient's columns) are scaled by arithmetic on it instead and
+    written in canonical units, e.g. "2 tablespoons" becomes "3 tbsp".
+    """
+    parsed = parsed or {}
+    ratio = new_servings / original_servings
+    scaled_quantities = {}
+    scaled = []
+    for name, quantity in ingredients:
+        if quantity not in scaled_quantities:
+            if quantity in parsed and parsed[quantity].amount is not None:
+                new_quantity, scaled_parsed = scale_parsed_quantity(parsed[quantity], Fraction(new_servings, original_servings))
+                scaled_quantities[quantity] = new_quantity, parse_number(format_number(float(scaled_parsed.amount))) != 1
+            else:
+                template = compile_quantity(quantity)
+                scaled_quantities[quantity] = scale_template(template, ratio) if template is not None else None
+        if scaled_quantities[quantity] is None:
+            new_quantity, new_name = scale_quantity(quantity, name, original_servings, new_servings)
+            scaled.append(ScaledIngredient(new_name, new_quantity))
+        else:
+            new_quantity, plural = scaled_quantities[quantity]
+            scaled.append(ScaledIngredient(f"{name}s" if plural else name, new_quantity))
+    return scaled
+
+def ingredient_quantities(rows: Iterable[tuple]) -> tuple[list[tuple[str, str]], dict[str, ParsedQuantity]]:
+    """(name, quantity) pairs of (name, quantity, *QUANTITY_COLUMNS) rows, and each quantity's stored parse"""
+    rows = list(rows)
+    return [(name, quantity) for name, quantity, *_ in rows], {quantity: stored_quantity(quantity, *columns) for _, quantity, *columns in rows}
+
+def scale_recipe(recipe: DBRecipe, servings: int) -> list[ScaledIngredient]:
+    """The recipe's ingredients, in order, scaled to servings from their parsed quantity columns where they have an amount"""
+    ingredients, parsed = ingredient_quantities(recipe.ingredients.order_by('order').values_list('name', 'quantity', *QUANTITY_COLUMNS))
+    return scale_ingredients(ingredients, recipe.servings, servings, parsed)
+
+def scale_meal_plan(meal_plan: MealPlan) -> dict[int, list[ScaledIngredient]]:
+    """
+    The ingredients of each recipe in the plan scaled to its MealPlanRecipe's servings
+    (the recipe's own servings unless overridden), by MealPlanRecipe id, in two queries
+    """
+    planned = list(
+        MealPlanRecipe.objects
+        .filter(meal_group__meal_plan=meal_plan)
+        .values_list('id', 'recipe_id', 'recipe__servings', 'servings')
+    )
+    rows = {}
+    for recipe_id, *row in (
+        DBIngredient.objects
+        .filter(recipe_id__in={recipe_id for _, recipe_id, _, _ in planned})
+        .order_by('recipe_id', 'order')
+        .values_list('recipe_id', 'name', 'quantity', *QUANTITY_COLUMNS)
+    ):
+        rows.setdefault(recipe_id, []).append(row)
+    ingredients = {recipe_id: ingredient_quantities(recipe_rows) for recipe_id, recipe_rows in rows.items()}
+
+    scaled = {}
+    for mpr_id, recipe_id, recipe_servings, servings in planned:
+        recipe_ingredients, parsed = ingredients.get(recipe_id, ([], {}))
+        scaled[mpr_id] = scale_ingredients(recipe_ingredients, recipe_servings, servings or recipe_servings, parsed)
+    return scaled
+
+
+# Scaled ingredient lists for recipe pages (?servings=N), per process
+class LRUCache:
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key not in self.entries:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return self.entries[key]
+
+    def set(self, key, value):
+        with self._lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+            self.hits = self.misses = 0
+
+_scaled_recipes = None
+_scaled_recipes_guard = threading.Lock()
+
+def get_scaled_recipe_cache() -> LRUCache:
+    global _scaled_recipes
+    with _scaled_recipes_guard:
+        if _scaled_recipes is None:
+            _scaled_recipes = LRUCache(settings.SCALED_RECIPE_CACHE_SIZE)
+        return _scaled_recipes
+
+def scaled_recipe_ingredients(recipe: DBRecipe, servings: int, units: str = None) -> list[ScaledIngredient]:
+    """
+    The recipe's ingredients with quantities scaled to servings and converted to units (as generated
+    if None) from their parsed quantity columns, keeping the names as saved, memoized on
+    (uuid, modified_at, servings, units).
+    Saving a recipe changes its modified_at, so edited recipes are scaled afresh and their stale
+    entries age out of the LRU.
+    """
+    cache = get_scaled_recipe_cache()
+    key = (recipe.uuid, recipe.modified_at, servings, units)
+    scaled = cache.get(key)
+    if scaled is None:
+        ingredients, parsed = ingredient_quantities(recipe.ingredients.order_by('order').values_list('name', 'quantity', *QUANTITY_COLUMNS))
+        if servings != recipe.servings:
+            quantities = [scaled_ingredient.quantity for scaled_ingredient in scale_ingredients(ingredients, recipe.servings, servings, parsed)]
+            parsed = scale_parsed_quantities(parsed, Fraction(servings, recipe.servings))
+        else:
+            quantities = [quantity for _, quantity in ingredients]
+        if units:
+            quantities = [
+                convert_parsed_quantity(quantity, parsed.get(quantity) or parse_quantity(quantity), name, units)[0]
+                for (name, _), quantity in zip(ingredients, quantities)
+            ]
+        scaled = [ScaledIngredient(name, quantity) for (name, _), quantity in zip(ingredients, quantities)]
+        cache.set(key, scaled)
+    return scaled
@@ -0,0 +1,183 @@
+import re
+from dataclasses import dataclass
+from fractions import Fraction
+from typing import Iterable, Mapping
+from .quantity_parser import UNIT_ALIASES, ParsedQuantity, parse_quantity
+from .scale_recipe import format_number
+
+# Left off shopping lists, compared with lowercased cleaned names (see clean_name)
+EXCLUDED_STAPLES = {
+    'water', 'cold water', 'warm water', 'hot water', 'boiling water',
+    'salt', 'sea salt', 'kosher salt', 'table salt',
+    'pepper', 'black pepper', 'ground black pepper', 'ground pepper',
+    'salt and pepper', 'salt & pepper',
+    'olive oil', 'extra virgin olive oil', 'extra-virgin olive oil',
+}
+
+# Leading words that describe preparation rather than what to buy
+PREPARATION_WORDS = {
+    'fresh', 'freshly', 'chopped', 'diced', 'minced', 'sliced', 'grated', 'shredded', 'crushed',
+    'finely', 'roughly', 'thinly', 'peeled', 'cooked', 'steamed', 'boiled',
+}
+
+# Units summed in a common base unit, as (base unit, amount of base unit per unit)
+BASE_UNITS = {
+    'mg': ('g', Fraction(1, 1000)),
+    'g': ('g', Fraction(1)),
+    'kg': ('g', Fraction(1000)),
+    'ml': ('ml', Fraction(1)),
+    'cl': ('ml', Fraction(10)),
+    'dl': ('ml', Fraction(100)),
+    'l': ('ml', Fraction(1000)),
+    'oz': ('oz', Fraction(1)),
+    'lb': ('oz', Fraction(16)),
+}
+# Units written in the plural above one, e.g. "3 cloves"
+PLURAL_UNITS = {
+    unit: UNIT_ALIASES[unit][1]
+    for unit in ['cup', 'pint', 'quart', 'clove', 'can', 'slice', 'pinch', 'dash', 'bunch',
+                 'sprig', 'stalk', 'handful', 'piece', 'sheet', 'leaf']
+}
+
+PARENTHETICAL_REGEX = re.compile(r'\([^()]*\)')
+
+
+def clean_name(name: str) -> str:
+    """The name as bought, e.g. "Fresh carrots (about 3), julienned" -> "carrots" """
+    name = PARENTHETICAL_REGEX.sub('', name).split(',')[0]
+    words = name.split()
+    while len(words) > 1 and words[0].lower() in PREPARATION_WORDS:
+        words = words[1:]
+    return ' '.join(words)
+
+def singular(word: str) -> str:
+    if word.endswith('ies') and len(word) > 4:
+        return word[:-3] + 'y'
+    if word.endswith('oes'):
+        return word[:-2]
+    if word.endswith('s') and not word.endswith(('ss', 'us', 'is')):
+        return word[:-1]
+    return word
+
+def canonical_name(name: str) -> str:
+    """Key for merging items, e.g. "onions" and "Onion, diced" are both "onion" """
+    words = clean_name(name).lower().split()
+    return ' '.join(words[:-1] + [singular(words[-1])]) if words else ''
+
+def is_excluded_staple(name: str) -> bool:
+    return clean_name(name).lower() in EXCLUDED_STAPLES
+
+def format_total(amount: Fraction, unit: str, modifier: str) -> str:
+    if unit == 'g' and amount >= 1000:
+        amount, unit = amount / 1000, 'kg'
+    elif unit == 'ml' and amount >= 1000:
+        amount, unit = amount / 1000, 'l'
+    elif unit == 'oz' and amount >= 16:
+        amount, unit = amount / 16, 'lb'
+    elif unit in PLURAL_UNITS and amount > 1:
+        unit = PLURAL_UNITS[unit]
+    return ' '.join(part for part in [format_number(float(amount)), unit, modifier] if part)
+
+
+@dataclass
+class AggregatedItem:
+    name: str
+    quantities: list[str] # Summed where their units allow, in order of first appearance
+    recipe_ids: list[int] # Distinct, in order of first appearance
+    category: str # Of the first item
+
+    @property
+    def quantity(self) -> str:
+        return ' + '.join(self.quantities)
+
+    @property
+    def recipe_id(self) -> int | None:
+        """The recipe the item is for, or None if it is needed by several"""
+        return self.recipe_ids[0] if len(self.recipe_ids) == 1 else None
+
+
+def sum_quantities(quantities: Iterable[str], parsed: Mapping[str, ParsedQuantity] = None) -> list[str]:
+    """
+    Sum quantities with the same unit (or units of the same base unit, e.g. g and kg) and size
+    modifier. Notes in parentheses and preparation after a comma ("large, diced") are dropped; quantities without
+    a single amount ("to taste", "2-3") are kept as written, once each. Quantities in parsed (e.g. from
+    Ingredient's columns) are not parsed again.
+    """
+    parsed = parsed or {}
+    totals = {} # (base unit, modifier) or raw text -> total amount or None
+    for quantity in quantities:
+        amount, unit, modifier = parsed.get(quantity) or parse_quantity(quantity)
+        if amount is None:
+            if quantity.strip():
+                totals.setdefault(quantity.strip(), None)
+            continue
+        modifier = PARENTHETICAL_REGEX.sub('', modifier).split(',')[0].strip()
+        base_unit, factor = BASE_UNITS.get(unit, (unit, Fraction(1)))
+        key = (base_unit, modifier)
+        totals[key] = totals.get(key, 0) + amount * factor
+
+    return [
+        format_total(total, *key) if total is not None else key
+        for key, total in totals.items()
+    ]
+
+def aggregate_items(items: Iterable[tuple[str, str, int, str]], parsed: Mapping[str, ParsedQuantity] = None) -> tuple[list[AggregatedItem], int]:
+    """
+    Merge (name, quantity, recipe_id, category) items for the same ingredient, in order of first appearance,
+    and drop EXCLUDED_STAPLES. Returns the merged items and the number of items dropped.
+    Quantities in parsed are not parsed again, as in sum_quantities.
+    """
+    parsed = parsed or {}
+    names = {}
+    quantities = {}
+    recipe_ids = {}
+    categories = {}
+    dropped = 0
+    for name, quantity, recipe_id, category in items:
+        name = clean_name(name)
+        if name.lower() in EXCLUDED_STAPLES:
+            dropped += 1
+            continue
+        # "Garlic cloves" measured in cloves is garlic
+        words = name.split()
+        if len(words) > 1 and singular(words[-1].lower()) == (parsed.get(quantity) or parse_quantity(quantity)).unit:
+            name = ' '.join(words[:-1])
+        key = canonical_name(name)
+        names.setdefault(key, []).append(name)
+        quantities.setdefault(key, []).append(quantity)
+        categories.setdefault(key, category)
+        if recipe_id not in recipe_ids.setdefault(key, []):
+            recipe_ids[key].append(recipe_id)
+
+    aggregated = []
+    for key, seen_names in names.items():
+        summed = sum_quantities(quantities[key], parsed)
+        # Prefer the plural spelling unless the whole list is a single item
+        plural_names = [name for name in seen_names if canonical_name(name) != name.lower()]
+        single = summed in (['1'], [])
+        name = plural_names[0] if plural_names and not single else seen_names[0]
+        aggregated.append(AggregatedItem(name, summed, recipe_ids[key], categories[key]))
+    return aggregated, dropped
+
+
+@dataclass
+class AggregationReport:
+    items_in: int
+    items_out: int
+    dropped: int
+    prompt_tokens_before: int # Estimated as in local_llm.py, 4 characters per token
+    prompt_tokens_after: int
+
+    @property
+    def token_reduction(self) -> float:
+        if not self.prompt_tokens_before:
+            return 0.0
+        return 1 - self.prompt_tokens_after / self.prompt_tokens_before
+
+    def __str__(self):
+        return (f"{self.items_in} items -> {self.items_out} ({self.dropped} staples dropped), "
+                f"~{self.prompt_tokens_before:,} -> ~{self.prompt_tokens_after:,} prompt tokens "
+                f"({self.token_reduction:.0%} fewer)")
+
+def estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
@@ -1,9 +1,28 @@
-from openai import OpenAI
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable
+from django.conf import settings
+from django.db import connection
 from pydantic import BaseModel
-import os
-from planner.models import MealPlan as MealPlan, ShoppingItem as DBShoppingItem
+from planner.models import Ingredient as DBIngredient
+from planner.models import MealPlan as MealPlan, MealPlanRecipe, ShoppingItem as DBShoppingItem
+from .llm_cache import get_cached_responses, make_cache_key, set_cached_response
+from .http_client import llm_timeout
+from .ingredient_categories import CATEGORY_CODES, CATEGORY_LABELS, known_categories, learn_categories
+from .llm_client import get_llm_client, llm_circuit_breaker
+from .llm_telemetry import call_origin, get_call_origin, record_llm_call
+from .quantity_parser import QUANTITY_COLUMNS, ParsedQuantity, parse_quantity
+from .scaling_engine import ingredient_quantities, scale_ingredients
+from .shopping_aggregation import AggregationReport, aggregate_items, canonical_name, estimate_tokens, is_excluded_staple
+from .singleflight import singleflight
+from .unit_conversion import METRIC, convert_parsed_quantity
 
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+logger = logging.getLogger(__name__)
+
+# Bump whenever the prompt below changes so stale cached responses are not reused
+PROMPT_VERSION = 5
+
+UNCATEGORIZED = 'TBD' # Placeholder category of items not yet categorized; never learned or cached
 
 
 # Base models (maps to JSON response and models.py)
@@ -11,67 +30,296 @@ class ShoppingItem(BaseModel):
     name: str
     quantity: str
     category: str
-    recipe_id: int # Foreign key to recipe
+    recipe_id: int | None # Foreign key to recipe, None for items merged from several recipes
+
+class PlannedShoppingItem(ShoppingItem):
+    recipe_ids: list[int] # Every recipe the item was merged from, never sent to the model
 
 class ShoppingList(BaseModel):
     items: list[ShoppingItem]
 
-# Load underlying recipes from MealPlan
-def load_preliminary_shopping_list(meal_plan: MealPlan):
-    shopping_list = []
+# Compact wire format: numbered "|"-separated rows under a header, so field names, the placeholder
+# category and recipe ids are not repeated for every item; recipe ids are mapped back by row number
+class ShoppingListRows(BaseModel):
+    rows: list[str] # "#|name|quantity|category code", one per item kept
 
-    for group in meal_plan.groups.all():
-        for mpr in group.mprs.all():
-            recipe = mpr.recipe
-            ingredients = recipe.ingredients.all()
-            for ing in ingredients:
-                shopping_item = ShoppingItem(
-                    name=ing.name,
-                    quantity=ing.quantity,
-                    category='TBD',
-                    recipe_id=recipe.id
-                )
-                shopping_list.append(shopping_item)
-    return shopping_list
+def wire_value(value: str) -> str:
+    return ' '.join(str(value).replace('|', '/').split())
+
+def to_wire_rows(shopping_list: list[ShoppingItem]) -> str:
+    rows = [f"{number}|{wire_value(item.name)}|{wire_value(item.quantity)}" for number, item in enumerate(shopping_list, start=1)]
+    return '\n'.join(['#|name|quantity', *rows])
+
+def from_wire_rows(rows: list[str], sent: list[ShoppingItem]) -> list[ShoppingItem]:
+    """
+    Items from the model's rows, in the order sent, taking recipe ids from the items sent. Rows that do not
+    parse are skipped, and items the model left out are kept uncategorized unless they are excluded staples.
+    """
+    received = {}
+    for row in rows:
+        fields = [field.strip() for field in row.split('|', 3)]
+        if len(fields) != 4 or not fields[0].isdigit() or not 1 <= int(fields[0]) <= len(sent):
+            continue
+        number, name, quantity, category = fields
+        item = sent[int(number) - 1]
+        received.setdefault(int(number), ShoppingItem(
+            name=name or item.name,
+            quantity=quantity,
+            category=CATEGORY_LABELS.get(category, category),
+            recipe_id=item.recipe_id,
+        ))
+
+    items = []
+    for number, item in enumerate(sent, start=1):
+        if number in received:
+            items.append(received[number])
+        elif not is_excluded_staple(item.name):
+            items.append(item.model_copy(update={'category': UNCATEGORIZED}))
+    return items
+
+def converted_quantities(ingredients: Iterable[tuple[str, str]], preferred_units: str = METRIC,
+                         parsed: dict[str, ParsedQuantity] = None) -> list[tuple[str, ParsedQuantity]]:
+    """Each quantity converted to preferred_units and parsed; quantities in parsed (e.g. from Ingredient's columns) are not parsed again"""
+    parsed = parsed or {}
+    return [
+        convert_parsed_quantity(quantity, parsed.get(quantity) or parse_quantity(quantity), name, preferred_units)
+        for name, quantity in ingredients
+    ]
+
+# A recipe's ingredients as shopping items, converted to preferred_units locally
+def load_recipe_shopping_items(recipe_id: int, ingredients: Iterable[tuple[str, str]], preferred_units: str = METRIC,
+                               parsed: dict[str, ParsedQuantity] = None) -> list[ShoppingItem]:
+    ingredients = list(ingredients)
+    return [
+        ShoppingItem(
+            name=name,
+            quantity=quantity,
+            category=UNCATEGORIZED,
+            recipe_id=recipe_id
+        )
+        for (name, _), (quantity, _) in zip(ingredients, converted_quantities(ingredients, preferred_units, parsed))
+    ]
+
+def aggregate_shopping_list(shopping_list: list[ShoppingItem], parsed: dict[str, ParsedQuantity] = None) -> tuple[list[ShoppingItem], AggregationReport]:
+    """
+    Merge duplicate ingredients, summing their quantities where possible, and drop staples before the prompt is built.
+    Quantities in parsed are not parsed again.
+    """
+    aggregated, dropped = aggregate_items(((item.name, item.quantity, item.recipe_id, item.category) for item in shopping_list), parsed)
+    aggregated_list = [
+        ShoppingItem(name=item.name, quantity=item.quantity, category=item.category, recipe_id=item.recipe_id)
+        for item in aggregated
+    ]
+    report = AggregationReport(
+        items_in=len(shopping_list),
+        items_out=len(aggregated_list),
+        dropped=dropped,
+        prompt_tokens_before=estimate_tokens(str(shopping_list)),
+        prompt_tokens_after=estimate_tokens(str(aggregated_list)),
+    )
+    return aggregated_list, report
+
+def categorize_known_items(shopping_list: list[ShoppingItem]) -> tuple[list[ShoppingItem], list[ShoppingItem]]:
+    """Split the list into items categorized from the learned categories, and items the model has not seen"""
+    categories = known_categories(item.name for item in shopping_list)
+    known = [
+        item.model_copy(update={'category': CATEGORY_LABELS[categories[item.name]]})
+        for item in shopping_list if item.name in categories
+    ]
+    unknown = [item for item in shopping_list if item.name not in categories]
+    return known, unknown
+
+def learn_shopping_list_categories(sent: list[ShoppingItem], received: list[ShoppingItem]):
+    """Remember the model's categories, under both its (tidied) names and the names they were sent as"""
+    categories = {item.name: CATEGORY_CODES.get(item.category) for item in received}
+    by_normalized_name = {canonical_name(name): category for name, category in categories.items()}
+    for item in sent:
+        if canonical_name(item.name) in by_normalized_name:
+            categories.setdefault(item.name, by_normalized_name[canonical_name(item.name)])
+    learn_categories(categories.items())
 
 # OpenAI API function
-def generate_shopping_list(meal_plan: MealPlan, preferred_units: str = "metric") -> ShoppingList:
+def categorize_with_model(shopping_list: list[ShoppingItem]) -> list[ShoppingItem]:
     """
-    Generates a shopping list in JSON format. See https://platform.openai.com/docs/guides/structured-outputs
+    Tidies and categorizes items, sent and received as compact rows. See https://platform.openai.com/docs/guides/structured-outputs
     """
-    shopping_list = load_preliminary_shopping_list(meal_plan)
-    
-    if not shopping_list:
-        raise ValueError("No recipes found in meal plan to generate shopping list")
-        
     user_input = f"""
-    For each ShoppingItem in the ShoppingList:
-        1. Where necessary, adjust the item name to be shopping-appropriate, e.g. "carrots, julienned" becomes "carrots", "steamed rice" becomes "rice".
-        2. Where necessary, adjust the quantity to be shopping-appropriate and ensure it is in {preferred_units} units.
-        3. Update the category to be one of the following: {[cat[1] for cat in DBShoppingItem.CATEGORIES]}. Derived items like "lemon zest" should be in the "Fruit & Vegetables" category since they are made from fresh produce (lemons).
-        4. Leave the recipe_id field unchanged.
-        5. Remove the entire ShoppingItem if it is one of: water, salt, pepper, olive oil.
-    
-    ShoppingList:
-    {shopping_list}
+    For each row of the shopping list below:
+        1. Where necessary, adjust the name to be shopping-appropriate, e.g. "carrots, julienned" becomes "carrots", "steamed rice" becomes "rice".
+        2. Where necessary, adjust the quantity to be shopping-appropriate, keeping its units. Combine quantities joined with " + " into one where they can be, e.g. "1 cup + 2 tbsp" becomes "1 1/4 cups".
+        3. Add a category, one of the codes: {', '.join(f"{code} ({label})" for code, label in DBShoppingItem.CATEGORIES)}. Derived items like "lemon zest" are fruit_veg since they are made from fresh produce (lemons).
+        4. Leave out the row if it is one of: water, salt, pepper, olive oil.
+    Reply with one "#|name|quantity|category" row per remaining item, keeping its number.
+
+    Shopping list:
+    {to_wire_rows(shopping_list)}
+    """
+
+    with record_llm_call('shopping_list', model="gpt-4o", prompt_version=PROMPT_VERSION) as call:
+        call.cache_status = 'miss'
+        with llm_circuit_breaker().guard():
+            completion = get_llm_client().beta.chat.completions.parse(
+                model="gpt-4o",
+                response_format=ShoppingListRows,
+                messages=[
+                    {"role": "system", "content": "Generate a shopping list in JSON format."},
+                    {"role": "user", "content": user_input}
+                ],
+                timeout=llm_timeout('shopping_list'),
+            )
+        call.add_usage(completion.usage)
+        return from_wire_rows(completion.choices[0].message.parsed.rows, shopping_list)
+
+def is_categorized(shopping_list: list[ShoppingItem]) -> bool:
+    return all(item.category != UNCATEGORIZED for item in shopping_list)
+
+def chunk_items(shopping_list: list[ShoppingItem], chunk_size: int) -> list[list[ShoppingItem]]:
+    return [shopping_list[i:i + chunk_size] for i in range(0, len(shopping_list), chunk_size)]
+
+def unify_categories(shopping_list: list[ShoppingItem]) -> list[ShoppingItem]:
+    """
+    The first category given to each ingredient wins, so items categorized in different chunks still merge into one;
+    uncategorized items take the category given to the same ingredient elsewhere, if any
     """
+    categories = {}
+    for item in shopping_list:
+        if item.category != UNCATEGORIZED:
+            categories.setdefault(canonical_name(item.name), item.category)
+    return [item.model_copy(update={'category': categories.get(canonical_name(item.name), item.category)}) for item in shopping_list]
 
+def categorize_in_chunks(shopping_list: list[ShoppingItem]) -> list[ShoppingItem]:
+    """
+    Items categorized by the model in chunks of SHOPPING_LIST_CHUNK_SIZE, SHOPPING_LIST_CONCURRENCY at a time,
+    so responses stay short and the wait does not grow with the list. Results are in the order sent.
+    """
+    view, user = get_call_origin()
+
+    def categorize_chunk(chunk: list[ShoppingItem]) -> list[ShoppingItem]:
+        key = make_cache_key('shopping_chunk', PROMPT_VERSION, rows=to_wire_rows(chunk), recipes=[item.recipe_id for item in chunk])
+        try:
+            # Concurrent requests for the same items share a single API call
+            with call_origin(view, user):
+                response = singleflight(
+                    'shopping_chunk', key, lambda: ShoppingList(items=categorize_with_model(chunk)).model_dump_json(),
+                    # Items the model left out are asked about again next time, not cached as placeholders
+                    cache_if=lambda response: is_categorized(ShoppingList.model_validate_json(response).items),
+                )
+            return ShoppingList.model_validate_json(response).items
+        finally:
+            connection.close() # Each pool thread has its own DB connection
+
+    chunks = chunk_items(shopping_list, settings.SHOPPING_LIST_CHUNK_SIZE)
+    with ThreadPoolExecutor(max_workers=settings.SHOPPING_LIST_CONCURRENCY) as executor:
+        return [item for items in executor.map(categorize_chunk, chunks) for item in items]
+
+def recipe_cache_key(recipe_id: int, ingredients_digest: str, modified_at, preferred_units: str) -> str:
+    """Changes whenever the recipe's servings or ingredients do; recipes saved before digests use their last edit"""
+    recipe = ingredients_digest or f"{recipe_id}:{modified_at.isoformat()}"
+    return make_cache_key('shopping_recipe', PROMPT_VERSION, recipe=recipe, preferred_units=preferred_units)
+
+def normalize_recipes(recipes: dict[int, tuple[str, object]], preferred_units: str = METRIC) -> dict[int, list[ShoppingItem]]:
+    """
+    Normalized shopping items of each recipe ({recipe_id: (ingredients_digest, modified_at)}), by recipe id,
+    from the LLM response cache in one lookup. Recipes not in the cache are converted, merged and categorized
+    locally where possible, at their own servings, and cached.
+    """
+    keys = {recipe_id: recipe_cache_key(recipe_id, *recipe, preferred_units) for recipe_id, recipe in recipes.items()}
+    cached = get_cached_responses('shopping_recipe', keys.values())
+    normalized = {
+        recipe_id: ShoppingList.model_validate_json(cached[key]).items
+        for recipe_id, key in keys.items() if key in cached
+    }
+
+    missing = [recipe_id for recipe_id in keys if recipe_id not in normalized]
+    rows = {}
+    for recipe_id, *row in (
+        DBIngredient.objects
+        .filter(recipe_id__in=missing)
+        .order_by('recipe_id', 'order')
+        .values_list('recipe_id', 'name', 'quantity', *QUANTITY_COLUMNS)
+    ):
+        rows.setdefault(recipe_id, []).append(row)
+
+    shopping_list = []
+    for recipe_id in missing:
+        # Quantities are converted and summed from their parsed columns, not parsed again
+        ingredients, parsed = ingredient_quantities(rows.get(recipe_id, []))
+        converted = dict(converted_quantities(ingredients, preferred_units, parsed))
+        items, report = aggregate_shopping_list(load_recipe_shopping_items(recipe_id, ingredients, preferred_units, parsed), converted)
+        logger.debug("Aggregated shopping items for recipe %s: %s", recipe_id, report)
+        shopping_list += items
+
+    # Only items without a learned category are sent to the model, in chunks across all the missing recipes
+    known_items, unknown_items = categorize_known_items(shopping_list)
+    if unknown_items:
+        categorized = unify_categories(categorize_in_chunks(unknown_items))
+        learn_shopping_list_categories(unknown_items, categorized)
+        known_items += categorized
+
+    by_recipe = {recipe_id: [] for recipe_id in missing}
+    for item in known_items:
+        by_recipe[item.recipe_id].append(item)
+    for recipe_id, items in by_recipe.items():
+        if is_categorized(items):
+            set_cached_response('shopping_recipe', keys[recipe_id], ShoppingList(items=items).model_dump_json())
+        normalized[recipe_id] = items
+    return normalized
+
+def merge_shopping_items(shopping_list: list[ShoppingItem]) -> list[PlannedShoppingItem]:
+    """Merge items for the same ingredient from different recipes, keeping the first item's category"""
+    aggregated, _ = aggregate_items((item.name, item.quantity, item.recipe_id, item.category) for item in shopping_list)
+    return [
+        PlannedShoppingItem(name=item.name, quantity=item.quantity, category=item.category, recipe_id=item.recipe_id, recipe_ids=item.recipe_ids)
+        for item in aggregated
+    ]
+
+def planned_recipes(meal_plan: MealPlan, recipe_ids: Iterable[int] | None = None) -> list[tuple]:
+    """The plan's (recipe_id, recipe servings, planned servings, ingredients_digest, modified_at) rows, in plan order"""
+    planned = MealPlanRecipe.objects.filter(meal_group__meal_plan=meal_plan)
+    if recipe_ids is not None:
+        planned = planned.filter(recipe_id__in=recipe_ids)
+    return list(
+        planned
+        .order_by('meal_group__order', 'meal_group_id', '_order')
+        .values_list('recipe_id', 'recipe__servings', 'servings', 'recipe__ingredients_digest', 'recipe__modified_at')
+    )
+
+def scale_planned_items(planned: list[tuple], normalized: dict[int, list[ShoppingItem]]) -> list[ShoppingItem]:
+    """The normalized items of planned_recipes() rows, scaled to the planned servings"""
+    shopping_list = []
+    for recipe_id, recipe_servings, servings, _, _ in planned:
+        items = normalized[recipe_id]
+        quantities = [item.quantity for item in items]
+        if servings and servings != recipe_servings:
+            quantities = [scaled.quantity for scaled in scale_ingredients([(item.name, item.quantity) for item in items], recipe_servings, servings)]
+        shopping_list += [
+            item.model_copy(update={'quantity': quantity, 'recipe_id': recipe_id})
+            for item, quantity in zip(items, quantities)
+        ]
+    return shopping_list
+
+def plan_shopping_items(planned: list[tuple], preferred_units: str = METRIC) -> list[PlannedShoppingItem]:
+    """Shopping items of planned_recipes() rows: normalized per recipe, scaled to the planned servings and merged"""
     try:
-        completion = client.beta.chat.completions.parse(
-            model="gpt-4o",
-            response_format=ShoppingList,
-            messages=[
-                {"role": "system", "content": "Generate a shopping list in JSON format."},
-                {"role": "user", "content": user_input}
-            ],
+        normalized = normalize_recipes(
+            {recipe_id: (digest, modified_at) for recipe_id, _, _, digest, modified_at in planned},
+            preferred_units,
         )
-        
-        shopping_list = completion.choices[0].message.parsed
-        shopping_list_with_name = shopping_list.model_copy(
-            update={'name': f"Shopping List for '{meal_plan.name}'"}
-        )
-        return shopping_list_with_name
+    except Exception:
+        logger.exception("Error generating shopping list")
+        raise
+    return merge_shopping_items(scale_planned_items(planned, normalized))
+
+def generate_shopping_list(meal_plan: MealPlan, preferred_units: str = METRIC) -> ShoppingList:
+    """
+    Assembles the plan's shopping list from each recipe's normalized items, cached per recipe
+    and units, scaled to the plan's servings and merged locally. Only recipes never seen before
+    (or edited since) are normalized, with the model categorizing items it has not seen.
+    """
+    planned = planned_recipes(meal_plan)
+
+    if not planned:
+        raise ValueError("No recipes found in meal plan to generate shopping list")
 
-    except Exception as e:
-        print(f"Error generating shopping list: {e}")
-        raise e
\ No newline at end of file
+    shopping_list = ShoppingList(items=plan_shopping_items(planned, preferred_units))
+    return shopping_list.model_copy(update={'name': f"Shopping List for '{meal_plan.name}'"})
@@ -1,37 +1,54 @@
 from django.contrib.auth.models import User
-from django.shortcuts import get_object_or_404
-from planner.models import ShoppingList as DBShoppingList, ShoppingItem as DBShoppingItem, Recipe as DBRecipe
-from .shopping_list_generator import ShoppingList
+from planner.models import MealPlan as DBMealPlan, ShoppingList as DBShoppingList, ShoppingItem as DBShoppingItem
+from .shopping_list_generator import UNCATEGORIZED, ShoppingItem, ShoppingList
+
+UNCATEGORIZED_FALLBACK = 'pantry' # Items the model left uncategorized are still recipe ingredients, so food
 
 class ShoppingListRepository:
     @staticmethod
     def get_category_key(category: str):
+        if category == UNCATEGORIZED:
+            return UNCATEGORIZED_FALLBACK
         for cat in DBShoppingItem.CATEGORIES:
             if cat[1] == category:
                 return cat[0]
-        return 'non-food'
+        return 'non_food'
 
     @staticmethod
-    def save_shopping_list(shopping_list: ShoppingList, user: User=None):        
-        db_shopping_list = DBShoppingList.objects.create(
-            name=shopping_list.name,
-            user=user
-        )
-
-        for item in shopping_list.items:
-            recipe = get_object_or_404(DBRecipe, id=item.recipe_id) if item.recipe_id else None
-
-            DBShoppingItem.objects.create(
+    def save_shopping_items(db_shopping_list: DBShoppingList, items: list[ShoppingItem]) -> list[DBShoppingItem]:
+        """Creates the items and links each to every recipe it is for, in two queries"""
+        db_items = DBShoppingItem.objects.bulk_create([
+            DBShoppingItem(
                 shopping_list=db_shopping_list,
                 name=item.name,
                 quantity=item.quantity,
-                recipe=recipe,
+                recipe_id=item.recipe_id,
                 category=ShoppingListRepository.get_category_key(item.category)
             )
+            for item in items
+        ])
 
+        ItemRecipes = DBShoppingItem.recipes.through
+        ItemRecipes.objects.bulk_create([
+            ItemRecipes(shoppingitem_id=db_item.id, recipe_id=recipe_id)
+            for item, db_item in zip(items, db_items)
+            for recipe_id in getattr(item, 'recipe_ids', [item.recipe_id] if item.recipe_id else [])
+        ])
+        return db_items
+
+    @staticmethod
+    def save_shopping_list(shopping_list: ShoppingList, user: User=None, content_digest='', meal_plan: DBMealPlan=None, recipe_digests: dict=None):
+        db_shopping_list = DBShoppingList.objects.create(
+            name=shopping_list.name,
+            user=user,
+            content_digest=content_digest,
+            recipe_digests=recipe_digests or {},
+            meal_plan=meal_plan,
+        )
+        ShoppingListRepository.save_shopping_items(db_shopping_list, shopping_list.items)
         return db_shopping_list
 
 # Helper functions
-def save_shopping_list_to_db(shopping_list: ShoppingList, user=None) -> DBShoppingList:
+def save_shopping_list_to_db(shopping_list: ShoppingList, user=None, content_digest='', meal_plan=None, recipe_digests=None) -> DBShoppingList:
     service = ShoppingListRepository()
-    return service.save_shopping_list(shopping_list, user)
\ No newline at end of file
+    return service.save_shopping_list(shopping_list, user, content_digest, meal_plan, recipe_digests)
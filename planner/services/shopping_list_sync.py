@@ -0,0 +1,119 @@
+import logging
+from dataclasses import dataclass
+from django.db import transaction
+from django.utils import timezone
+from planner.models import ShoppingList as DBShoppingList, ShoppingItem as DBShoppingItem
+from .digest import meal_plan_content_digest, recipe_content_digests
+from .shopping_aggregation import canonical_name
+from .shopping_list_generator import merge_shopping_items, normalize_recipes, plan_shopping_items, planned_recipes, scale_planned_items
+from .shopping_list_repository import ShoppingListRepository
+from .unit_conversion import METRIC
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class SyncReport:
+    added_recipes: int = 0
+    removed_recipes: int = 0
+    items_added: int = 0
+    items_removed: int = 0
+    items_updated: int = 0
+
+    def __str__(self):
+        return (
+            f"+{self.added_recipes}/-{self.removed_recipes} recipes: "
+            f"{self.items_added} items added, {self.items_removed} removed, {self.items_updated} updated"
+        )
+
+
+def sync_shopping_list(shopping_list: DBShoppingList, preferred_units: str = METRIC) -> SyncReport:
+    """
+    Bring the list up to date with the recipes now in its meal plan. Items are added for recipes new
+    to the plan (as items of their own, so ticked items stay ticked) and removed for recipes no longer
+    in it. Items of recipes whose servings or ingredients changed since the list's recipe_digests, and
+    items merged with a removed recipe, are re-totalled from the cached items at the planned servings;
+    other items are left alone, as are items added by the user. Only new recipes are normalized.
+    Recipes are known to the list through its items, so a recipe whose items were all deleted is added again.
+    """
+    report = SyncReport()
+    meal_plan = shopping_list.meal_plan
+    if meal_plan is None:
+        raise ValueError("Shopping list is not linked to a meal plan")
+    if shopping_list.content_digest and shopping_list.content_digest == meal_plan_content_digest(meal_plan):
+        return report
+
+    planned = {}
+    for row in planned_recipes(meal_plan):
+        planned.setdefault(row[0], []).append(row)
+    recipe_digests = recipe_content_digests(
+        (recipe_id, digest, servings) for rows in planned.values() for recipe_id, _, servings, digest, _ in rows
+    )
+    # Lists saved without recipe digests re-total every recipe
+    changed_ids = {
+        recipe_id for recipe_id in planned
+        if shopping_list.recipe_digests.get(str(recipe_id)) != recipe_digests[str(recipe_id)]
+    }
+
+    item_recipes = {}
+    for item_id, recipe_id in (
+        DBShoppingItem.recipes.through.objects
+        .filter(shoppingitem__shopping_list=shopping_list)
+        .values_list('shoppingitem_id', 'recipe_id')
+    ):
+        item_recipes.setdefault(item_id, set()).add(recipe_id)
+    listed_ids = set().union(*item_recipes.values())
+
+    added = planned.keys() - listed_ids
+    removed = listed_ids - planned.keys()
+    report.added_recipes, report.removed_recipes = len(added), len(removed)
+
+    removed_items = [item_id for item_id, recipe_ids in item_recipes.items() if recipe_ids <= removed]
+    # Kept items to re-total: those of changed recipes, and merged items losing a removed recipe
+    kept_items = {
+        item_id: frozenset(recipe_ids - removed)
+        for item_id, recipe_ids in item_recipes.items()
+        if recipe_ids - removed and recipe_ids & (changed_ids | removed)
+    }
+
+    # Everything is normalized (or read from the cache) before any writes, so a failed model call changes nothing
+    new_items = plan_shopping_items([row for recipe_id in added for row in planned[recipe_id]], preferred_units)
+    remaining = set().union(*kept_items.values())
+    normalized = normalize_recipes(
+        {recipe_id: planned[recipe_id][0][3:] for recipe_id in remaining},
+        preferred_units,
+    )
+    totals = {}
+    for recipe_ids in set(kept_items.values()):
+        rows = [row for recipe_id in recipe_ids for row in planned[recipe_id]]
+        totals[recipe_ids] = {
+            canonical_name(item.name): item.quantity
+            for item in merge_shopping_items(scale_planned_items(rows, normalized))
+        }
+
+    with transaction.atomic():
+        DBShoppingItem.objects.filter(id__in=removed_items).delete()
+        report.items_removed = len(removed_items)
+
+        changed, now = [], timezone.now()
+        for db_item in DBShoppingItem.objects.filter(id__in=kept_items):
+            recipe_ids = kept_items[db_item.id]
+            # Kept as is if the user has renamed it
+            quantity = totals[recipe_ids].get(canonical_name(db_item.name), db_item.quantity)
+            recipe_id = next(iter(recipe_ids)) if len(recipe_ids) == 1 else None
+            if (quantity, recipe_id) != (db_item.quantity, db_item.recipe_id):
+                db_item.quantity, db_item.recipe_id = quantity, recipe_id
+                db_item.modified_at = now # bulk_update skips auto_now
+                changed.append(db_item)
+        DBShoppingItem.objects.bulk_update(changed, ['quantity', 'recipe', 'modified_at'])
+        DBShoppingItem.recipes.through.objects.filter(shoppingitem_id__in=kept_items, recipe_id__in=removed).delete()
+        report.items_updated = len(changed)
+
+        ShoppingListRepository.save_shopping_items(shopping_list, new_items)
+        report.items_added = len(new_items)
+        shopping_list.content_digest = meal_plan_content_digest(meal_plan)
+        shopping_list.recipe_digests = recipe_digests
+        shopping_list.save(update_fields=['content_digest', 'recipe_digests', 'modified_at'])
+
+    logger.info("Synced shopping list %s: %s", shopping_list.id, report)
+    return report
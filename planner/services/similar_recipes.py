@@ -0,0 +1,33 @@
+from django.contrib.postgres.search import TrigramSimilarity, TrigramWordSimilarity
+from django.db import connection
+from django.db.models import Q, QuerySet
+from django.db.models.functions import Greatest
+from planner.models import Recipe
+
+SIMILAR_RECIPES_LIMIT = 3
+MIN_DISH_IDEA_LENGTH = 3
+
+
+def find_similar_recipes(dish_idea: str, limit: int = SIMILAR_RECIPES_LIMIT) -> QuerySet[Recipe]:
+    """
+    Published recipes close to a dish idea, best match first, so users can pick an existing recipe
+    instead of generating a new one. On Postgres the % and %> operators use the pg_trgm GIN indexes
+    on title and description; other backends (e.g. SQLite in development) fall back to a substring match.
+    """
+    dish_idea = ' '.join(dish_idea.split())
+    if len(dish_idea) < MIN_DISH_IDEA_LENGTH:
+        return Recipe.objects.none()
+
+    published = Recipe.objects.filter(status='published')
+    if connection.vendor != 'postgresql':
+        return published.filter(title__icontains=dish_idea).order_by('title')[:limit]
+
+    return (
+        published
+        .filter(Q(title__trigram_similar=dish_idea) | Q(description__trigram_word_similar=dish_idea))
+        .annotate(similarity=Greatest(
+            TrigramSimilarity('title', dish_idea),
+            TrigramWordSimilarity(dish_idea, 'description'),
+        ))
+        .order_by('-similarity', '-created_at')[:limit]
+    )
@@ -0,0 +1,115 @@
+import hashlib
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable
+from datetime import timedelta
+from django.db import connection
+from django.utils import timezone
+from planner.models import DedupeResult
+from .llm_cache import get_cached_response, set_cached_response
+
+WAIT_TIMEOUT = 120 # Seconds a follower waits for the leader before giving up and calling the API itself
+DEDUPE_TTL = 60 # Seconds a dedupe_only result is shared by default
+POLL_INTERVAL = 0.1
+
+# Fallback for backends without advisory locks (e.g. SQLite in development): coalesces within this process only
+_local_locks = {}
+_local_locks_guard = threading.Lock()
+
+
+def advisory_lock_id(key: str) -> int:
+    """Map a string key onto the signed 64-bit integer space used by Postgres advisory locks"""
+    digest = hashlib.sha256(key.encode()).digest()
+    return int.from_bytes(digest[:8], 'big', signed=True)
+
+def _try_lock(key: str) -> bool:
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_try_advisory_lock(%s)", [advisory_lock_id(key)])
+            return cursor.fetchone()[0]
+
+    with _local_locks_guard:
+        lock = _local_locks.setdefault(key, threading.Lock())
+    return lock.acquire(blocking=False)
+
+def _unlock(key: str):
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_unlock(%s)", [advisory_lock_id(key)])
+        return
+
+    _local_locks[key].release()
+
+@contextmanager
+def advisory_lock(key: str, timeout: float = WAIT_TIMEOUT):
+    """
+    Hold a cross-process lock on key for the duration of the block.
+    Yields True if the lock was acquired, or False if it was still held by someone else after timeout seconds.
+    """
+    deadline = time.monotonic() + timeout
+    acquired = _try_lock(key)
+    while not acquired and time.monotonic() < deadline:
+        time.sleep(POLL_INTERVAL)
+        acquired = _try_lock(key)
+    try:
+        yield acquired
+    finally:
+        if acquired:
+            _unlock(key)
+
+
+def get_dedupe_result(namespace: str, key: str, count_miss: bool = True) -> str | None:
+    return DedupeResult.objects.filter(namespace=namespace, key=key, expires_at__gt=timezone.now()).values_list('result', flat=True).first()
+
+def set_dedupe_result(namespace: str, key: str, result: str, ttl: int = None):
+    now = timezone.now()
+    DedupeResult.objects.filter(expires_at__lte=now).delete()
+    DedupeResult.objects.update_or_create(
+        namespace=namespace,
+        key=key,
+        defaults={'result': result, 'expires_at': now + timedelta(seconds=DEDUPE_TTL if ttl is None else ttl)},
+    )
+
+
+def singleflight(namespace: str, key: str, fn: Callable[[], str], ttl: int = None, use_cache: bool = True,
+                 dedupe_only: bool = False, cache_if: Callable[[str], bool] = None) -> str:
+    """
+    Call fn at most once at a time for a given key, across gunicorn workers and hosts.
+    The leader publishes its result to the LLM response cache; concurrent followers wait
+    for the leader to finish and then read that result instead of calling fn again.
+    Results that are not model responses (e.g. the id of a saved draft) are published with
+    dedupe_only to DedupeResult instead, out of the cache's stats and eviction.
+    Results rejected by cache_if are not published, so followers and later calls call fn themselves.
+    """
+    get_result = get_dedupe_result if dedupe_only else get_cached_response
+    set_result = set_dedupe_result if dedupe_only else set_cached_response
+    if use_cache:
+        cached_result = get_result(namespace, key)
+        if cached_result is not None:
+            return cached_result
+
+    def lead() -> str:
+        result = fn()
+        if cache_if is None or cache_if(result):
+            set_result(namespace, key, result, ttl)
+        return result
+
+    lock_key = f"{namespace}:{key}"
+    with advisory_lock(lock_key, timeout=0) as is_leader:
+        if is_leader:
+            if use_cache:
+                # The previous leader may have published and released the lock since the check above
+                cached_result = get_result(namespace, key, count_miss=False)
+                if cached_result is not None:
+                    return cached_result
+            return lead()
+
+    # Follower: wait until the leader releases the lock, then pick up its result
+    with advisory_lock(lock_key):
+        pass
+    result = get_result(namespace, key)
+    if result is None:
+        # The leader failed (or timed out), so try ourselves
+        return lead()
+    return result
@@ -0,0 +1,187 @@
+import re
+from fractions import Fraction
+from functools import lru_cache
+from .quantity_parser import ParsedQuantity, parse_quantity
+from .scale_recipe import format_number
+
+METRIC = 'metric'
+IMPERIAL = 'imperial'
+
+# Canonical units (see quantity_parser.py) in grams and millilitres; US customary measures
+MASS_IN_GRAMS = {
+    'mg': 0.001,
+    'g': 1,
+    'kg': 1000,
+    'oz': 28.349523125,
+    'lb': 453.59237,
+}
+VOLUME_IN_ML = {
+    'ml': 1,
+    'cl': 10,
+    'dl': 100,
+    'l': 1000,
+    'tsp': 4.92892159375,
+    'tbsp': 14.78676478125,
+    'fl oz': 29.5735295625,
+    'cup': 236.5882365,
+    'pint': 473.176473,
+    'quart': 946.352946,
+}
+METRIC_UNITS = {'mg', 'g', 'kg', 'ml', 'cl', 'dl', 'l'}
+IMPERIAL_UNITS = {'oz', 'lb', 'fl oz', 'cup', 'pint', 'quart'}
+# Teaspoons and tablespoons are used in both systems and stay as they are
+
+# Grams per millilitre of ingredients measured by volume in US recipes and by weight in metric ones,
+# matched as words in the ingredient name, most specific first. Liquids are left as volumes.
+DENSITY_HINTS = {
+    'brown sugar': 0.93,
+    'powdered sugar': 0.56,
+    'icing sugar': 0.56,
+    'sugar': 0.85,
+    'flour': 0.53,
+    'cornstarch': 0.54,
+    'cornflour': 0.54,
+    'cocoa': 0.42,
+    'butter': 0.96,
+    'rice': 0.82,
+    'oats': 0.38,
+    'breadcrumbs': 0.45,
+    'panko': 0.25,
+    'parmesan': 0.4,
+    'cheese': 0.45,
+    'honey': 1.42,
+    'syrup': 1.32,
+    'chocolate chips': 0.72,
+    'almonds': 0.6,
+    'walnuts': 0.45,
+    'nuts': 0.55,
+    'lentils': 0.82,
+    'quinoa': 0.72,
+    'couscous': 0.73,
+    'peas': 0.6,
+    'yogurt': 1.03,
+    'yoghurt': 1.03,
+}
+DENSITY_REGEX = re.compile(r'\b(' + '|'.join(re.escape(name) for name in DENSITY_HINTS) + r')\b', re.IGNORECASE)
+
+CONVERSION_HINT_REGEX = re.compile(r'\(\s*(?:about|approx\.?|approximately|roughly|~)?\s*([^()]*)\)')
+
+
+def density_for(name: str) -> float | None:
+    match = DENSITY_REGEX.search(name)
+    return DENSITY_HINTS[match.group(1).lower()] if match else None
+
+def round_to(value: float, step: float) -> float:
+    return round(value / step) * step
+
+def metric_amount(value: float, unit: str) -> tuple[float, str]:
+    """Grams or millilitres, rounded the way a metric recipe would write them"""
+    large_unit = 'kg' if unit == 'g' else 'l'
+    if value >= 1000:
+        return round(value / 1000, 1), large_unit
+    if value >= 250:
+        return round_to(value, 10), unit
+    if value >= 20:
+        return round_to(value, 5), unit
+    return max(round(value), 1), unit
+
+def imperial_volume(ml: float) -> tuple[float, str]:
+    """Cups in quarters from a quarter cup, then tablespoons in halves from one, then teaspoons in quarters"""
+    if ml >= VOLUME_IN_ML['cup'] / 4:
+        return round_to(ml / VOLUME_IN_ML['cup'], 0.25), 'cup'
+    if ml >= VOLUME_IN_ML['tbsp']:
+        return round_to(ml / VOLUME_IN_ML['tbsp'], 0.5), 'tbsp'
+    return max(round_to(ml / VOLUME_IN_ML['tsp'], 0.25), 0.25), 'tsp'
+
+def imperial_mass(grams: float) -> tuple[float, str]:
+    ounces = grams / MASS_IN_GRAMS['oz']
+    if ounces >= 16:
+        return round_to(grams / MASS_IN_GRAMS['lb'], 0.25), 'lb'
+    return max(round_to(ounces, 0.5 if ounces < 4 else 1), 0.5), 'oz'
+
+def format_amount(value: float, unit: str) -> str:
+    if unit == 'cup' and value > 1:
+        unit = 'cups'
+    return f"{format_number(float(value))} {unit}"
+
+def is_conversion_hint(modifier: str) -> bool:
+    """True for parentheticals like "(about 1 cup)" that only restate the amount in other units"""
+    match = CONVERSION_HINT_REGEX.fullmatch(modifier)
+    if not match:
+        return False
+    amount, unit, rest = parse_quantity(match.group(1))
+    return amount is not None and (unit in MASS_IN_GRAMS or unit in VOLUME_IN_ML) and not rest
+
+@lru_cache(maxsize=8192)
+def convert_parsed_quantity(quantity: str, parsed: ParsedQuantity, name: str, units: str) -> tuple[str, ParsedQuantity]:
+    """convert_quantity of a quantity already parsed (e.g. from Ingredient's columns), with the result parsed too"""
+    amount, unit, modifier = parsed
+    if amount is None or unit not in (METRIC_UNITS | IMPERIAL_UNITS):
+        return quantity, parsed
+    if (units == METRIC and unit in METRIC_UNITS) or (units == IMPERIAL and unit in IMPERIAL_UNITS):
+        return quantity, parsed
+
+    density = density_for(name)
+    value = float(amount)
+    if units == METRIC and unit in MASS_IN_GRAMS:
+        converted = metric_amount(value * MASS_IN_GRAMS[unit], 'g')
+    elif units == METRIC and density:
+        converted = metric_amount(value * VOLUME_IN_ML[unit] * density, 'g')
+    elif units == METRIC:
+        converted = metric_amount(value * VOLUME_IN_ML[unit], 'ml')
+    elif unit in VOLUME_IN_ML:
+        converted = imperial_volume(value * VOLUME_IN_ML[unit])
+    elif density:
+        converted = imperial_volume(value * MASS_IN_GRAMS[unit] / density)
+    else:
+        converted = imperial_mass(value * MASS_IN_GRAMS[unit])
+
+    converted_quantity = format_amount(*converted)
+    converted_amount = Fraction(converted[0]).limit_denominator(1000)
+    if not modifier or is_conversion_hint(modifier):
+        return converted_quantity, ParsedQuantity(converted_amount, converted[1], '')
+    converted_parsed = ParsedQuantity(converted_amount, converted[1], modifier)
+    if modifier.startswith('('):
+        return f"{converted_quantity} {modifier}", converted_parsed
+    return f"{converted_quantity}, {modifier}", converted_parsed
+
+def convert_quantity(quantity: str, name: str, units: str) -> str:
+    """
+    The quantity in metric or imperial units, or unchanged if it is already in them, is a count,
+    or has no single amount. Volumes and weights of dry ingredients are converted into each
+    other with DENSITY_HINTS, e.g. "2 cups flour" becomes "250 g" in metric.
+    """
+    return convert_parsed_quantity(quantity, parse_quantity(quantity), name, units)[0]
+
+
+# Oven temperatures in instructions, e.g. "180°C", "350 °F", "200 degrees Celsius", "180C"
+TEMPERATURE = r'(\d{2,3})\s*(?:°\s*|degrees\s+)?(C|F|Celsius|Fahrenheit)\b'
+TEMPERATURE_REGEX = re.compile(TEMPERATURE)
+# Both already given, e.g. "180°C (350°F)"
+TEMPERATURE_PAIR_REGEX = re.compile(rf'{TEMPERATURE}\s*[(/]\s*{TEMPERATURE}\s*\)?')
+
+def convert_temperature(degrees: int, scale: str, units: str) -> str | None:
+    """Oven temperatures to the nearest 10°C or 25°F as ovens are marked, lower ones to 5 degrees; None if already in units"""
+    celsius = scale.startswith('C')
+    if units == METRIC and not celsius:
+        converted = (degrees - 32) * 5 / 9
+        return f"{round_to(converted, 10 if converted >= 120 else 5):.0f}°C"
+    if units == IMPERIAL and celsius:
+        converted = degrees * 9 / 5 + 32
+        return f"{round_to(converted, 25 if converted >= 250 else 5):.0f}°F"
+    return None
+
+def convert_temperatures(text: str, units: str) -> str:
+    """Temperatures in text in °C (metric) or °F (imperial)"""
+    def pair(match):
+        first, second = match.group(1, 2), match.group(3, 4)
+        if first[1][0] == second[1][0]:
+            return match.group(0)
+        celsius, fahrenheit = (first, second) if first[1].startswith('C') else (second, first)
+        degrees, scale = celsius if units == METRIC else fahrenheit
+        return f"{degrees}°{scale[0]}"
+
+    def single(match):
+        return convert_temperature(int(match.group(1)), match.group(2), units) or match.group(0)
+
+    return TEMPERATURE_REGEX.sub(single, TEMPERATURE_PAIR_REGEX.sub(pair, text))
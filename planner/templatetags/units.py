@@ -0,0 +1,28 @@
+from django import template
+from planner.services.unit_conversion import convert_quantity, convert_temperatures
+
+register = template.Library()
+
+@register.filter
+def temperatures(text, units):
+    """
+    Converts temperatures in text to the given units ('metric' or 'imperial').
+
+    Usage:
+    {{ step.text|temperatures:units }}
+    """
+    if not units:
+        return text
+    return convert_temperatures(text, units)
+
+@register.simple_tag
+def quantity_in(quantity, name, units):
+    """
+    The quantity of an ingredient in the given units, unchanged if units is empty.
+
+    Usage:
+    {% quantity_in item.quantity item.name units %}
+    """
+    if not units:
+        return quantity
+    return convert_quantity(quantity, name, units)
@@ -0,0 +1,77 @@
+import time
+import pytest
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from planner.models import Recipe
+from planner.services.batch_generation import BatchItem, Checkpoint, read_batch, run_batch
+from planner.services.llm_client import reset_llm_client
+from planner.services.rate_limit import TokenBucket
+
+
+@pytest.fixture
+def fake_llm(settings):
+    settings.LLM_PROVIDER = 'local'
+    settings.LOCAL_LLM = {**settings.LOCAL_LLM, 'LATENCY': 0.1, 'JITTER': 0, 'ERROR_RATE': 0}
+    reset_llm_client()
+    yield
+    reset_llm_client()
+
+
+def test_token_bucket_limits_rate():
+    bucket = TokenBucket(rate=20, capacity=1)
+    started = time.perf_counter()
+    for _ in range(5):
+        bucket.acquire()
+    # First token is free, the other four wait 1/20s each
+    assert 0.18 < time.perf_counter() - started < 0.5
+
+def test_read_batch():
+    items = read_batch([
+        "# Weeknight dinners",
+        "Pad thai",
+        "",
+        '{"dish_idea": "Lasagna", "servings": 8}',
+    ], servings=4, units='metric')
+    assert items == [
+        BatchItem(dish_idea='Pad thai', servings=4, units='metric'),
+        BatchItem(dish_idea='Lasagna', servings=8, units='metric'),
+    ]
+
+
+class TestRunBatch:
+    def test_failed_items_stay_out_of_checkpoint(self, tmp_path):
+        checkpoint = Checkpoint(tmp_path / 'batch.checkpoint')
+        items = [BatchItem(dish_idea=f'dish {i}') for i in range(6)]
+
+        def process(item):
+            if item.dish_idea == 'dish 3':
+                raise RuntimeError("upstream timeout")
+            return item.dish_idea
+
+        results = run_batch(items, process, concurrency=3, checkpoint=checkpoint)
+        assert len(results) == 6
+        assert [r.item.dish_idea for r in results if r.error] == ['dish 3']
+
+        # Resuming only runs what is left
+        resumed = run_batch(items, lambda item: item.dish_idea, concurrency=3, checkpoint=Checkpoint(tmp_path / 'batch.checkpoint'))
+        assert [r.item.dish_idea for r in resumed] == ['dish 3']
+
+    def test_concurrency_overlaps_slow_items(self):
+        items = [BatchItem(dish_idea=f'dish {i}') for i in range(8)]
+        started = time.perf_counter()
+        run_batch(items, lambda item: time.sleep(0.1), concurrency=8)
+        assert time.perf_counter() - started < 0.4
+
+
+@pytest.mark.django_db(transaction=True)
+def test_make_recipe_batch_command_resumes(tmp_path, fake_llm):
+    User.objects.create_user(username='admin', password='testpass')
+    batch_file = tmp_path / 'dishes.txt'
+    batch_file.write_text("Vegetable curry\nMushroom risotto\n")
+
+    call_command('make_recipe', batch=str(batch_file), db=True, concurrency=2)
+    assert sorted(Recipe.objects.values_list('title', flat=True)) == ['Mushroom Risotto', 'Vegetable Curry']
+
+    batch_file.write_text("Vegetable curry\nMushroom risotto\nTomato soup\n")
+    call_command('make_recipe', batch=str(batch_file), db=True, concurrency=2)
+    assert Recipe.objects.count() == 3
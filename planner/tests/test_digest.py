@@ -0,0 +1,72 @@
+import pytest
+from django.contrib.auth.models import User
+from planner.models import Ingredient as DBIngredient
+from planner.models import MealGroup, MealPlan, MealPlanRecipe
+from planner.services.digest import ingredients_digest, meal_plan_content_digest, recipe_ingredients_digest, update_ingredients_digests
+from planner.services.recipe_generator import Ingredient, InstructionSection, InstructionStep, Recipe
+from planner.services.recipe_repository import save_recipe_to_db, update_recipes_in_db
+
+pytestmark = pytest.mark.django_db
+
+@pytest.fixture
+def user():
+    return User.objects.create_user(username='testuser', password='testpass')
+
+def make_recipe(title="Pancakes", servings=4, ingredients=(("Flour", "200 g"), ("Milk", "300 ml"))) -> Recipe:
+    return Recipe(
+        title=title,
+        description="Fluffy",
+        servings=servings,
+        ingredients=[Ingredient(name=name, quantity=quantity) for name, quantity in ingredients],
+        instructions=[InstructionSection(section_title="Cook", steps=[InstructionStep(text="Fry")])],
+    )
+
+class TestIngredientsDigest:
+    def test_stable_and_sensitive_to_shopping_content(self):
+        base = recipe_ingredients_digest(make_recipe())
+
+        assert base == recipe_ingredients_digest(make_recipe(title="Other title"))
+        assert base == ingredients_digest(4, [("Flour", "200 g"), ("Milk", "300 ml")])
+        assert base != recipe_ingredients_digest(make_recipe(servings=2))
+        assert base != recipe_ingredients_digest(make_recipe(ingredients=(("Flour", "250 g"), ("Milk", "300 ml"))))
+        assert base != recipe_ingredients_digest(make_recipe(ingredients=(("Milk", "300 ml"), ("Flour", "200 g"))))
+
+    def test_repository_keeps_digest_current(self, user):
+        db_recipe = save_recipe_to_db(make_recipe(), user)
+        assert db_recipe.ingredients_digest == recipe_ingredients_digest(make_recipe())
+
+        changed = make_recipe(ingredients=(("Flour", "400 g"),))
+        update_recipes_in_db([(changed, db_recipe)])
+        db_recipe.refresh_from_db()
+        assert db_recipe.ingredients_digest == recipe_ingredients_digest(changed)
+
+    def test_update_ingredients_digests(self, user):
+        db_recipe = save_recipe_to_db(make_recipe(), user)
+        DBIngredient.objects.filter(recipe=db_recipe, name="Milk").update(quantity="1 l")
+
+        assert update_ingredients_digests([db_recipe]) == 1
+        db_recipe.refresh_from_db()
+        assert db_recipe.ingredients_digest == ingredients_digest(4, [("Flour", "200 g"), ("Milk", "1 l")])
+        assert update_ingredients_digests([db_recipe]) == 0
+
+class TestMealPlanContentDigest:
+    def test_follows_planned_recipes(self, user, django_assert_num_queries):
+        pancakes = save_recipe_to_db(make_recipe(), user)
+        waffles = save_recipe_to_db(make_recipe("Waffles", ingredients=(("Flour", "300 g"),)), user)
+        meal_plan = MealPlan.objects.create(name="Week", user=user)
+        group = MealGroup.objects.create(name="Breakfast", meal_plan=meal_plan)
+        MealPlanRecipe.objects.create(meal_group=group, recipe=pancakes, order=1)
+
+        with django_assert_num_queries(1):
+            single = meal_plan_content_digest(meal_plan)
+
+        MealPlanRecipe.objects.create(meal_group=group, recipe=waffles, order=2)
+        both = meal_plan_content_digest(meal_plan)
+        assert both != single
+
+        update_recipes_in_db([(make_recipe("Waffles", ingredients=(("Flour", "350 g"),)), waffles)])
+        edited = meal_plan_content_digest(meal_plan)
+        assert edited not in (single, both)
+
+        MealPlanRecipe.objects.filter(recipe=waffles).update(servings=2)
+        assert meal_plan_content_digest(meal_plan) not in (single, both, edited)
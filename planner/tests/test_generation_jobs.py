@@ -0,0 +1,171 @@
+import threading
+import time
+import pytest
+from contextlib import contextmanager
+from django.contrib.auth.models import User
+from django.db import connection
+from django.utils import timezone
+from planner.models import GenerationJob, Recipe
+from planner.services import generation_jobs
+from planner.services.generation_jobs import enqueue_recipe_job, process_available_jobs
+from planner.services.http_client import CircuitOpenError
+from planner.services.llm_client import get_llm_client, reset_llm_client
+
+FAKE_LLM_LATENCY = 0.2 # seconds per generation
+
+
+@pytest.fixture
+def user():
+    return User.objects.create_user(username='testuser', password='testpass')
+
+@pytest.fixture
+def fake_llm(settings):
+    """Local LLM stand-in with a fixed latency; yields the list of calls made to it"""
+    settings.LLM_PROVIDER = 'local'
+    settings.LOCAL_LLM = {**settings.LOCAL_LLM, 'LATENCY': FAKE_LLM_LATENCY, 'JITTER': 0, 'ERROR_RATE': 0}
+    reset_llm_client()
+
+    engine = get_llm_client().engine
+    calls = []
+    complete = engine.complete
+
+    def counting_complete(*args, **kwargs):
+        calls.append(args)
+        return complete(*args, **kwargs)
+
+    engine.complete = counting_complete
+    yield calls
+    reset_llm_client()
+
+
+@pytest.mark.django_db
+class TestGenerationJobs:
+    def test_job_saves_draft_recipe(self, user, fake_llm):
+        job = enqueue_recipe_job(user, dish_idea='vegetable curry', servings=2)
+        assert job.status == 'queued'
+
+        assert process_available_jobs('test-worker') == 1
+
+        job.refresh_from_db()
+        assert job.status == 'succeeded'
+        assert job.attempts == 1
+        assert job.recipe.title == 'Vegetable Curry'
+        assert job.recipe.status == 'draft'
+        assert job.recipe.created_by == user
+        assert user in job.recipe.saved_to_my_recipes_by.all()
+
+    def test_requeued_job_does_not_save_a_second_recipe(self, user, fake_llm):
+        job = enqueue_recipe_job(user, dish_idea='vegetable curry', servings=2)
+        process_available_jobs('test-worker')
+
+        # As if the worker had died after committing the recipe, and the job was requeued
+        GenerationJob.objects.filter(id=job.id).update(status='queued', finished_at=None)
+        fake_llm.clear()
+        assert process_available_jobs('test-worker') == 1
+
+        job.refresh_from_db()
+        assert job.status == 'succeeded'
+        assert fake_llm == []
+        assert Recipe.objects.count() == 1
+
+    def test_job_without_cache_asks_for_a_fresh_recipe(self, user, fake_llm):
+        enqueue_recipe_job(user, dish_idea='vegetable curry', servings=2)
+        enqueue_recipe_job(user, dish_idea='vegetable curry', servings=2, use_cache=False)
+
+        assert process_available_jobs('test-worker') == 2
+
+        assert len(fake_llm) == 2
+        assert Recipe.objects.count() == 2
+
+    def test_failed_job_is_retried_then_marked_failed(self, user, monkeypatch):
+        def _failing_generate_recipe(**kwargs):
+            raise RuntimeError("upstream timeout")
+        monkeypatch.setattr(generation_jobs, 'generate_recipe', _failing_generate_recipe)
+        monkeypatch.setattr(generation_jobs, 'RETRY_BACKOFF_SECONDS', 0)
+
+        job = enqueue_recipe_job(user, dish_idea='soup', servings=4)
+        job.max_attempts = 2
+        job.save()
+
+        process_available_jobs('test-worker')
+
+        job.refresh_from_db()
+        assert job.status == 'failed'
+        assert job.attempts == 2
+        assert "upstream timeout" in job.last_error
+        assert job.recipe is None
+
+
+@pytest.mark.django_db(transaction=True)
+def test_worker_throughput_against_fake_llm(user, fake_llm):
+    """Concurrent workers should drain the queue much faster than one blocking request per job"""
+    job_count = 24
+    worker_count = 6
+    for i in range(job_count):
+        enqueue_recipe_job(user, dish_idea=f'dish {i}', servings=4)
+
+    def work(worker_id):
+        try:
+            process_available_jobs(worker_id)
+        finally:
+            connection.close()
+
+    started = time.perf_counter()
+    workers = [threading.Thread(target=work, args=(f'worker-{i}',)) for i in range(worker_count)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - started
+
+    assert GenerationJob.objects.filter(status='succeeded').count() == job_count
+    assert Recipe.objects.count() == job_count
+    assert len(fake_llm) == job_count # No job ran twice
+
+    sequential_time = job_count * FAKE_LLM_LATENCY
+    print(f"\n{job_count} jobs in {elapsed:.2f}s ({job_count / elapsed:.1f} jobs/s, sequential floor {sequential_time:.2f}s)")
+    assert elapsed < sequential_time
+
+
+@pytest.mark.django_db
+def test_identical_active_job_is_reused(user):
+    first = enqueue_recipe_job(user, dish_idea='Pad Thai', servings=2)
+    second = enqueue_recipe_job(user, dish_idea='pad  thai', servings=2)
+    different = enqueue_recipe_job(user, dish_idea='pad thai', servings=4)
+
+    assert first.id == second.id
+    assert different.id != first.id
+    assert GenerationJob.objects.count() == 2
+
+
+@pytest.mark.django_db
+def test_no_job_is_queued_without_the_lock(user, monkeypatch):
+    @contextmanager
+    def held_elsewhere(key, timeout):
+        yield False
+    monkeypatch.setattr(generation_jobs, 'advisory_lock', held_elsewhere)
+
+    with pytest.raises(TimeoutError):
+        enqueue_recipe_job(user, dish_idea='Pad Thai', servings=2)
+    assert not GenerationJob.objects.exists()
+
+    # The job the lock holder queued is returned
+    job = GenerationJob.objects.create(kind='recipe', user=user, payload={}, dedupe_key=generation_jobs.recipe_request_key(user, {
+        'dish_idea': 'Pad Thai', 'servings': 2, 'notes': '', 'dietary_preferences': '', 'units': 'metric', 'use_cache': True,
+    }))
+    assert enqueue_recipe_job(user, dish_idea='Pad Thai', servings=2).id == job.id
+
+
+@pytest.mark.django_db
+def test_open_circuit_postpones_job_without_using_an_attempt(user, monkeypatch):
+    def _unavailable(**kwargs):
+        raise CircuitOpenError('llm:openai', retry_after=30)
+    monkeypatch.setattr(generation_jobs, 'generate_recipe', _unavailable)
+
+    job = enqueue_recipe_job(user, dish_idea='soup', servings=4)
+    process_available_jobs('test-worker')
+
+    job.refresh_from_db()
+    assert job.status == 'queued'
+    assert job.attempts == 0
+    assert job.run_after > timezone.now()
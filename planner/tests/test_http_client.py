@@ -0,0 +1,152 @@
+import time
+import httpx
+import openai
+import pytest
+from django.contrib.auth.models import User
+from django.urls import reverse
+from planner.models import GenerationJob
+from planner.services.http_client import CircuitBreaker, CircuitOpenError, get_http_session, is_upstream_failure, llm_timeout, reset_circuit_breakers
+from planner.services.llm_client import get_llm_client, llm_circuit_breaker, reset_llm_client
+from planner.services.recipe_generator import generate_recipe
+
+
+def api_error(status_code):
+    response = httpx.Response(status_code, request=httpx.Request('POST', 'http://llm.test/v1/chat/completions'))
+    return openai.APIStatusError("error", response=response, body=None)
+
+@pytest.fixture(autouse=True)
+def fresh_breakers():
+    reset_circuit_breakers()
+    yield
+    reset_circuit_breakers()
+
+@pytest.fixture
+def failing_llm(settings):
+    """Local LLM stand-in where every call fails with a 429 or 5xx"""
+    settings.LLM_PROVIDER = 'local'
+    settings.LOCAL_LLM = {**settings.LOCAL_LLM, 'LATENCY': 0, 'JITTER': 0, 'ERROR_RATE': 1.0}
+    settings.CIRCUIT_BREAKER = {'FAILURE_THRESHOLD': 2, 'RESET_TIMEOUT': 60}
+    reset_llm_client()
+    yield
+    reset_llm_client()
+
+
+class TestCircuitBreaker:
+    def fail(self, breaker, error=None):
+        with pytest.raises(type(error or api_error(503))):
+            with breaker.guard():
+                raise error or api_error(503)
+
+    def test_opens_after_consecutive_upstream_failures(self):
+        breaker = CircuitBreaker('test', failure_threshold=3, reset_timeout=60)
+        self.fail(breaker)
+        self.fail(breaker)
+        with breaker.guard():
+            pass # A success resets the count
+        for _ in range(3):
+            self.fail(breaker)
+
+        assert breaker.state == 'open'
+        with pytest.raises(CircuitOpenError) as excinfo:
+            with breaker.guard():
+                pytest.fail("Should not be called while open")
+        assert 0 < excinfo.value.retry_after <= 60
+
+    def test_client_errors_do_not_count(self):
+        breaker = CircuitBreaker('test', failure_threshold=1, reset_timeout=60)
+        self.fail(breaker, api_error(400))
+        self.fail(breaker, ValueError("bad recipe JSON"))
+        assert breaker.state == 'closed'
+
+    def test_half_open_trial_call(self):
+        breaker = CircuitBreaker('test', failure_threshold=1, reset_timeout=0.05)
+        self.fail(breaker)
+        time.sleep(0.06)
+        assert breaker.state == 'half_open'
+
+        # A failed trial reopens immediately
+        self.fail(breaker)
+        assert breaker.state == 'open'
+
+        time.sleep(0.06)
+        with breaker.guard():
+            pass
+        assert breaker.state == 'closed'
+
+    def test_abandoned_trial_lets_the_next_call_through(self):
+        breaker = CircuitBreaker('test', failure_threshold=1, reset_timeout=0.05)
+        self.fail(breaker)
+        time.sleep(0.06)
+
+        def streaming_call():
+            with breaker.guard():
+                yield 'chunk'
+        stream = streaming_call()
+        next(stream)
+        stream.close() # The client disconnected mid-stream
+
+        with breaker.guard():
+            pass
+        assert breaker.state == 'closed'
+
+    def test_upstream_failures(self):
+        assert is_upstream_failure(api_error(429))
+        assert is_upstream_failure(api_error(502))
+        assert is_upstream_failure(openai.APITimeoutError(request=httpx.Request('POST', 'http://llm.test')))
+        assert not is_upstream_failure(api_error(401))
+
+
+class TestClients:
+    def test_timeouts_come_from_settings(self, settings):
+        settings.HTTP_TIMEOUTS = {**settings.HTTP_TIMEOUTS, 'recipe': (3, 45)}
+        timeout = llm_timeout('recipe')
+        assert (timeout.connect, timeout.read) == (3, 45)
+
+    def test_openai_client_is_tuned(self, settings):
+        settings.LLM_PROVIDER = 'openai'
+        reset_llm_client()
+        try:
+            client = get_llm_client()
+            assert client.max_retries == settings.HTTP_MAX_RETRIES
+            assert client.timeout.read == settings.HTTP_TIMEOUTS['default'][1]
+        finally:
+            reset_llm_client()
+
+    def test_download_session_is_shared_and_retries(self, settings):
+        session = get_http_session()
+        assert get_http_session() is session
+        adapter = session.get_adapter('https://oaidalleapiprodscus.blob.core.windows.net/')
+        assert adapter.max_retries.total == settings.HTTP_MAX_RETRIES
+        assert 503 in adapter.max_retries.status_forcelist
+
+
+@pytest.mark.django_db
+class TestFailFast:
+    def test_generation_fails_fast_once_breaker_opens(self, failing_llm):
+        for _ in range(2):
+            with pytest.raises((openai.RateLimitError, openai.InternalServerError)):
+                generate_recipe(dish_idea='soup', servings=2, use_cache=False)
+
+        with pytest.raises(CircuitOpenError):
+            generate_recipe(dish_idea='soup', servings=2, use_cache=False)
+
+    def test_view_returns_friendly_htmx_error_while_open(self, failing_llm, settings, client):
+        settings.RECIPE_STREAMING = True
+        client.force_login(User.objects.create_user(username='testuser', password='testpass'))
+        llm_circuit_breaker().record_failure()
+        llm_circuit_breaker().record_failure()
+
+        response = client.post(reverse('action_generate_recipe'), {'dish_idea': 'soup', 'servings': 2, 'units': 'metric'})
+        assert response.status_code == 200
+        assert response['HX-Retarget'] == '#recipe-job-status'
+        assert b"temporarily unavailable" in response.content
+
+    def test_no_job_is_queued_while_open(self, failing_llm, settings, client):
+        settings.RECIPE_STREAMING = False
+        client.force_login(User.objects.create_user(username='testuser', password='testpass'))
+        llm_circuit_breaker().record_failure()
+        llm_circuit_breaker().record_failure()
+
+        response = client.post(reverse('action_generate_recipe'), {'dish_idea': 'soup', 'servings': 2, 'units': 'metric'})
+        assert response['HX-Retarget'] == '#recipe-job-status'
+        assert not GenerationJob.objects.exists()
@@ -0,0 +1,69 @@
+import pytest
+from django.contrib.auth.models import User
+from planner.models import IngredientCategory, LLMCall, MealGroup, MealPlan, MealPlanRecipe
+from planner.services import shopping_list_generator
+from planner.services.ingredient_categories import known_categories, learn_categories
+from planner.services.llm_cache import clear_cache
+from planner.services.recipe_generator import Ingredient, InstructionSection, InstructionStep, Recipe
+from planner.services.recipe_repository import save_recipe_to_db
+from planner.services.shopping_list_generator import generate_shopping_list
+
+
+@pytest.mark.django_db
+class TestIngredientCategories:
+    def test_exact_and_normalized_lookups(self):
+        learn_categories([("Carrots", 'fruit_veg'), ("onion", 'fruit_veg'), ("red onion", 'fruit_veg'), ("milk", 'dairy')])
+
+        assert known_categories(["carrots", "Onions", "Red onions, sliced", "flour"]) == {
+            "carrots": 'fruit_veg',
+            "Onions": 'fruit_veg',
+            "Red onions, sliced": 'fruit_veg',
+        }
+
+    def test_latest_category_wins(self):
+        learn_categories([("tofu", 'pantry')])
+        learn_categories([("tofu", 'dairy'), ("tofu", 'dairy'), ("mystery", 'not a category')])
+
+        assert IngredientCategory.objects.count() == 1
+        assert known_categories(["tofu"]) == {"tofu": 'dairy'}
+
+    def test_long_names_are_truncated(self):
+        long_name = "extra mature farmhouse cheddar " * 5 + "slices"
+        learn_categories([(long_name, 'dairy')])
+
+        category = IngredientCategory.objects.get()
+        assert len(category.name) == len(category.normalized_name) == 100
+        assert known_categories([long_name, long_name.replace("slices", "slice")]) == {
+            long_name: 'dairy',
+            long_name.replace("slices", "slice"): 'dairy',
+        }
+
+
+@pytest.mark.django_db(transaction=True) # Recipes missing from the cache are normalized in pool threads
+class TestGenerateShoppingList:
+    def test_known_items_need_no_api_call(self, settings, monkeypatch):
+        settings.LLM_PROVIDER = 'local'
+        settings.LOCAL_LLM = {**settings.LOCAL_LLM, 'LATENCY': 0, 'JITTER': 0}
+        user = User.objects.create_user(username='testuser', password='testpass')
+        recipe = save_recipe_to_db(Recipe(
+            title="Carrot Soup",
+            description="",
+            servings=4,
+            ingredients=[Ingredient(name="Carrots, chopped", quantity="500 g"), Ingredient(name="Milk", quantity="200 ml")],
+            instructions=[InstructionSection(section_title="Cook", steps=[InstructionStep(text="Cook")])],
+        ), user)
+        meal_plan = MealPlan.objects.create(name="Week", user=user)
+        group = MealGroup.objects.create(name="Monday", meal_plan=meal_plan)
+        MealPlanRecipe.objects.create(meal_group=group, recipe=recipe, order=1)
+
+        first = generate_shopping_list(meal_plan)
+        assert LLMCall.objects.filter(operation='shopping_list').count() == 1
+        assert known_categories(["carrots", "milk"]) == {"carrots": 'fruit_veg', "milk": 'dairy'}
+
+        def no_api_calls():
+            raise AssertionError("The model should not be called for known items")
+        monkeypatch.setattr(shopping_list_generator, 'get_llm_client', no_api_calls)
+        clear_cache('shopping_recipe') # Normalize the recipe again, from the learned categories alone
+        second = generate_shopping_list(meal_plan)
+        assert LLMCall.objects.filter(operation='shopping_list').count() == 1
+        assert [(item.name, item.category) for item in second.items] == [(item.name, item.category) for item in first.items]
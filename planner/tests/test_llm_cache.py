@@ -0,0 +1,82 @@
+import pytest
+from datetime import timedelta
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from planner.models import LLMCacheEntry, LLMCacheStats
+from planner.services.llm_cache import evict, get_cached_response, get_cached_responses, make_cache_key, set_cached_response
+
+
+class TestCacheKey:
+    def test_key_ignores_case_and_whitespace(self):
+        key_a = make_cache_key('recipe', 1, dish_idea='Vegetarian  Lasagna ', servings=4, notes='')
+        key_b = make_cache_key('recipe', 1, dish_idea='vegetarian lasagna', servings='4', notes=None)
+        assert key_a == key_b
+
+    def test_key_changes_with_inputs_and_prompt_version(self):
+        base = make_cache_key('recipe', 1, dish_idea='lasagna', servings=4)
+        assert base != make_cache_key('recipe', 1, dish_idea='lasagna', servings=6)
+        assert base != make_cache_key('recipe', 2, dish_idea='lasagna', servings=4)
+        assert base != make_cache_key('shopping_list', 1, dish_idea='lasagna', servings=4)
+
+
+@pytest.mark.django_db
+class TestLLMCache:
+    def test_hit_and_miss_counters(self):
+        key = make_cache_key('recipe', 1, dish_idea='soup')
+        assert get_cached_response('recipe', key) is None
+
+        set_cached_response('recipe', key, '{"title": "Soup"}')
+        assert get_cached_response('recipe', key) == '{"title": "Soup"}'
+        assert get_cached_response('recipe', key) == '{"title": "Soup"}'
+
+        stats = LLMCacheStats.objects.get(namespace='recipe')
+        assert (stats.hits, stats.misses) == (2, 1)
+        assert LLMCacheEntry.objects.get(key=key).hit_count == 2
+
+    def test_bulk_lookup(self, django_assert_num_queries):
+        keys = [make_cache_key('recipe', 1, dish_idea=dish) for dish in ('soup', 'stew', 'curry')]
+        set_cached_response('recipe', keys[0], 'Soup')
+        set_cached_response('recipe', keys[1], 'Stew')
+        LLMCacheStats.objects.create(namespace='recipe')
+
+        with django_assert_num_queries(4):
+            assert get_cached_responses('recipe', keys) == {keys[0]: 'Soup', keys[1]: 'Stew'}
+
+        stats = LLMCacheStats.objects.get(namespace='recipe')
+        assert (stats.hits, stats.misses) == (2, 1)
+        assert LLMCacheEntry.objects.get(key=keys[0]).hit_count == 1
+
+    def test_expired_entries_are_misses_and_evicted(self):
+        key = make_cache_key('recipe', 1, dish_idea='stew')
+        set_cached_response('recipe', key, 'stale', ttl=60)
+        LLMCacheEntry.objects.filter(key=key).update(expires_at=timezone.now() - timedelta(seconds=1))
+
+        assert get_cached_response('recipe', key) is None
+        assert evict() == 1
+        assert not LLMCacheEntry.objects.exists()
+        assert LLMCacheStats.objects.get(namespace='recipe').evictions == 1
+
+    def test_size_based_eviction_drops_least_recently_used(self, settings):
+        settings.LLM_CACHE_MAX_BYTES = 25
+        settings.LLM_CACHE_EVICT_EVERY = 1
+        keys = [make_cache_key('recipe', 1, dish_idea=f'dish {i}') for i in range(3)]
+        for key in keys:
+            set_cached_response('recipe', key, 'x' * 10)
+
+        # Oldest entry was pushed out once the third one exceeded the budget
+        assert list(LLMCacheEntry.objects.order_by('id').values_list('key', flat=True)) == keys[1:]
+
+    def test_writes_between_evictions_do_not_scan_the_cache(self, settings):
+        settings.LLM_CACHE_MAX_BYTES = 25
+        settings.LLM_CACHE_EVICT_EVERY = 1000
+        keys = [make_cache_key('recipe', 1, dish_idea=f'dish {i}') for i in range(3)]
+        for key in keys[:2]:
+            set_cached_response('recipe', key, 'x' * 10)
+
+        # Just the upsert, no expiry sweep or size total
+        with CaptureQueriesContext(connection) as queries:
+            set_cached_response('recipe', keys[2], 'x' * 10)
+        assert not any('SUM(' in query['sql'] or query['sql'].startswith('DELETE') for query in queries.captured_queries)
+        assert LLMCacheEntry.objects.count() == 3
+        assert evict() == 1
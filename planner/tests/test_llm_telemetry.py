@@ -0,0 +1,118 @@
+from datetime import timedelta
+from decimal import Decimal
+import httpx
+import pytest
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.urls import reverse
+from django.utils import timezone
+from openai import DefaultHttpxClient, OpenAI
+from planner.models import LLMCall
+from planner.services.llm_client import reset_llm_client
+from planner.services.llm_telemetry import call_origin, estimate_cost, on_request, on_response, record_llm_call, rollup_llm_calls
+from planner.services.recipe_generator import generate_recipe
+
+
+@pytest.fixture
+def user():
+    return User.objects.create_user(username='testuser', password='testpass')
+
+@pytest.fixture
+def fake_llm(settings):
+    settings.LLM_PROVIDER = 'local'
+    settings.LOCAL_LLM = {**settings.LOCAL_LLM, 'LATENCY': 0, 'JITTER': 0, 'ERROR_RATE': 0}
+    reset_llm_client()
+    yield
+    reset_llm_client()
+
+
+def test_estimate_cost():
+    assert estimate_cost('gpt-4o', prompt_tokens=1_000_000, completion_tokens=100_000) == Decimal('3.50')
+    assert estimate_cost('dall-e-3', images=2, quality='hd') == Decimal('0.160')
+    assert estimate_cost('unknown-model', prompt_tokens=1000) == 0
+
+
+@pytest.mark.django_db
+class TestRecordLLMCall:
+    def test_recipe_calls_record_tokens_cost_and_cache_status(self, user, fake_llm):
+        with call_origin('worker:recipe', user):
+            generate_recipe(dish_idea='vegetable curry', servings=2)
+            generate_recipe(dish_idea='vegetable curry', servings=2)
+
+        miss, hit = LLMCall.objects.order_by('id')
+        assert (miss.operation, miss.model, miss.status, miss.cache_status) == ('recipe', 'gpt-4o', 'ok', 'miss')
+        assert miss.prompt_tokens > 0 and miss.completion_tokens > 0
+        assert miss.cost_usd == estimate_cost('gpt-4o', miss.prompt_tokens, miss.completion_tokens)
+        assert (miss.view, miss.user) == ('worker:recipe', user)
+        assert (hit.cache_status, hit.prompt_tokens, hit.cost_usd) == ('hit', 0, 0)
+
+    def test_errors_are_recorded_and_reraised(self):
+        with pytest.raises(RuntimeError):
+            with record_llm_call('recipe', model='gpt-4o') as call:
+                call.cache_status = 'miss'
+                raise RuntimeError("upstream timeout")
+
+        call = LLMCall.objects.get()
+        assert call.status == 'error'
+        assert call.error == "RuntimeError: upstream timeout"
+
+    def test_telemetry_failures_are_logged_without_failing_the_call(self, caplog):
+        with transaction.atomic():
+            with call_origin('worker:recipe', User(username='unsaved')):
+                with record_llm_call('recipe', model='gpt-4o') as call:
+                    call.cache_status = 'miss'
+            # The caller's transaction is still usable
+            User.objects.create_user(username='after')
+
+        assert not LLMCall.objects.exists()
+        assert "Error recording LLM call" in caplog.text
+
+    def test_http_hooks_count_retries(self):
+        responses = iter([
+            httpx.Response(500, headers={'retry-after-ms': '1'}, json={'error': {'message': 'busy'}}),
+            httpx.Response(200, json={'data': [{'url': 'https://example.com/image.png'}], 'created': 0}),
+        ])
+        client = OpenAI(
+            api_key='test',
+            base_url='http://llm.test/v1',
+            max_retries=2,
+            http_client=DefaultHttpxClient(
+                transport=httpx.MockTransport(lambda request: next(responses)),
+                event_hooks={'request': [on_request], 'response': [on_response]},
+            ),
+        )
+        with record_llm_call('image', model='dall-e-3') as call:
+            client.images.generate(model='dall-e-3', prompt='soup')
+
+        assert LLMCall.objects.get().retries == 1
+
+    def test_middleware_records_originating_view_and_user(self, user, fake_llm, client):
+        client.force_login(user)
+        response = client.get(reverse('action_stream_recipe'), {'dish_idea': 'soup', 'servings': 2, 'units': 'metric'})
+        b''.join(response.streaming_content)
+
+        call = LLMCall.objects.get()
+        assert (call.operation, call.view, call.user) == ('recipe_stream', 'action_stream_recipe', user)
+
+
+@pytest.mark.django_db
+def test_daily_rollup():
+    today = timezone.localdate()
+    for duration_ms in range(10, 210, 10): # 20 calls
+        LLMCall.objects.create(operation='recipe', model='gpt-4o', view='action_generate_recipe', duration_ms=duration_ms,
+                               prompt_tokens=100, completion_tokens=50, cost_usd=Decimal('0.001'))
+    LLMCall.objects.create(operation='recipe', model='gpt-4o', view='action_generate_recipe', duration_ms=5, cache_status='hit')
+    LLMCall.objects.create(operation='image', model='dall-e-3', duration_ms=9000, status='error')
+    LLMCall.objects.create(operation='image', model='dall-e-3', duration_ms=9000, created_at=timezone.now() - timedelta(days=2))
+
+    rows = {row.operation: row for row in rollup_llm_calls(today)}
+    assert rows['recipe'].calls == 21
+    assert rows['recipe'].cache_hits == 1
+    assert rows['recipe'].p95_duration_ms == 190 # 20th of 21 sorted durations
+    assert rows['recipe'].prompt_tokens == 2000
+    assert rows['recipe'].cost_usd == Decimal('0.02')
+    assert (rows['image'].calls, rows['image'].errors) == (1, 1)
+
+    # Re-running replaces the day's rows
+    rollup_llm_calls(today)
+    assert len(rollup_llm_calls(today)) == 2
@@ -0,0 +1,73 @@
+import threading
+import openai
+import pytest
+from planner.services.local_llm import LocalLLMClient, LocalLLMEngine, make_local_llm_server
+from planner.services.recipe_generator import Recipe
+from planner.services.recipe_parser import parse_recipe_string
+from planner.services.shopping_list_generator import ShoppingItem, ShoppingListRows, to_wire_rows
+
+MESSAGES = [
+    {"role": "system", "content": "You are an experienced home cook."},
+    {"role": "user", "content": "Dish idea: mushroom risotto\nServings: 3"},
+]
+
+@pytest.fixture
+def engine():
+    return LocalLLMEngine(latency=0, prompt_tokens=120, completion_tokens=450)
+
+
+class TestLocalLLM:
+    def test_recipe_responses_are_deterministic_and_parseable(self, engine):
+        client = LocalLLMClient(engine)
+        first = client.beta.chat.completions.parse(model="gpt-4o", response_format=Recipe, messages=MESSAGES)
+        second = client.beta.chat.completions.parse(model="gpt-4o", response_format=Recipe, messages=MESSAGES)
+
+        content = first.choices[0].message.content
+        assert content == second.choices[0].message.content
+        recipe = parse_recipe_string(content)
+        assert recipe.title == "Mushroom Risotto"
+        assert recipe.servings == 3
+        assert first.usage.prompt_tokens == 120
+        assert first.usage.completion_tokens == 450
+
+    def test_shopping_list_echoes_items_with_categories(self, engine):
+        items = [
+            ShoppingItem(name="Carrots, julienned", quantity="2", category="TBD", recipe_id=7),
+            ShoppingItem(name="Salt", quantity="1 tsp", category="TBD", recipe_id=7),
+        ]
+        messages = [{"role": "user", "content": f"Shopping list:\n{to_wire_rows(items)}"}]
+        completion = LocalLLMClient(engine).beta.chat.completions.parse(model="gpt-4o", response_format=ShoppingListRows, messages=messages)
+
+        assert completion.choices[0].message.parsed.rows == ["1|Carrots|2|fruit_veg"]
+
+    def test_injected_errors_use_openai_exception_types(self):
+        client = LocalLLMClient(LocalLLMEngine(latency=0, error_rate=1.0))
+        with pytest.raises((openai.RateLimitError, openai.InternalServerError)):
+            client.beta.chat.completions.parse(model="gpt-4o", response_format=Recipe, messages=MESSAGES)
+
+    def test_http_server_works_with_real_openai_client(self, engine):
+        server = make_local_llm_server(engine, port=0)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            client = openai.OpenAI(api_key="local", base_url=f"http://127.0.0.1:{server.server_port}/v1", max_retries=0)
+            completion = client.beta.chat.completions.parse(model="gpt-4o", response_format=Recipe, messages=MESSAGES)
+            assert completion.choices[0].message.parsed.title == "Mushroom Risotto"
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    def test_http_server_streams_to_real_openai_client(self, engine):
+        server = make_local_llm_server(engine, port=0)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            client = openai.OpenAI(api_key="local", base_url=f"http://127.0.0.1:{server.server_port}/v1", max_retries=0)
+            with client.beta.chat.completions.stream(model="gpt-4o", response_format=Recipe, messages=MESSAGES) as stream:
+                deltas = [event.delta for event in stream if event.type == 'content.delta']
+                completion = stream.get_final_completion()
+            assert len(deltas) > 1
+            assert completion.choices[0].message.parsed.title == "Mushroom Risotto"
+        finally:
+            server.shutdown()
+            server.server_close()
@@ -1,7 +1,8 @@
 import pytest
 from django.contrib.auth.models import User
 from pathlib import Path
-from planner.services.recipe_parser import RecipeParser, parse_recipe_file, parse_recipe_string
+from planner.benchmarks.samples import sample_recipe_strings
+from planner.services.recipe_parser import RecipeParser, parse_recipe_file, parse_recipe_list_string, parse_recipe_string
 import json
 
 @pytest.fixture
@@ -135,4 +136,36 @@ class TestRecipeParser:
         # Test single quotes instead of double quotes
         single_quotes = "{'title': 'Test Recipe'}"
         with pytest.raises(json.JSONDecodeError, match="Expecting property name enclosed in double quotes"):
-            parse_recipe_string(single_quotes)
\ No newline at end of file
+            parse_recipe_string(single_quotes)
+
+
+class TestFastParser:
+    def test_matches_hand_validation_on_samples(self):
+        for json_str in sample_recipe_strings():
+            assert parse_recipe_string(json_str) == RecipeParser(json.loads(json_str)).validate()
+
+    def test_accepts_bytes(self):
+        json_str = sample_recipe_strings()[0]
+        assert parse_recipe_string(json_str.encode()) == parse_recipe_string(json_str)
+
+    def test_keeps_detailed_error_messages(self):
+        bad_ingredient = {
+            "title": "Bad Recipe",
+            "servings": 4,
+            "description": "A test recipe",
+            "ingredients": [{"quantity": "1 cup"}],
+            "instructions": [],
+        }
+        with pytest.raises(ValueError, match="Invalid ingredient format: {'quantity': '1 cup'}"):
+            parse_recipe_string(json.dumps(bad_ingredient))
+
+        with pytest.raises(ValueError, match="Missing required fields: description, ingredients, instructions"):
+            parse_recipe_string('{"title": "Bad Recipe", "servings": 4}')
+
+    def test_parse_list(self):
+        json_strs = sample_recipe_strings()[:3]
+        recipes = parse_recipe_list_string(f"[{','.join(json_strs)}]")
+        assert recipes == [parse_recipe_string(s) for s in json_strs]
+
+        with pytest.raises(ValueError, match="Recipe 1: Missing required fields"):
+            parse_recipe_list_string(f'[{json_strs[0]}, {{"title": "Bad Recipe"}}]')
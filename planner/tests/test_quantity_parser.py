@@ -0,0 +1,91 @@
+import pytest
+from fractions import Fraction
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from planner.models import Ingredient as DBIngredient
+from planner.services.quantity_parser import ParsedQuantity, parse_quantity
+from planner.services.recipe_generator import Ingredient, InstructionSection, InstructionStep, Recipe
+from planner.services.recipe_repository import backfill_parsed_quantities, save_recipe_to_db
+
+@pytest.mark.parametrize('quantity, expected', [
+    ('2', (Fraction(2), '', '')),
+    ('100g', (Fraction(100), 'g', '')),
+    ('500 grams, peeled and cubed', (Fraction(500), 'g', 'peeled and cubed')),
+    ('1.5 litres', (Fraction(3, 2), 'l', '')),
+    ('1/2 tsp', (Fraction(1, 2), 'tsp', '')),
+    ('1 1/2 cups, sifted', (Fraction(3, 2), 'cup', 'sifted')),
+    ('1½ cups', (Fraction(3, 2), 'cup', '')),
+    ('¾ cup', (Fraction(3, 4), 'cup', '')),
+    ('3 Tbsp.', (Fraction(3), 'tbsp', '')),
+    ('2 cloves', (Fraction(2), 'clove', '')),
+    ('1 fl oz', (Fraction(1), 'fl oz', '')),
+    ('4 large', (Fraction(4), '', 'large')), # Sizes are not units
+    ('1 liter', (Fraction(1), 'l', '')),
+    ('1, beaten (for glazing)', (Fraction(1), '', 'beaten (for glazing)')),
+    ('120 ml (1/2 cup)', (Fraction(120), 'ml', '(1/2 cup)')),
+    ('A pinch', (Fraction(1), 'pinch', '')),
+    # Not a single amount
+    ('to taste', (None, '', 'to taste')),
+    ('2-3 tablespoons', (None, '', '2-3 tablespoons')),
+    ('1.5-2 cups', (None, '', '1.5-2 cups')),
+    ('2 to 3 tbsp', (None, '', '2 to 3 tbsp')),
+    ('4 x 200g each', (None, '', '4 x 200g each')),
+    ('an apple', (None, '', 'an apple')),
+    ('1/0 cup', (None, '', '1/0 cup')),
+])
+def test_parse_quantity(quantity, expected):
+    assert parse_quantity(quantity) == ParsedQuantity(*expected)
+
+
+@pytest.mark.django_db
+class TestStructuredIngredients:
+    @pytest.fixture
+    def db_recipe(self):
+        user = User.objects.create_user(username='testuser', password='testpass')
+        recipe = Recipe(
+            title="Pancakes",
+            description="Fluffy",
+            servings=4,
+            ingredients=[
+                Ingredient(name="flour", quantity="1 1/2 cups, sifted"),
+                Ingredient(name="eggs", quantity="2 large"),
+                Ingredient(name="salt", quantity="to taste"),
+            ],
+            instructions=[InstructionSection(section_title="Cook", steps=[InstructionStep(text="Fry")])],
+        )
+        return save_recipe_to_db(recipe, user)
+
+    def test_repository_parses_quantities(self, db_recipe):
+        flour, eggs, salt = db_recipe.ingredients.order_by('order')
+
+        assert (flour.amount_numerator, flour.amount_denominator, flour.unit, flour.modifier) == (3, 2, 'cup', 'sifted')
+        assert (eggs.amount, eggs.unit, eggs.modifier) == (Fraction(2), '', 'large')
+        assert (salt.amount, salt.unit, salt.modifier) == (None, '', 'to taste')
+
+    def test_backfill_command(self, db_recipe):
+        DBIngredient.objects.update(amount_numerator=None, amount_denominator=None, unit='', modifier='')
+
+        call_command('backfill_ingredient_quantities', batch_size=2)
+
+        flour, eggs, salt = db_recipe.ingredients.order_by('order')
+        assert (flour.amount, flour.unit, flour.modifier) == (Fraction(3, 2), 'cup', 'sifted')
+        assert (eggs.amount, eggs.modifier) == (Fraction(2), 'large')
+        assert salt.modifier == 'to taste'
+
+    def test_amounts_fit_the_columns(self, db_recipe):
+        DBIngredient.objects.filter(recipe=db_recipe, order=1).update(quantity='0.3333333333333 cups')
+        DBIngredient.objects.filter(recipe=db_recipe, order=2).update(quantity='99999999999 g')
+
+        backfill_parsed_quantities(db_recipe.ingredients.all())
+
+        flour, eggs, _ = db_recipe.ingredients.order_by('order')
+        assert (flour.amount, flour.unit) == (Fraction(1, 3), 'cup')
+        assert (eggs.amount, eggs.unit) == (None, 'g')
+
+    def test_edited_quantities_are_reparsed(self, db_recipe):
+        DBIngredient.objects.filter(recipe=db_recipe, order=1).update(quantity='200 g')
+
+        backfill_parsed_quantities(db_recipe.ingredients.all())
+
+        flour = db_recipe.ingredients.get(order=1)
+        assert (flour.amount, flour.unit, flour.modifier) == (Fraction(200), 'g', '')
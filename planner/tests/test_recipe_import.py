@@ -0,0 +1,104 @@
+import pytest
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from planner.models import Recipe as DBRecipe
+from planner.services.recipe_generator import Ingredient, InstructionSection, InstructionStep, Recipe
+from planner.services.recipe_import import ParsedFile, import_recipe_files, import_recipes, parse_files
+
+pytestmark = pytest.mark.django_db
+
+@pytest.fixture
+def user():
+    return User.objects.create_user(username='admin', password='testpass')
+
+def make_recipe(title: str, servings: int = 4) -> Recipe:
+    return Recipe(
+        title=title,
+        description=f"{title} description",
+        servings=servings,
+        ingredients=[Ingredient(name="Flour", quantity="200 g")],
+        instructions=[InstructionSection(section_title="Bake", steps=[InstructionStep(text="Bake it")])],
+    )
+
+@pytest.fixture
+def recipe_dir(tmp_path):
+    for i in range(5):
+        (tmp_path / f"recipe_{i}.json").write_text(make_recipe(f"Recipe {i}").model_dump_json())
+    (tmp_path / "broken.json").write_text('{"title": "Broken"')
+    return tmp_path
+
+class TestRecipeImport:
+    def test_parse_files_in_pool(self, recipe_dir):
+        parsed = parse_files(sorted(recipe_dir.glob('*.json')), workers=2)
+
+        assert [p.path.name for p in parsed][0] == 'broken.json'
+        assert parsed[0].recipe is None and parsed[0].error
+        assert [p.recipe.title for p in parsed[1:]] == [f"Recipe {i}" for i in range(5)]
+
+    def test_import_skips_existing_titles(self, recipe_dir, user):
+        paths = sorted(recipe_dir.glob('*.json'))
+        first = import_recipe_files(paths, user, workers=1, chunk_size=2)
+        second = import_recipe_files(paths, user, workers=1)
+
+        assert (first.created, first.skipped, len(first.failed)) == (5, 0, 1)
+        assert (second.created, second.skipped) == (0, 5)
+        assert DBRecipe.objects.count() == 5
+        assert DBRecipe.objects.get(title="Recipe 3").ingredients.get().name == "Flour"
+
+    def test_duplicate_titles_in_one_import(self, user):
+        result = import_recipes([ParsedFile(None, make_recipe("Same")), ParsedFile(None, make_recipe("Same", 2))], user)
+
+        assert (result.created, result.skipped) == (1, 1)
+        assert DBRecipe.objects.get().servings == 4
+
+    def test_update_overwrites_existing(self, recipe_dir, user):
+        paths = sorted(recipe_dir.glob('*.json'))
+        import_recipe_files(paths, user, workers=1)
+        (recipe_dir / "recipe_0.json").write_text(make_recipe("Recipe 0", servings=8).model_dump_json())
+        original = DBRecipe.objects.get(title="Recipe 0")
+
+        result = import_recipe_files(paths, user, workers=1, update=True)
+
+        assert (result.created, result.updated, result.unchanged, result.skipped) == (0, 1, 4, 0)
+        updated = DBRecipe.objects.get(title="Recipe 0")
+        assert updated.pk == original.pk
+        assert updated.servings == 8
+        assert updated.ingredients.count() == 1
+        assert updated.instruction_sections.get().steps.count() == 1
+
+    def test_update_applies_description_and_instruction_edits(self, recipe_dir, user):
+        paths = sorted(recipe_dir.glob('*.json'))
+        import_recipe_files(paths, user, workers=1)
+        described = make_recipe("Recipe 0")
+        described.description = "Now with a better description"
+        (recipe_dir / "recipe_0.json").write_text(described.model_dump_json())
+        instructed = make_recipe("Recipe 1")
+        instructed.instructions[0].steps.append(InstructionStep(text="Let it cool"))
+        (recipe_dir / "recipe_1.json").write_text(instructed.model_dump_json())
+
+        result = import_recipe_files(paths, user, workers=1, update=True)
+
+        assert (result.updated, result.unchanged) == (2, 3)
+        assert DBRecipe.objects.get(title="Recipe 0").description == "Now with a better description"
+        assert DBRecipe.objects.get(title="Recipe 1").instruction_sections.get().steps.count() == 2
+
+    def test_dry_run_writes_nothing(self, recipe_dir, user):
+        result = import_recipe_files(sorted(recipe_dir.glob('*.json')), user, workers=1, dry_run=True)
+
+        assert result.created == 5
+        assert not DBRecipe.objects.exists()
+
+    def test_constant_queries(self, user, django_assert_max_num_queries):
+        parsed = [ParsedFile(None, make_recipe(f"Recipe {i}")) for i in range(50)]
+
+        # Existing titles, then one transaction of bulk inserts
+        with django_assert_max_num_queries(7):
+            import_recipes(parsed, user)
+
+    def test_command(self, recipe_dir, user, capsys):
+        call_command('save_recipes_to_db', dir=str(recipe_dir), workers=1)
+
+        out = capsys.readouterr()
+        assert "5 created, 0 updated, 0 unchanged, 0 skipped as existing, 1 failed" in out.out
+        assert "files/s" in out.out
+        assert "broken.json" in out.err
@@ -1,8 +1,10 @@
 import pytest
 from django.contrib.auth.models import User
 from pathlib import Path
+from planner.models import Recipe as DBRecipe
+from planner.services.recipe_generator import Ingredient, InstructionSection, InstructionStep, Recipe
 from planner.services.recipe_parser import parse_recipe_file
-from planner.services.recipe_repository import save_recipe_to_db
+from planner.services.recipe_repository import save_recipe_to_db, save_recipes_to_db
 
 pytestmark = pytest.mark.django_db
 
@@ -16,6 +18,21 @@ def recipe_path():
         return Path(__file__).parent.parent / 'static' / 'planner' / 'recipes' / recipe_file
     return _get_recipe_path
 
+def make_recipe(title: str, sections: int = 2) -> Recipe:
+    return Recipe(
+        title=title,
+        description=f"{title} description",
+        servings=4,
+        ingredients=[Ingredient(name=f"Ingredient {i}", quantity=f"{i}00 g") for i in range(1, 6)],
+        instructions=[
+            InstructionSection(
+                section_title=f"Section {i}",
+                steps=[InstructionStep(text=f"Step {i}.{j}") for j in range(1, 4)],
+            )
+            for i in range(1, sections + 1)
+        ],
+    )
+
 class TestRecipeRepository:
     def test_save_recipe_to_db(self, recipe_path, user, status='draft'):
         # First parse the recipe
@@ -48,3 +65,35 @@ class TestRecipeRepository:
 
         # Test the inherited status is the same as the recipe status
         assert steps.get(order=3).section.recipe.status == status
+
+    def test_save_recipes_to_db(self, user):
+        recipes = [make_recipe(f"Recipe {i}", sections=i) for i in range(1, 4)]
+
+        db_recipes = save_recipes_to_db(recipes, user, 'draft', generation_keys=['a', 'b', 'c'])
+
+        assert [r.title for r in db_recipes] == ["Recipe 1", "Recipe 2", "Recipe 3"]
+        assert [r.generation_key for r in db_recipes] == ['a', 'b', 'c']
+        for recipe, db_recipe in zip(recipes, db_recipes):
+            db_recipe.refresh_from_db()
+            assert db_recipe.status == 'draft'
+            assert [i.name for i in db_recipe.ingredients.order_by('order')] == [i.name for i in recipe.ingredients]
+            sections = db_recipe.instruction_sections.order_by('order')
+            assert [s.title for s in sections] == [s.section_title for s in recipe.instructions]
+            for section, db_section in zip(recipe.instructions, sections):
+                assert [s.text for s in db_section.steps.order_by('order')] == [s.text for s in section.steps]
+
+    def test_save_recipes_uses_constant_number_of_queries(self, user, django_assert_max_num_queries):
+        # One INSERT per table, plus the transaction's savepoint and its release
+        with django_assert_max_num_queries(6):
+            save_recipe_to_db(make_recipe("Single"), user)
+        with django_assert_max_num_queries(6):
+            save_recipes_to_db([make_recipe(f"Recipe {i}") for i in range(20)], user)
+
+    def test_save_recipes_is_atomic(self, user):
+        broken = make_recipe("Broken")
+        broken.instructions[0].steps[0].text = None # Violates NOT NULL on the last insert
+
+        with pytest.raises(Exception):
+            save_recipes_to_db([make_recipe("Fine"), broken], user)
+
+        assert not DBRecipe.objects.exists()
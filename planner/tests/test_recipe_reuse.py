@@ -0,0 +1,81 @@
+import pytest
+from django.contrib.auth.models import User
+from django.urls import reverse
+from planner.models import GenerationJob, Recipe as DBRecipe
+from planner.services.recipe_generator import Ingredient, InstructionSection, InstructionStep, Recipe
+from planner.services.recipe_repository import save_recipe_to_db
+from planner.services.recipe_reuse import clone_scaled_recipe, find_reusable_recipe, recipe_generation_key
+
+FORM_DATA = {'dish_idea': 'Tomato soup', 'notes': '', 'dietary_preferences': '', 'servings': 2, 'units': 'metric'}
+
+
+@pytest.fixture
+def user():
+    return User.objects.create_user(username='testuser', password='testpass')
+
+@pytest.fixture
+def other_user():
+    return User.objects.create_user(username='otheruser', password='testpass')
+
+def save_soup(user, status='draft', servings=4):
+    recipe = Recipe(
+        title="Tomato Soup",
+        description="A quick weeknight soup.",
+        servings=servings,
+        ingredients=[
+            Ingredient(name="Tomatoes, chopped", quantity="800 g"),
+            Ingredient(name="Onion", quantity="1 1/2"),
+            Ingredient(name="Cream", quantity="2 tbsp"),
+        ],
+        instructions=[InstructionSection(section_title="Cook", steps=[InstructionStep(text="Simmer."), InstructionStep(text="Blend.")])],
+    )
+    return save_recipe_to_db(recipe, user=user, status=status, generation_key=recipe_generation_key('tomato  soup', '', '', 'metric'))
+
+
+@pytest.mark.django_db
+class TestRecipeReuse:
+    def test_finds_own_or_published_recipes_with_other_servings(self, user, other_user):
+        key = recipe_generation_key('Tomato soup')
+        assert find_reusable_recipe(user, key, servings=2) is None
+
+        others_draft = save_soup(other_user, status='draft')
+        assert find_reusable_recipe(user, key, servings=2) is None
+
+        published = save_soup(other_user, status='published')
+        assert find_reusable_recipe(user, key, servings=2) == published
+        assert find_reusable_recipe(user, key, servings=4) is None # Same servings: nothing to rescale
+        assert find_reusable_recipe(user, recipe_generation_key('Tomato soup', notes='spicy'), servings=2) is None
+        assert find_reusable_recipe(other_user, key, servings=2) in (others_draft, published)
+
+    def test_clone_rescales_ingredients(self, user):
+        original = save_soup(user, servings=4)
+        clone = clone_scaled_recipe(original, servings=2, user=user)
+
+        assert clone.id != original.id
+        assert (clone.servings, clone.status, clone.generation_key) == (2, 'draft', original.generation_key)
+        assert list(clone.ingredients.values_list('name', 'quantity')) == [
+            ("Tomatoes, chopped", "400 g"),
+            ("Onion", "3/4"),
+            ("Cream", "1 tbsp"),
+        ]
+        assert [step.text for step in clone.instruction_sections.get().steps.all()] == ["Simmer.", "Blend."]
+        assert user in clone.saved_to_my_recipes_by.all()
+
+    def test_view_reuses_instead_of_queueing(self, user, client):
+        client.force_login(user)
+        save_soup(user, servings=4)
+
+        response = client.post(reverse('action_generate_recipe'), FORM_DATA)
+
+        clone = DBRecipe.objects.get(servings=2)
+        assert response['HX-Redirect'] == clone.get_absolute_url()
+        assert not GenerationJob.objects.exists()
+
+    def test_view_can_force_a_new_generation(self, user, client):
+        client.force_login(user)
+        save_soup(user, servings=4)
+
+        client.post(reverse('action_generate_recipe'), {**FORM_DATA, 'force_new': 'on'})
+
+        assert GenerationJob.objects.get().payload['use_cache'] is False
+        assert DBRecipe.objects.count() == 1
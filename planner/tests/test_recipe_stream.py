@@ -0,0 +1,168 @@
+import time
+from contextlib import contextmanager
+import pytest
+from django.contrib.auth.models import User
+from django.urls import reverse
+from planner import views
+from planner.models import LLMCacheEntry, LLMCall, Recipe as RecipeModel
+from planner.services.llm_client import reset_llm_client
+from planner.services.recipe_generator import Ingredient, InstructionSection, InstructionStep, Recipe
+from planner.services.recipe_stream import RecipeStreamAssembler, stream_recipe
+
+FAKE_LLM_LATENCY = 1.0 # seconds per generation
+
+RECIPE = Recipe(
+    title="Tomato Soup",
+    description="A quick weeknight soup.",
+    servings=12,
+    ingredients=[
+        Ingredient(name="Tomatoes, chopped", quantity="800 g"),
+        Ingredient(name="Onion, diced", quantity="1"),
+    ],
+    instructions=[
+        InstructionSection(section_title="Prep", steps=[InstructionStep(text="Chop the vegetables.")]),
+        InstructionSection(section_title="Cook", steps=[InstructionStep(text="Simmer for 20 minutes."), InstructionStep(text="Blend.")]),
+    ],
+)
+
+
+@pytest.fixture
+def fake_llm(settings):
+    settings.LLM_PROVIDER = 'local'
+    settings.LOCAL_LLM = {**settings.LOCAL_LLM, 'LATENCY': FAKE_LLM_LATENCY, 'JITTER': 0, 'ERROR_RATE': 0}
+    reset_llm_client()
+    yield
+    reset_llm_client()
+
+
+class TestRecipeStreamAssembler:
+    def feed_in_chunks(self, content, chunk_size):
+        assembler = RecipeStreamAssembler()
+        events = []
+        for i in range(0, len(content), chunk_size):
+            events += [(event, i + chunk_size) for event in assembler.feed(content[i:i + chunk_size])]
+        return assembler, events
+
+    def test_events_are_emitted_in_order_once_complete(self):
+        content = RECIPE.model_dump_json()
+        assembler, events = self.feed_in_chunks(content, chunk_size=7)
+        events += [(event, len(content)) for event in assembler.finish()]
+
+        assert [event.name for event, _ in events] == [
+            'title', 'description', 'servings', 'ingredient', 'ingredient', 'section', 'section', 'complete',
+        ]
+        emitted = {event.name: event.data for event, _ in events}
+        assert emitted['title'] == "Tomato Soup"
+        assert emitted['servings'] == 12 # Not the partial "1"
+        assert emitted['complete'] == RECIPE
+
+        # Title arrives while the rest of the response is still being written
+        title_position = next(position for event, position in events if event.name == 'title')
+        assert title_position < content.index('"description"') + 7
+
+    def test_sections_wait_for_their_last_step(self):
+        content = RECIPE.model_dump_json()
+        assembler, events = self.feed_in_chunks(content[:content.index('Blend')], chunk_size=5)
+        assert [event.name for event, _ in events].count('section') == 1
+
+        finish_events = assembler.feed(content[content.index('Blend'):]) + assembler.finish()
+        sections = [event.data for event in finish_events if event.name == 'section']
+        assert [step.text for step in sections[0].steps] == ["Simmer for 20 minutes.", "Blend."]
+
+
+@pytest.mark.django_db
+class TestStreamRecipe:
+    def test_first_content_arrives_well_before_full_response(self, fake_llm):
+        started = time.perf_counter()
+        first_event_at = None
+        events = []
+        for event in stream_recipe(dish_idea='vegetable curry', servings=2):
+            first_event_at = first_event_at or time.perf_counter() - started
+            events.append(event)
+        total = time.perf_counter() - started
+
+        assert events[0].name == 'title'
+        assert events[-1].name == 'complete'
+        assert events[-1].data.title == 'Vegetable Curry'
+        assert first_event_at < total / 2
+
+    def test_streamed_response_is_cached(self, fake_llm):
+        list(stream_recipe(dish_idea='vegetable curry', servings=2))
+        assert LLMCacheEntry.objects.filter(namespace='recipe').count() == 1
+
+        started = time.perf_counter()
+        events = list(stream_recipe(dish_idea='Vegetable curry', servings=2))
+        assert time.perf_counter() - started < FAKE_LLM_LATENCY / 2
+        assert events[-1].name == 'complete'
+
+    def test_stream_view_saves_draft_and_sends_done_event(self, fake_llm, client):
+        user = User.objects.create_user(username='testuser', password='testpass')
+        client.force_login(user)
+        response = client.get(reverse('action_stream_recipe'), {
+            'dish_idea': 'vegetable curry',
+            'servings': 2,
+            'units': 'metric',
+        })
+        assert response['Content-Type'] == 'text/event-stream'
+        body = b''.join(response.streaming_content).decode()
+
+        assert body.index('event: title') < body.index('event: ingredient') < body.index('event: section') < body.index('event: done')
+        recipe = RecipeModel.objects.get()
+        assert recipe.status == 'draft'
+        assert user in recipe.saved_to_my_recipes_by.all()
+        assert f"event: done\ndata: {recipe.get_absolute_url()}" in body
+
+    def test_repeated_stream_reuses_the_draft(self, fake_llm, client, settings):
+        settings.LOCAL_LLM = {**settings.LOCAL_LLM, 'LATENCY': 0}
+        user = User.objects.create_user(username='testuser', password='testpass')
+        client.force_login(user)
+        params = {'dish_idea': 'vegetable curry', 'servings': 2, 'units': 'metric'}
+
+        # As after a browser reconnect
+        bodies = [b''.join(client.get(reverse('action_stream_recipe'), params).streaming_content).decode() for _ in range(2)]
+
+        recipe = RecipeModel.objects.get()
+        assert all(body.startswith("retry: ") for body in bodies)
+        assert all(f"event: done\ndata: {recipe.get_absolute_url()}" in body for body in bodies)
+
+    def test_forced_stream_skips_the_cache_and_reconnects_to_its_draft(self, fake_llm, client, settings):
+        settings.LOCAL_LLM = {**settings.LOCAL_LLM, 'LATENCY': 0}
+        client.force_login(User.objects.create_user(username='testuser', password='testpass'))
+        params = {'dish_idea': 'vegetable curry', 'servings': 2, 'units': 'metric'}
+        b''.join(client.get(reverse('action_stream_recipe'), params).streaming_content)
+
+        # The second forced request is a browser reconnect
+        forced = [b''.join(client.get(reverse('action_stream_recipe'), {**params, 'force_new': True}).streaming_content).decode() for _ in range(2)]
+
+        assert LLMCall.objects.filter(operation='recipe_stream').count() == 2
+        first, forced_recipe = RecipeModel.objects.order_by('id')
+        assert "event: title" in forced[0] and "event: title" not in forced[1]
+        assert all(f"event: done\ndata: {forced_recipe.get_absolute_url()}" in body for body in forced)
+
+    def test_stream_view_reports_failures_as_failed_events(self, fake_llm, client, settings):
+        # Not 'error', which EventSource also fires on a dropped connection it will retry
+        settings.LOCAL_LLM = {**settings.LOCAL_LLM, 'LATENCY': 0, 'ERROR_RATE': 1.0}
+        settings.HTTP_MAX_RETRIES = 0
+        reset_llm_client()
+        client.force_login(User.objects.create_user(username='testuser', password='testpass'))
+
+        response = client.get(reverse('action_stream_recipe'), {'dish_idea': 'vegetable curry', 'servings': 2, 'units': 'metric'})
+        body = b''.join(response.streaming_content).decode()
+
+        assert "event: failed\n" in body
+        assert "event: error" not in body
+        assert not RecipeModel.objects.exists()
+
+    def test_stream_waits_for_a_generation_in_flight_elsewhere(self, fake_llm, client, monkeypatch):
+        @contextmanager
+        def held_elsewhere(key):
+            yield False
+        monkeypatch.setattr(views, 'advisory_lock', held_elsewhere)
+        client.force_login(User.objects.create_user(username='testuser', password='testpass'))
+
+        response = client.get(reverse('action_stream_recipe'), {'dish_idea': 'vegetable curry', 'servings': 2, 'units': 'metric'})
+        body = b''.join(response.streaming_content).decode()
+
+        # Just the retry interval: the browser reconnects later instead of starting a second generation
+        assert body.startswith("retry: ") and "event:" not in body
+        assert not RecipeModel.objects.exists()
@@ -0,0 +1,18 @@
+import pytest
+from planner.services.scale_recipe import scale_quantity
+
+
+@pytest.mark.parametrize('quantity, servings, expected', [
+    ("800 g", 2, "400 g"),
+    ("2 tbsp", 8, "4 tbsp"),
+    ("1 cup", 8, "2 cups"),
+    ("2 cups", 2, "1 cup"),
+    ("1 1/2 cups", 2, "3/4 cup"),
+    ("3 cloves", 2, "1 1/2 cloves"),
+    ("1/2", 8, "1"),
+    ("0.5 l", 8, "1 l"),
+    ("Pinch", 8, "Pinch"),
+])
+def test_scale_quantity(quantity, servings, expected):
+    new_quantity, _ = scale_quantity(quantity, "Item", original_servings=4, new_servings=servings)
+    assert new_quantity == expected
@@ -0,0 +1,105 @@
+import pytest
+from django.contrib.auth.models import User
+from planner.benchmarks.samples import sample_recipes
+from planner.models import MealGroup, MealPlan, MealPlanRecipe
+from planner.services.recipe_generator import Ingredient, InstructionSection, InstructionStep, Recipe
+from planner.services.recipe_repository import save_recipe_to_db
+from planner.services.scale_recipe import scale_quantity
+from planner.services.scaling_engine import compile_quantity, get_scaled_recipe_cache, scale_ingredients, scale_meal_plan, scale_recipe
+
+# Every quantity in the sample recipes, plus shapes the engine hands back to scale_quantity
+GOLDEN_QUANTITIES = sorted({ing['quantity'] for recipe in sample_recipes() for ing in recipe['ingredients']} | {
+    "1 1/2 cups", "3 cloves", "0.5 l", "Pinch", "1 Cup, packed", "2 3 cups", ".5 tsp", "1/2/3", "2 x 3 cups", "1  cup", "",
+})
+
+@pytest.mark.parametrize('original_servings, new_servings', [(4, 1), (4, 2), (4, 3), (4, 4), (4, 6), (4, 8), (2, 5), (6, 4), (3, 7)])
+def test_matches_scale_quantity_on_golden_corpus(original_servings, new_servings):
+    ingredients = [("Item", quantity) for quantity in GOLDEN_QUANTITIES]
+
+    scaled = scale_ingredients(ingredients, original_servings, new_servings)
+
+    expected = [scale_quantity(quantity, name, original_servings, new_servings) for name, quantity in ingredients]
+    assert [(s.quantity, s.name) for s in scaled] == expected
+
+def test_ambiguous_quantities_fall_back():
+    assert compile_quantity("2 3 cups") is None
+    assert compile_quantity(".5 tsp") is None
+    assert compile_quantity("1 1/2 cups, sifted") is not None
+
+
+@pytest.mark.django_db
+class TestScaleFromDatabase:
+    @pytest.fixture
+    def user(self):
+        user = User.objects.create_user(username='testuser', password='testpass')
+        # The recipes below are in US units, so pages show them as saved
+        user.preferences.preferred_units = 'imperial'
+        user.preferences.save()
+        return user
+
+    def save_recipe(self, user, title, quantities):
+        return save_recipe_to_db(Recipe(
+            title=title,
+            description="",
+            servings=4,
+            ingredients=[Ingredient(name=name, quantity=quantity) for name, quantity in quantities],
+            instructions=[InstructionSection(section_title="Cook", steps=[InstructionStep(text="Cook")])],
+        ), user)
+
+    def test_scale_recipe(self, user):
+        recipe = self.save_recipe(user, "Pancakes", [("flour", "200 g"), ("milk", "1 cup")])
+
+        assert [tuple(s) for s in scale_recipe(recipe, 8)] == [("flours", "400 g"), ("milks", "2 cups")]
+
+    def test_scales_from_parsed_columns(self, user):
+        recipe = self.save_recipe(user, "Pancakes", [("butter", "2 tablespoons, melted"), ("salt", "to taste")])
+
+        assert [tuple(s) for s in scale_recipe(recipe, 6)] == [("butters", "3 tbsp, melted"), ("salt", "to taste")]
+        # The stored amount is what is scaled, not the text
+        recipe.ingredients.filter(name="butter").update(amount_numerator=4)
+        assert scale_recipe(recipe, 6)[0].quantity == "6 tbsp, melted"
+
+    def test_scale_meal_plan_with_servings_override(self, user, django_assert_num_queries):
+        pancakes = self.save_recipe(user, "Pancakes", [("flour", "200 g")])
+        soup = self.save_recipe(user, "Soup", [("carrot", "2"), ("stock", "1 l")])
+        meal_plan = MealPlan.objects.create(name="Week", user=user)
+        group = MealGroup.objects.create(name="Monday", meal_plan=meal_plan)
+        breakfast = MealPlanRecipe.objects.create(meal_group=group, recipe=pancakes, order=1)
+        dinner = MealPlanRecipe.objects.create(meal_group=group, recipe=soup, order=2, servings=2)
+
+        with django_assert_num_queries(2):
+            scaled = scale_meal_plan(meal_plan)
+
+        assert [s.quantity for s in scaled[breakfast.id]] == ["200 g"]
+        assert [s.quantity for s in scaled[dinner.id]] == ["1", "1/2 l"]
+
+    def test_detail_view_scales_and_caches(self, user, client):
+        recipe = self.save_recipe(user, "Pancakes", [("eggs", "2 large"), ("milk", "1 cup")])
+        cache = get_scaled_recipe_cache()
+        cache.clear()
+        client.force_login(user)
+
+        response = client.get(recipe.get_absolute_url(), {'servings': 6})
+        assert response.status_code == 200
+        assert [tuple(i) for i in response.context['ingredients']] == [("eggs", "3 large"), ("milk", "1 1/2 cups")]
+        assert cache.misses == 1
+
+        # The servings picker swaps in just the ingredients and instructions, from the cache
+        response = client.get(recipe.get_absolute_url(), {'servings': 6}, HTTP_HX_REQUEST='true')
+        assert 'id="recipe-contents"' in response.content.decode()
+        assert "1 1/2 cups" in response.content.decode()
+        assert (cache.hits, cache.misses) == (1, 1)
+
+        # Saving the recipe invalidates its entries
+        recipe.save()
+        client.get(recipe.get_absolute_url(), {'servings': 6}, HTTP_HX_REQUEST='true')
+        assert cache.misses == 2
+
+    def test_detail_view_ignores_invalid_servings(self, user, client):
+        recipe = self.save_recipe(user, "Pancakes", [("milk", "1 cup")])
+        client.force_login(user)
+
+        for servings in ['abc', '0', '99']:
+            response = client.get(recipe.get_absolute_url(), {'servings': servings})
+            assert response.context['servings'] == 4
+            assert [i.quantity for i in response.context['ingredients']] == ["1 cup"]
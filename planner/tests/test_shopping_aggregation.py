@@ -0,0 +1,70 @@
+import pytest
+from fractions import Fraction
+from planner.benchmarks.samples import sample_recipes
+from planner.services.quantity_parser import ParsedQuantity
+from planner.services.shopping_aggregation import aggregate_items, canonical_name, sum_quantities
+from planner.services.shopping_list_generator import ShoppingItem, aggregate_shopping_list
+
+
+@pytest.mark.parametrize("name, expected", [
+    ("Onions", "onion"),
+    ("Onion, finely chopped", "onion"),
+    ("Fresh carrots (about 3), julienned", "carrot"),
+    ("Cherry tomatoes, halved", "cherry tomato"),
+    ("Berries", "berry"),
+    ("Hummus", "hummus"),
+])
+def test_canonical_name(name, expected):
+    assert canonical_name(name) == expected
+
+@pytest.mark.parametrize("quantities, expected", [
+    (["2", "1"], ["3"]),
+    (["200 g", "1 kg"], ["1.2 kg"]),
+    (["1 cup", "1/2 cup"], ["1 1/2 cups"]),
+    (["1 large, diced", "2 large"], ["3 large"]),
+    (["1 clove", "2 cloves"], ["3 cloves"]),
+    (["8 oz", "1 lb"], ["1 1/2 lb"]),
+    (["120 ml (about 4 limes)", "60 ml"], ["180 ml"]),
+    (["1 cup (240 ml)", "1 cup"], ["2 cups"]),
+    # Different units or sizes are left for the model
+    (["2 large", "1 small"], ["2 large", "1 small"]),
+    (["1 cup", "2 tbsp"], ["1 cup", "2 tbsp"]),
+    (["to taste", "to taste", "1 tsp"], ["to taste", "1 tsp"]),
+])
+def test_sum_quantities(quantities, expected):
+    assert sum_quantities(quantities) == expected
+
+def test_sum_quantities_from_parsed_columns():
+    # A quantity already parsed, e.g. from Ingredient's columns, is summed as parsed
+    parsed = {"1 heaped cup": ParsedQuantity(Fraction(5, 4), 'cup', '')}
+    assert sum_quantities(["1 heaped cup", "1 cup"], parsed) == ["2 1/4 cups"]
+
+def test_aggregate_items():
+    aggregated, dropped = aggregate_items([
+        ("Onion, chopped", "1", 1, "TBD"),
+        ("Salt", "to taste", 1, "TBD"),
+        ("Garlic cloves, minced", "2 cloves", 1, "TBD"),
+        ("Onions", "2", 2, "TBD"),
+        ("Garlic", "1 clove", 2, "TBD"),
+        ("Freshly ground black pepper", "to taste", 2, "TBD"),
+        ("Water", "1 l", 2, "TBD"),
+        ("Peppers", "2", 2, "TBD"),
+    ])
+    assert dropped == 3
+    assert [(item.name, item.quantity, item.recipe_id) for item in aggregated] == [
+        ("Onions", "3", None),
+        ("Garlic", "3 cloves", None),
+        ("Peppers", "2", 2),
+    ]
+
+def test_aggregation_reduces_prompt():
+    shopping_list = [
+        ShoppingItem(name=ing['name'], quantity=ing['quantity'], category='TBD', recipe_id=recipe_id)
+        for recipe_id, recipe in enumerate(sample_recipes()[:7], start=1)
+        for ing in recipe['ingredients']
+    ]
+    aggregated, report = aggregate_shopping_list(shopping_list)
+    assert report.items_in == len(shopping_list)
+    assert report.items_out == len(aggregated) < len(shopping_list) - report.dropped
+    assert report.prompt_tokens_after < report.prompt_tokens_before
+    assert not any(item.name.lower() in ('salt', 'water', 'olive oil') for item in aggregated)
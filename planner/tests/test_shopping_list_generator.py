@@ -0,0 +1,150 @@
+import time
+import pytest
+from django.contrib.auth.models import User
+from planner.models import LLMCall, MealGroup, MealPlan, MealPlanRecipe
+from planner.services.digest import update_ingredients_digests
+from planner.services.recipe_generator import Ingredient, InstructionSection, InstructionStep, Recipe
+from planner.services.recipe_repository import backfill_parsed_quantities, save_recipe_to_db
+from planner.services import shopping_list_generator
+from planner.services.shopping_list_generator import UNCATEGORIZED, ShoppingItem, chunk_items, from_wire_rows, generate_shopping_list, to_wire_rows, unify_categories
+from planner.services.shopping_list_repository import ShoppingListRepository
+
+
+class TestModelRequests:
+    def test_rows_map_back_to_the_items_sent(self):
+        sent = [
+            ShoppingItem(name="Carrots,  julienned", quantity="2", category='TBD', recipe_id=7),
+            ShoppingItem(name="Salt | pepper", quantity="to taste", category='TBD', recipe_id=None),
+            ShoppingItem(name="Lemon", quantity="1", category='TBD', recipe_id=8),
+        ]
+        assert to_wire_rows(sent) == "#|name|quantity\n1|Carrots, julienned|2\n2|Salt / pepper|to taste\n3|Lemon|1"
+
+        received = from_wire_rows(["1|Carrots|2|fruit_veg", "3 | Lemon zest | 1 | Snacks", "4|Extra|1|pantry", "garbled"], sent)
+        assert [(item.name, item.quantity, item.category, item.recipe_id) for item in received] == [
+            ("Carrots", "2", "Fruit & Vegetables", 7),
+            ("Salt | pepper", "to taste", UNCATEGORIZED, None),
+            ("Lemon zest", "1", "Snacks", 8),
+        ]
+
+    def test_items_left_out_by_the_model_are_kept(self):
+        sent = [
+            ShoppingItem(name="Beef", quantity="500 g", category=UNCATEGORIZED, recipe_id=7),
+            ShoppingItem(name="Water", quantity="1 l", category=UNCATEGORIZED, recipe_id=7),
+            ShoppingItem(name="Beef mince", quantity="250 g", category=UNCATEGORIZED, recipe_id=8),
+            ShoppingItem(name="Onion", quantity="1", category=UNCATEGORIZED, recipe_id=8),
+        ]
+
+        received = unify_categories(from_wire_rows(["4|Onion|1|fruit_veg", "1|Beef|500 g|meat_fish"], sent))
+
+        # Water was left out as asked; the beef mince is kept, uncategorized so its category is not learned
+        assert [(item.name, item.quantity, item.category, item.recipe_id) for item in received] == [
+            ("Beef", "500 g", "Meat & Fish", 7),
+            ("Beef mince", "250 g", UNCATEGORIZED, 8),
+            ("Onion", "1", "Fruit & Vegetables", 8),
+        ]
+
+
+    def test_chunks_agree_on_categories(self):
+        items = [
+            ShoppingItem(name=name, quantity="1", category=category, recipe_id=recipe_id)
+            for recipe_id, (name, category) in enumerate([("Onion", "Fruit & Vegetables"), ("Milk", "Dairy & Deli"), ("Onions", "Pantry")], start=1)
+        ]
+        assert [[item.recipe_id for item in chunk] for chunk in chunk_items(items, 2)] == [[1, 2], [3]]
+        assert [item.category for item in unify_categories(items)] == ["Fruit & Vegetables", "Dairy & Deli", "Fruit & Vegetables"]
+
+
+@pytest.mark.django_db(transaction=True) # Recipes missing from the cache are normalized in pool threads
+class TestGenerateShoppingList:
+    @pytest.fixture
+    def user(self, settings):
+        settings.LLM_PROVIDER = 'local'
+        settings.LOCAL_LLM = {**settings.LOCAL_LLM, 'LATENCY': 0, 'JITTER': 0}
+        return User.objects.create_user(username='testuser', password='testpass')
+
+    def save_recipe(self, user, title, ingredients):
+        return save_recipe_to_db(Recipe(
+            title=title,
+            description="",
+            servings=4,
+            ingredients=[Ingredient(name=name, quantity=quantity) for name, quantity in ingredients],
+            instructions=[InstructionSection(section_title="Cook", steps=[InstructionStep(text="Cook")])],
+        ), user)
+
+    def make_meal_plan(self, user, recipes):
+        meal_plan = MealPlan.objects.create(name="Week", user=user)
+        group = MealGroup.objects.create(name="Monday", meal_plan=meal_plan)
+        for order, (recipe, servings) in enumerate(recipes, start=1):
+            MealPlanRecipe.objects.create(meal_group=group, recipe=recipe, order=order, servings=servings)
+        return meal_plan
+
+    def model_calls(self):
+        return LLMCall.objects.filter(operation='shopping_list').count()
+
+    def test_lists_are_assembled_from_cached_recipes(self, user):
+        soup = self.save_recipe(user, "Soup", [("Onions, chopped", "2"), ("Chicken stock", "1 l"), ("Salt", "to taste")])
+        stew = self.save_recipe(user, "Stew", [("Onion", "1"), ("Beef", "500 g")])
+
+        generate_shopping_list(self.make_meal_plan(user, [(soup, None)]))
+        assert self.model_calls() == 1
+
+        # Only the new recipe is normalized; the soup is scaled from its cached items and merged locally
+        shopping_list = generate_shopping_list(self.make_meal_plan(user, [(soup, 8), (stew, None)]))
+        assert self.model_calls() == 2
+        assert [(item.name, item.quantity, item.recipe_id) for item in shopping_list.items] == [
+            ("Onions", "5", None),
+            ("Chicken stock", "2 l", soup.id),
+            ("Beef", "500 g", stew.id),
+        ]
+
+        # Editing a recipe's ingredients normalizes it again, from learned categories here
+        soup.ingredients.filter(name="Chicken stock").update(quantity="1.5 l")
+        update_ingredients_digests([soup])
+        backfill_parsed_quantities(soup.ingredients.all())
+        shopping_list = generate_shopping_list(self.make_meal_plan(user, [(soup, None), (stew, None)]))
+        assert ("Chicken stock", "1 1/2 l") in [(item.name, item.quantity) for item in shopping_list.items]
+        assert self.model_calls() == 2
+
+    def test_items_left_uncategorized_are_not_cached(self, user, monkeypatch):
+        categorize_with_model = shopping_list_generator.categorize_with_model
+        calls = []
+
+        def leaves_out_beef(shopping_list):
+            calls.append([item.name for item in shopping_list])
+            return [
+                item.model_copy(update={'category': UNCATEGORIZED}) if item.name == "Beef" else item
+                for item in categorize_with_model(shopping_list)
+            ]
+        monkeypatch.setattr(shopping_list_generator, 'categorize_with_model', leaves_out_beef)
+        stew = self.save_recipe(user, "Stew", [("Onion", "1"), ("Beef", "500 g")])
+
+        shopping_list = generate_shopping_list(self.make_meal_plan(user, [(stew, None)]))
+        assert ("Beef", UNCATEGORIZED) in [(item.name, item.category) for item in shopping_list.items]
+        assert ShoppingListRepository.get_category_key(UNCATEGORIZED) == 'pantry'
+
+        # Neither the recipe nor the chunk was cached with the placeholder, so the model is asked again
+        generate_shopping_list(self.make_meal_plan(user, [(stew, None)]))
+        assert calls == [["Onion", "Beef"], ["Beef"]]
+
+    def test_large_plans_are_categorized_in_concurrent_chunks(self, user, settings):
+        settings.LOCAL_LLM = {**settings.LOCAL_LLM, 'LATENCY': 0.3}
+        settings.SHOPPING_LIST_CHUNK_SIZE = 4
+        settings.SHOPPING_LIST_CONCURRENCY = 4
+        recipes = [self.save_recipe(user, f"Recipe {i}", [(f"Ingredient {i}", "1"), ("Onion", "1")]) for i in range(8)]
+
+        # 16 items in four chunks, all at once
+        started = time.perf_counter()
+        shopping_list = generate_shopping_list(self.make_meal_plan(user, [(recipe, None) for recipe in recipes]))
+        assert time.perf_counter() - started < 0.6
+        assert self.model_calls() == 4
+        assert len(shopping_list.items) == 9
+        assert ("Onion", "8", "Fruit & Vegetables") in [(item.name, item.quantity, item.category) for item in shopping_list.items]
+
+    def test_cached_lists_take_a_constant_number_of_queries(self, user, django_assert_num_queries):
+        recipes = [self.save_recipe(user, f"Recipe {i}", [(f"Ingredient {i}", "1"), ("Onion", "1")]) for i in range(6)]
+        generate_shopping_list(self.make_meal_plan(user, [(recipe, None) for recipe in recipes]))
+
+        # The planned recipes, the cache lookup, its hit counts and the hit counter
+        meal_plan = self.make_meal_plan(user, [(recipe, 8) for recipe in recipes * 2])
+        with django_assert_num_queries(4):
+            shopping_list = generate_shopping_list(meal_plan)
+        assert len(shopping_list.items) == 7
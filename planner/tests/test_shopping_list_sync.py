@@ -0,0 +1,124 @@
+import pytest
+from django.contrib.auth.models import User
+from planner.models import LLMCall, MealGroup, MealPlan, MealPlanRecipe, ShoppingItem
+from planner.services.digest import meal_plan_recipe_digests
+from planner.services.recipe_generator import Ingredient, InstructionSection, InstructionStep, Recipe
+from planner.services.recipe_repository import save_recipe_to_db
+from planner.services.shopping_list_generator import generate_shopping_list
+from planner.services.shopping_list_repository import save_shopping_list_to_db
+from planner.services.shopping_list_sync import SyncReport, sync_shopping_list
+
+
+@pytest.mark.django_db(transaction=True) # Recipes missing from the cache are normalized in pool threads
+class TestSyncShoppingList:
+    @pytest.fixture
+    def user(self, settings):
+        settings.LLM_PROVIDER = 'local'
+        settings.LOCAL_LLM = {**settings.LOCAL_LLM, 'LATENCY': 0, 'JITTER': 0}
+        return User.objects.create_user(username='testuser', password='testpass')
+
+    def save_recipe(self, user, title, ingredients):
+        return save_recipe_to_db(Recipe(
+            title=title,
+            description="",
+            servings=4,
+            ingredients=[Ingredient(name=name, quantity=quantity) for name, quantity in ingredients],
+            instructions=[InstructionSection(section_title="Cook", steps=[InstructionStep(text="Cook")])],
+        ), user)
+
+    def plan(self, meal_plan, recipe, order):
+        group, _ = MealGroup.objects.get_or_create(name="Monday", meal_plan=meal_plan, defaults={'order': 1})
+        return MealPlanRecipe.objects.create(meal_group=group, recipe=recipe, order=order)
+
+    def items(self, shopping_list):
+        return sorted(
+            (item.name, item.quantity, item.is_checked, sorted(item.recipes.values_list('title', flat=True)))
+            for item in shopping_list.items.all()
+        )
+
+    def test_only_changed_recipes_are_synced(self, user):
+        soup = self.save_recipe(user, "Soup", [("Onions", "2"), ("Chicken stock", "1 l")])
+        stew = self.save_recipe(user, "Stew", [("Onion", "1"), ("Beef", "500 g")])
+        curry = self.save_recipe(user, "Curry", [("Onion", "1"), ("Rice", "300 g")])
+        meal_plan = MealPlan.objects.create(name="Week", user=user)
+        self.plan(meal_plan, soup, 1)
+        planned_stew = self.plan(meal_plan, stew, 2)
+
+        shopping_list = save_shopping_list_to_db(generate_shopping_list(meal_plan), user=user, meal_plan=meal_plan)
+        shopping_list.items.filter(name__in=["Beef", "Chicken stock"]).update(is_checked=True)
+        ShoppingItem.objects.create(shopping_list=shopping_list, name="Candles", quantity="2", category='non_food')
+        assert sync_shopping_list(shopping_list).items_added == 0
+
+        planned_stew.delete()
+        self.plan(meal_plan, curry, 3)
+        calls = LLMCall.objects.filter(operation='shopping_list').count()
+        report = sync_shopping_list(shopping_list)
+
+        assert (report.added_recipes, report.removed_recipes) == (1, 1)
+        assert (report.items_added, report.items_removed, report.items_updated) == (2, 1, 1)
+        # Only the curry needed normalizing, and the soup's onions were re-totalled from the cache
+        assert LLMCall.objects.filter(operation='shopping_list').count() == calls + 1
+        assert self.items(shopping_list) == [
+            ("Candles", "2", False, []),
+            ("Chicken stock", "1 l", True, ["Soup"]),
+            ("Onion", "1", False, ["Curry"]),
+            ("Onions", "2", False, ["Soup"]),
+            ("Rice", "300 g", False, ["Curry"]),
+        ]
+        assert shopping_list.items.get(name="Onions").recipe_id == soup.id
+
+    def test_changed_servings_are_retotalled(self, user, django_assert_max_num_queries):
+        soup = self.save_recipe(user, "Soup", [("Onions", "2"), ("Chicken stock", "1 l")])
+        meal_plan = MealPlan.objects.create(name="Week", user=user)
+        planned_soup = self.plan(meal_plan, soup, 1)
+        shopping_list = save_shopping_list_to_db(generate_shopping_list(meal_plan), user=user, meal_plan=meal_plan)
+        shopping_list.items.filter(name="Onions").update(is_checked=True)
+
+        planned_soup.servings = 8
+        planned_soup.save()
+        report = sync_shopping_list(shopping_list)
+
+        assert (report.added_recipes, report.removed_recipes, report.items_updated) == (0, 0, 2)
+        assert self.items(shopping_list) == [
+            ("Chicken stock", "2 l", False, ["Soup"]),
+            ("Onions", "4", True, ["Soup"]),
+        ]
+        # The list now records the plan it matches, so an unchanged plan is one digest query
+        with django_assert_max_num_queries(1):
+            assert sync_shopping_list(shopping_list) == SyncReport()
+
+    def test_items_of_unchanged_recipes_are_left_alone(self, user):
+        soup = self.save_recipe(user, "Soup", [("Onions", "2"), ("Chicken stock", "1 l")])
+        stew = self.save_recipe(user, "Stew", [("Beef", "500 g"), ("Carrots", "2")])
+        meal_plan = MealPlan.objects.create(name="Week", user=user)
+        planned_soup = self.plan(meal_plan, soup, 1)
+        self.plan(meal_plan, stew, 2)
+        shopping_list = save_shopping_list_to_db(
+            generate_shopping_list(meal_plan), user=user, meal_plan=meal_plan, recipe_digests=meal_plan_recipe_digests(meal_plan),
+        )
+        shopping_list.items.filter(name="Beef").update(quantity="600 g")
+
+        planned_soup.servings = 8
+        planned_soup.save()
+        report = sync_shopping_list(shopping_list)
+
+        # Only the soup's items are re-totalled; the stew's keep the user's edit
+        assert report.items_updated == 2
+        assert [(name, quantity) for name, quantity, _, _ in self.items(shopping_list)] == [
+            ("Beef", "600 g"),
+            ("Carrots", "2"),
+            ("Chicken stock", "2 l"),
+            ("Onions", "4"),
+        ]
+        assert shopping_list.recipe_digests == meal_plan_recipe_digests(meal_plan)
+
+    def test_lists_without_a_meal_plan_cannot_be_synced(self, user):
+        soup = self.save_recipe(user, "Soup", [("Onions", "2")])
+        meal_plan = MealPlan.objects.create(name="Week", user=user)
+        self.plan(meal_plan, soup, 1)
+        shopping_list = save_shopping_list_to_db(generate_shopping_list(meal_plan), user=user, meal_plan=meal_plan)
+
+        meal_plan.delete()
+        shopping_list.refresh_from_db()
+        with pytest.raises(ValueError):
+            sync_shopping_list(shopping_list)
@@ -0,0 +1,37 @@
+import pytest
+from django.contrib.auth.models import User
+from django.urls import reverse
+from planner.models import Recipe
+from planner.services.similar_recipes import find_similar_recipes
+
+
+@pytest.fixture
+def user():
+    return User.objects.create_user(username='testuser', password='testpass')
+
+@pytest.fixture
+def recipes(user):
+    def create(title, status='published'):
+        return Recipe.objects.create(title=title, servings=4, description=f"A classic {title.lower()}.", created_by=user, status=status)
+    return {
+        'lasagna': create("Vegetarian Lasagna"),
+        'draft_lasagna': create("Beef Lasagna", status='draft'),
+        'curry': create("Chickpea Curry"),
+    }
+
+
+@pytest.mark.django_db
+class TestSimilarRecipes:
+    def test_only_published_matches(self, recipes):
+        assert list(find_similar_recipes("lasagna")) == [recipes['lasagna']]
+
+    def test_short_or_blank_ideas_are_ignored(self, recipes):
+        assert not find_similar_recipes("  la ")
+
+    def test_view_offers_existing_recipes(self, user, recipes, client):
+        client.force_login(user)
+        response = client.get(reverse('action_similar_recipes'), {'dish_idea': 'Lasagna'})
+
+        assert b"Use this recipe" in response.content
+        assert recipes['lasagna'].get_absolute_url().encode() in response.content
+        assert b"Chickpea Curry" not in response.content
@@ -0,0 +1,84 @@
+import threading
+import time
+import pytest
+from django.db import connection
+from planner.models import DedupeResult, LLMCacheEntry, LLMCacheStats
+from planner.services import singleflight as singleflight_module
+from planner.services.llm_cache import set_cached_response
+from planner.services.singleflight import advisory_lock, singleflight
+
+
+@pytest.mark.django_db(transaction=True)
+class TestSingleflight:
+    def test_concurrent_callers_share_one_call(self):
+        calls = []
+
+        def slow_llm_call():
+            calls.append(1)
+            time.sleep(0.3)
+            return '{"title": "Lasagna"}'
+
+        results = []
+
+        def caller():
+            try:
+                results.append(singleflight('recipe', 'same-key', slow_llm_call))
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=caller) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(calls) == 1
+        assert results == ['{"title": "Lasagna"}'] * 5
+
+    def test_failed_leader_does_not_publish_a_result(self):
+        def failing_llm_call():
+            raise RuntimeError("upstream error")
+
+        with pytest.raises(RuntimeError):
+            singleflight('recipe', 'failed-key', failing_llm_call)
+
+        # Nothing was cached and the lock was released, so the next caller makes the call
+        assert singleflight('recipe', 'failed-key', lambda: 'fresh') == 'fresh'
+
+    def test_leader_rechecks_the_cache(self, monkeypatch):
+        get_cached_response = singleflight_module.get_cached_response
+        lookups = []
+
+        def racing_get_cached_response(namespace, key, **kwargs):
+            # The previous leader publishes just after the first lookup misses
+            lookups.append(key)
+            if len(lookups) == 1:
+                set_cached_response(namespace, key, '{"title": "Lasagna"}')
+                return None
+            return get_cached_response(namespace, key, **kwargs)
+        monkeypatch.setattr(singleflight_module, 'get_cached_response', racing_get_cached_response)
+
+        def llm_call():
+            raise AssertionError("The published result should be used")
+        assert singleflight('recipe', 'raced-key', llm_call) == '{"title": "Lasagna"}'
+
+    def test_lock_is_released_after_block(self):
+        with advisory_lock('recipe:some-key', timeout=0) as acquired:
+            assert acquired
+        with advisory_lock('recipe:some-key', timeout=0) as acquired:
+            assert acquired
+
+    def test_dedupe_only_results_stay_out_of_the_llm_cache(self):
+        calls = []
+
+        def save_draft():
+            calls.append(1)
+            return '42'
+
+        assert singleflight('recipe_draft', 'draft-key', save_draft, ttl=30, dedupe_only=True) == '42'
+        assert singleflight('recipe_draft', 'draft-key', save_draft, ttl=30, dedupe_only=True) == '42'
+
+        assert len(calls) == 1
+        assert DedupeResult.objects.get().result == '42'
+        assert not LLMCacheEntry.objects.exists()
+        assert not LLMCacheStats.objects.exists()
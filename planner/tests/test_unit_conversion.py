@@ -0,0 +1,82 @@
+import pytest
+from django.contrib.auth.models import User
+from planner.services.recipe_generator import Ingredient, InstructionSection, InstructionStep, Recipe
+from planner.services.recipe_repository import save_recipe_to_db
+from planner.services.scaling_engine import get_scaled_recipe_cache
+from planner.services.shopping_list_generator import load_recipe_shopping_items
+from planner.services.unit_conversion import convert_quantity, convert_temperatures
+
+
+@pytest.mark.parametrize("quantity, name, units, expected", [
+    # Volumes of dry ingredients become weights and back
+    ("2 cups", "flour", "metric", "250 g"),
+    ("250 g", "flour", "imperial", "2 cups"),
+    ("30 g", "butter", "imperial", "2 tbsp"),
+    # Liquids stay volumes, other weights stay weights
+    ("1 cup", "milk", "metric", "235 ml"),
+    ("1.5 l", "stock", "imperial", "6 1/4 cups"),
+    ("500 grams", "chicken breast", "imperial", "1 lb"),
+    ("2 lb", "potatoes", "metric", "910 g"),
+    ("8 oz", "cream cheese", "metric", "225 g"),
+    # Modifiers are kept, parenthesised conversions dropped
+    ("200 g, diced", "bacon", "imperial", "7 oz, diced"),
+    ("1 cup (240 ml)", "milk", "metric", "235 ml"),
+    # Already in units, shared or countable units and free text are unchanged
+    ("100 ml", "milk", "metric", "100 ml"),
+    ("1 cup", "milk", "imperial", "1 cup"),
+    ("1 tbsp", "olive oil", "metric", "1 tbsp"),
+    ("2 large", "eggs", "metric", "2 large"),
+    ("to taste", "salt", "imperial", "to taste"),
+    ("2-3 cups", "flour", "metric", "2-3 cups"),
+])
+def test_convert_quantity(quantity, name, units, expected):
+    assert convert_quantity(quantity, name, units) == expected
+
+@pytest.mark.parametrize("text, units, expected", [
+    ("Bake at 350°F for 20 minutes.", "metric", "Bake at 180°C for 20 minutes."),
+    ("Bake at 350 degrees Fahrenheit.", "metric", "Bake at 180°C."),
+    ("Preheat the oven to 200C.", "imperial", "Preheat the oven to 400°F."),
+    ("Preheat the oven to 180°C (350°F).", "imperial", "Preheat the oven to 350°F."),
+    ("Preheat the oven to 180°C (350°F).", "metric", "Preheat the oven to 180°C."),
+    ("Bake at 180°C.", "metric", "Bake at 180°C."),
+])
+def test_convert_temperatures(text, units, expected):
+    assert convert_temperatures(text, units) == expected
+
+
+@pytest.mark.django_db
+class TestConvertFromDatabase:
+    @pytest.fixture
+    def user(self):
+        return User.objects.create_user(username='testuser', password='testpass')
+
+    @pytest.fixture
+    def db_recipe(self, user):
+        return save_recipe_to_db(Recipe(
+            title="Shortbread",
+            description="",
+            servings=4,
+            ingredients=[Ingredient(name="flour", quantity="2 cups"), Ingredient(name="butter", quantity="8 oz")],
+            instructions=[InstructionSection(section_title="Bake", steps=[InstructionStep(text="Bake at 325°F for 20 minutes.")])],
+        ), user)
+
+    def test_detail_view_converts_to_preferred_units(self, user, db_recipe, client):
+        get_scaled_recipe_cache().clear()
+        client.force_login(user)
+
+        response = client.get(db_recipe.get_absolute_url())
+        assert response.context['units'] == 'metric'
+        assert [i.quantity for i in response.context['ingredients']] == ["250 g", "225 g"]
+        assert "Bake at 160°C for 20 minutes." in response.content.decode()
+
+        # The units picker re-renders the ingredients and instructions in place
+        response = client.get(db_recipe.get_absolute_url(), {'units': 'imperial', 'servings': 8}, HTTP_HX_REQUEST='true')
+        content = response.content.decode()
+        assert 'id="recipe-contents"' in content
+        assert "4 cups" in content and "16 oz" in content
+        assert "Bake at 325°F for 20 minutes." in content
+
+    def test_shopping_list_is_converted_before_generation(self, db_recipe):
+        ingredients = db_recipe.ingredients.values_list('name', 'quantity')
+        items = load_recipe_shopping_items(db_recipe.id, ingredients, 'metric')
+        assert [(item.name, item.quantity) for item in items] == [("flour", "250 g"), ("butter", "225 g")]
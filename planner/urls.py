@@ -47,6 +47,9 @@ action_patterns = [
     path("action_create_meal_plan/<str:template>/", views.action_create_meal_plan, name="action_create_meal_plan"),
     path("action_delete_meal_plan/<int:meal_plan_id>/", views.action_delete_meal_plan, name="action_delete_meal_plan"),
     path("action_generate_recipe/", views.action_generate_recipe, name="action_generate_recipe"),
+    path("action_similar_recipes/", views.action_similar_recipes, name="action_similar_recipes"),
+    path("action_stream_recipe/", views.action_stream_recipe, name="action_stream_recipe"),
+    path("action_recipe_job_status/<uuid:job_uuid>/", views.action_recipe_job_status, name="action_recipe_job_status"),
     path("action_generate_recipe_image/<int:recipe_id>/", views.action_generate_recipe_image, name="action_generate_recipe_image"),
     path("action_toggle_my_recipes/<int:recipe_id>/", views.action_toggle_my_recipes, name="action_toggle_my_recipes"),
     path("action_toggle_mpr/<int:meal_group_id>/<int:recipe_id>/", views.action_toggle_mpr, name="action_toggle_mpr"),
@@ -57,6 +60,7 @@ action_patterns = [
     path("action_update_meal_plan_name/<int:meal_plan_id>/", views.action_update_meal_plan_name, name="action_update_meal_plan_name"),
     path("action_move_mpr/", views.action_move_mpr, name="action_move_mpr"),
     path("action_generate_shopping_list/<int:meal_plan_id>/", views.action_generate_shopping_list, name="action_generate_shopping_list"),
+    path("action_sync_shopping_list/<int:shopping_list_id>/", views.action_sync_shopping_list, name="action_sync_shopping_list"),
     path("action_delete_shopping_list/<int:shopping_list_id>/", views.action_delete_shopping_list, name="action_delete_shopping_list"),
     path("action_update_shopping_list_name/<int:shopping_list_id>/", views.action_update_shopping_list_name, name="action_update_shopping_list_name"),
     path("action_add_shopping_item/<int:shopping_list_id>/", views.action_add_shopping_item, name="action_add_shopping_item"),
@@ -1,29 +1,54 @@
+from django.conf import settings
 from django.contrib.auth.models import User
 from django.contrib.postgres.aggregates import ArrayAgg
 from django.db import transaction
 from django.db.models import Exists, F, OuterRef, Q, Case, When, Value, IntegerField
 from django.shortcuts import render, redirect
-from django.http import HttpResponseBadRequest, HttpResponse, JsonResponse
+from django.http import HttpResponseBadRequest, HttpResponse, JsonResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.template.loader import render_to_string
+from django.urls import reverse
 from django.utils import timezone
+from django.utils.http import urlencode
 from django.utils.decorators import method_decorator
+from django.utils.html import format_html
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from django.views import View
 from django.views.generic import DetailView, ListView
+from planner.services.generation_jobs import enqueue_recipe_job, recipe_request_key
+from planner.services.digest import meal_plan_content_digest, meal_plan_recipe_digests
+from planner.services.http_client import CircuitOpenError
 from planner.services.image_generator import get_or_create_recipe_image
+from planner.services.llm_cache import make_cache_key
+from planner.services.llm_client import llm_circuit_breaker
 from planner.services.recipe_generator import generate_recipe
 from planner.services.recipe_parser import parse_recipe_string
 from planner.services.recipe_repository import save_recipe_to_db
+from planner.services.recipe_reuse import clone_scaled_recipe, find_reusable_recipe, recipe_generation_key
+from planner.services.recipe_stream import stream_recipe
 from planner.services.shopping_list_generator import generate_shopping_list
+from planner.services.scaling_engine import scaled_recipe_ingredients
+from planner.services.similar_recipes import find_similar_recipes
 from planner.services.shopping_list_repository import save_shopping_list_to_db
+from planner.services.shopping_list_sync import sync_shopping_list
+from planner.services.singleflight import advisory_lock, get_dedupe_result, singleflight
+from planner.services.unit_conversion import IMPERIAL, METRIC
 from planner import forms
-from planner.models import Recipe, MyRecipe, MealPlan, MealGroup, MealPlanRecipe, ShoppingList, ShoppingItem
+from planner.models import Recipe, MyRecipe, MealPlan, MealGroup, MealPlanRecipe, ShoppingList, ShoppingItem, GenerationJob
 from planner.services.meal_plan_templates import TEMPLATES, get_default_meal_groups
 import json
+import logging
 from functools import wraps
 from datetime import datetime
 
+logger = logging.getLogger(__name__)
+
+DUPLICATE_REQUEST_WINDOW = 30 # seconds during which an identical generate request returns the same result
+SERVICE_UNAVAILABLE_MESSAGE = "Our recipe assistant is temporarily unavailable. Please try again in a minute."
+MAX_SERVINGS = 12 # Highest servings a recipe page can be scaled to, as in RecipeForm
+STREAM_RETRY_MS = 10_000 # EventSource reconnect delay, within DUPLICATE_REQUEST_WINDOW so a reconnect finds the saved draft
+
 
 class UserAuthMixin:
     def get_authenticated_user(self, request):
@@ -32,6 +57,13 @@ class UserAuthMixin:
             user = User.objects.get(username='admin')
         return user
 
+def service_unavailable(target: str):
+    """Friendly HTMX error shown in target while the LLM provider's circuit breaker is open"""
+    response = HttpResponse(format_html('<p class="text-sm text-red-600 py-2 text-center">{}</p>', SERVICE_UNAVAILABLE_MESSAGE))
+    response['HX-Retarget'] = target
+    response['HX-Reswap'] = 'innerHTML'
+    return response
+
 def with_user(view_func):
     @wraps(view_func)
     def wrapper(request, *args, **kwargs):
@@ -160,9 +192,38 @@ class RecipeDetailView(UserAuthMixin, DetailView):
             'instruction_sections',
             'instruction_sections__steps'
         )
-    
+
+    def get(self, request, *args, **kwargs):
+        # Servings and units pickers: swap in just the ingredients and instructions
+        if request.headers.get('HX-Request') and ('servings' in request.GET or 'units' in request.GET):
+            recipe = get_object_or_404(Recipe, uuid=self.kwargs['uuid'])
+            return render(request, 'planner/recipes/detail.html#partial-recipe-contents', self.get_ingredients_context(recipe))
+        return super().get(request, *args, **kwargs)
+
+    def get_ingredients_context(self, recipe):
+        """Ingredients at ?servings=N in ?units=metric|imperial (the user's preferred units by default), scaled, converted and cached"""
+        try:
+            servings = int(self.request.GET.get('servings', recipe.servings))
+        except ValueError:
+            servings = recipe.servings
+        if not 1 <= servings <= MAX_SERVINGS:
+            servings = recipe.servings
+
+        units = self.request.GET.get('units')
+        if units not in (METRIC, IMPERIAL):
+            units = self.get_authenticated_user(self.request).preferences.preferred_units
+
+        return {
+            'recipe': recipe,
+            'servings': servings,
+            'servings_choices': sorted({*range(1, MAX_SERVINGS + 1), recipe.servings}),
+            'units': units,
+            'ingredients': scaled_recipe_ingredients(recipe, servings, units),
+        }
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
+        context.update(self.get_ingredients_context(self.object))
         user = self.get_authenticated_user(self.request)
 
         recent_meal_plan = MealPlan.objects.filter(user=user).order_by('-last_viewed_at').first()
@@ -411,6 +472,8 @@ class ShoppingListDetailView(UserAuthMixin, DetailView):
             categories.append(category_dict)
         
         context['categories'] = categories
+        # Lists generated in other units are shown in the current ones without regenerating
+        context['units'] = user.preferences.preferred_units
 
         form = forms.AddShoppingItemForm()
         context['form'] = form
@@ -423,34 +486,145 @@ class ShoppingListDetailView(UserAuthMixin, DetailView):
 @require_http_methods(['POST'])
 def action_generate_recipe(request, user):
     form = forms.CreateRecipeForm(request.POST)
-    if form.is_valid():
+    if form.is_valid() and not form.cleaned_data['force_new']:
+        # Same request with different servings: rescale an existing recipe instead of generating a new one
+        generation_key = recipe_generation_key(
+            form.cleaned_data['dish_idea'],
+            form.cleaned_data.get('notes', ''),
+            form.cleaned_data.get('dietary_preferences', ''),
+            form.cleaned_data.get('units', 'metric'),
+        )
+        existing_recipe = find_reusable_recipe(user, generation_key, form.cleaned_data['servings'])
+        if existing_recipe:
+            scaled_recipe = clone_scaled_recipe(existing_recipe, form.cleaned_data['servings'], user)
+            response = HttpResponse()
+            response['HX-Redirect'] = scaled_recipe.get_absolute_url()
+            return response
+
+    if form.is_valid() and llm_circuit_breaker().state == 'open':
+        # Don't start a stream or queue a job that can only fail
+        return service_unavailable('#recipe-job-status')
+
+    if form.is_valid() and settings.RECIPE_STREAMING:
+        stream_url = f"{reverse('action_stream_recipe')}?{urlencode(form.cleaned_data)}"
+        return render(request, 'planner/recipes/create.html#partial-recipe-stream', {'stream_url': stream_url})
+    elif form.is_valid():
         try:
-            recipe_string = generate_recipe(
+            job = enqueue_recipe_job(
+                user=user,
                 dish_idea=form.cleaned_data['dish_idea'],
                 notes=form.cleaned_data.get('notes', ''),
                 servings=form.cleaned_data['servings'],
                 dietary_preferences=form.cleaned_data.get('dietary_preferences', ''),
-                units=form.cleaned_data.get('units', 'metric')
+                units=form.cleaned_data.get('units', 'metric'),
+                # Asked for a new recipe: don't serve the cached response for the same request either
+                use_cache=not form.cleaned_data['force_new'],
             )
-            parsed_recipe = parse_recipe_string(recipe_string)
-            saved_recipe = save_recipe_to_db(parsed_recipe, user=user, status='draft')
-            
-            # Automatically add to My Recipes
-            saved_recipe.saved_to_my_recipes_by.add(user)
-            
-            response = HttpResponse()
-            response['HX-Redirect'] = saved_recipe.get_absolute_url()
-            return response
-
-        except Exception as e:
-            return HttpResponseBadRequest(f"Error generating recipe: {str(e)}")
+        except TimeoutError:
+            return service_unavailable('#recipe-job-status')
+        return render(request, 'planner/recipes/create.html#partial-job-status', {'job': job})
     else:
         return HttpResponseBadRequest(str(form.errors))
 
+@require_http_methods(['GET'])
+def action_similar_recipes(request):
+    """Existing published recipes matching the dish idea being typed, offered instead of generating a new one"""
+    similar_recipes = find_similar_recipes(request.GET.get('dish_idea', ''))
+    return render(request, 'planner/recipes/create.html#partial-similar-recipes', {'similar_recipes': similar_recipes})
+
+@with_user
+@require_http_methods(['GET'])
+def action_recipe_job_status(request, user, job_uuid):
+    job = get_object_or_404(GenerationJob, uuid=job_uuid, user=user)
+
+    if job.status == 'succeeded' and job.recipe:
+        response = HttpResponse()
+        response['HX-Redirect'] = job.recipe.get_absolute_url()
+        return response
+
+    return render(request, 'planner/recipes/create.html#partial-job-status', {'job': job})
+
+def sse_event(event: str, data: str) -> str:
+    """Format a server-sent event; multi-line data (e.g. rendered HTML) is split over several data: lines"""
+    data_lines = "\n".join(f"data: {line}" for line in data.splitlines() or [''])
+    return f"event: {event}\n{data_lines}\n\n"
+
+@with_user
+@require_http_methods(['GET'])
+def action_stream_recipe(request, user):
+    """
+    Server-sent events for a recipe as it is generated: each title, description, ingredient and
+    instruction section is pushed as a rendered HTML fragment as soon as it is complete.
+    The draft is saved once the full recipe has arrived, then a 'done' event carries its URL and the
+    client closes the stream. Reconnects and repeats of the request replay the same recipe and draft.
+    """
+    form = forms.CreateRecipeForm(request.GET)
+    if not form.is_valid():
+        return HttpResponseBadRequest(str(form.errors))
+
+    payload = {
+        'dish_idea': form.cleaned_data['dish_idea'],
+        'servings': form.cleaned_data['servings'],
+        'notes': form.cleaned_data.get('notes', ''),
+        'dietary_preferences': form.cleaned_data.get('dietary_preferences', ''),
+        'units': form.cleaned_data.get('units', 'metric'),
+        'use_cache': not form.cleaned_data['force_new'],
+    }
+    # Same key as the job queue, so repeats of a request share one generation and one draft
+    dedupe_key = recipe_request_key(user, payload)
+
+    def save_draft(recipe) -> str:
+        generation_key = recipe_generation_key(payload['dish_idea'], payload['notes'], payload['dietary_preferences'], payload['units'])
+        with transaction.atomic():
+            saved_recipe = save_recipe_to_db(recipe, user=user, status='draft', generation_key=generation_key)
+            saved_recipe.saved_to_my_recipes_by.add(user)
+        return str(saved_recipe.id)
+
+    def events():
+        yield f"retry: {STREAM_RETRY_MS}\n\n"
+        try:
+            # A reconnect or second tab waits for the generation in flight, then replays it from the cache
+            with advisory_lock(f"recipe_stream:{dedupe_key}") as acquired:
+                if not acquired:
+                    # Still generating elsewhere: end the response, so the browser reconnects and replays it later
+                    return
+                if not payload['use_cache']:
+                    # Nothing to replay a forced generation from, so a reconnect goes straight to the draft it saved
+                    recipe_id = get_dedupe_result('recipe_draft', dedupe_key)
+                    saved_recipe = Recipe.objects.filter(id=recipe_id).first() if recipe_id else None
+                    if saved_recipe:
+                        yield sse_event('done', saved_recipe.get_absolute_url())
+                        return
+                for event in stream_recipe(**payload):
+                    if event.name == 'complete':
+                        recipe_id = singleflight('recipe_draft', dedupe_key, lambda: save_draft(event.data), ttl=DUPLICATE_REQUEST_WINDOW, dedupe_only=True)
+                        saved_recipe = Recipe.objects.filter(id=recipe_id).first()
+                        if saved_recipe is None:
+                            # The coalesced draft was deleted in the meantime
+                            recipe_id = singleflight('recipe_draft', dedupe_key, lambda: save_draft(event.data), ttl=DUPLICATE_REQUEST_WINDOW, use_cache=False, dedupe_only=True)
+                            saved_recipe = Recipe.objects.get(id=recipe_id)
+                        yield sse_event('done', saved_recipe.get_absolute_url())
+                    else:
+                        html = render_to_string(f'planner/recipes/create.html#partial-stream-{event.name}', {event.name: event.data})
+                        yield sse_event(event.name, html)
+        except CircuitOpenError:
+            yield sse_event('failed', SERVICE_UNAVAILABLE_MESSAGE)
+        except Exception:
+            logger.exception("Error streaming recipe")
+            yield sse_event('failed', "Sorry, we couldn't generate that recipe. Please try again.")
+
+    response = StreamingHttpResponse(events(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no' # Don't let proxies buffer the stream
+    return response
+
 @require_http_methods(['GET'])
 def action_generate_recipe_image(request, recipe_id):
     recipe = get_object_or_404(Recipe, id=recipe_id)
-    image = get_or_create_recipe_image(recipe)
+    try:
+        image = get_or_create_recipe_image(recipe)
+    except CircuitOpenError:
+        return service_unavailable('#image-container')
     return render(request, 'planner/recipes/detail.html#partial-recipe-image', {'image_url': image.url})
 
 @with_user
@@ -462,15 +636,57 @@ def action_generate_shopping_list(request, user, meal_plan_id):
     if not MealPlanRecipe.objects.filter(meal_group__meal_plan=meal_plan).exists():
         return HttpResponseBadRequest("Cannot generate shopping list: No meals in plan")
         
+    # Covers the planned recipes' servings and ingredients, not just which recipes are planned
+    content_digest = meal_plan_content_digest(meal_plan)
+
+    preferred_units = user.preferences.preferred_units
+
+    def create_shopping_list():
+        shopping_list = generate_shopping_list(meal_plan, preferred_units)
+        saved_shopping_list = save_shopping_list_to_db(
+            shopping_list,
+            user=user,
+            content_digest=content_digest,
+            meal_plan=meal_plan,
+            recipe_digests=meal_plan_recipe_digests(meal_plan),
+        )
+        return str(saved_shopping_list.uuid)
+
+    # Coalesce double-clicks and concurrent tabs into a single shopping list
+    dedupe_key = make_cache_key('shopping_list_action', 3, user=user.id, meal_plan=meal_plan.id, contents=content_digest, units=preferred_units)
+
     try:
-        shopping_list = generate_shopping_list(meal_plan)
-        saved_shopping_list = save_shopping_list_to_db(shopping_list, user=user)
+        shopping_list_uuid = singleflight('shopping_list_action', dedupe_key, create_shopping_list, ttl=DUPLICATE_REQUEST_WINDOW, dedupe_only=True)
+        saved_shopping_list = ShoppingList.objects.filter(uuid=shopping_list_uuid).first()
+        if saved_shopping_list is None:
+            # The coalesced list was deleted in the meantime
+            shopping_list_uuid = singleflight('shopping_list_action', dedupe_key, create_shopping_list, ttl=DUPLICATE_REQUEST_WINDOW, use_cache=False, dedupe_only=True)
+            saved_shopping_list = ShoppingList.objects.get(uuid=shopping_list_uuid)
         response = HttpResponse()
         response['HX-Redirect'] = saved_shopping_list.get_absolute_url()
         return response
+    except CircuitOpenError:
+        return service_unavailable('#generate-shopping-list-error')
     except Exception as e:
         return HttpResponseBadRequest(f"Error generating shopping list: {str(e)}")
 
+@with_user
+@require_http_methods(['POST'])
+def action_sync_shopping_list(request, user, shopping_list_id):
+    shopping_list = get_object_or_404(ShoppingList, id=shopping_list_id, user=user)
+    if shopping_list.meal_plan_id is None:
+        return HttpResponseBadRequest("Cannot sync shopping list: Its meal plan has been deleted")
+
+    try:
+        sync_shopping_list(shopping_list, user.preferences.preferred_units)
+        response = HttpResponse()
+        response['HX-Redirect'] = shopping_list.get_absolute_url()
+        return response
+    except CircuitOpenError:
+        return service_unavailable('#sync-shopping-list-error')
+    except Exception as e:
+        return HttpResponseBadRequest(f"Error syncing shopping list: {str(e)}")
+
 @require_http_methods(['POST'])
 def action_update_shopping_list_name(request, shopping_list_id):
     new_name = request.POST.get('shopping_list_name')
@@ -750,6 +966,9 @@ class GenerateRecipeView(View):
         servings = data.get("servings")
         units = data.get("units", "")
 
+        if llm_circuit_breaker().state == 'open':
+            return JsonResponse({"error": SERVICE_UNAVAILABLE_MESSAGE}, status=503)
+
         try:
             # Pass user input to OpenAI to generate the recipe
             recipe = generate_recipe(dish_idea, notes, servings, units, dietary_preferences)
@@ -758,6 +977,8 @@ class GenerateRecipeView(View):
                 return JsonResponse(parsed_recipe.model_dump())
             except Exception as e:
                 return JsonResponse({"error": str(e)}, status=500)
+        except CircuitOpenError:
+            return JsonResponse({"error": SERVICE_UNAVAILABLE_MESSAGE}, status=503)
         except Exception as e:
             return JsonResponse({"error": str(e)}, status=500)
 